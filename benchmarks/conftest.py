@@ -0,0 +1,41 @@
+import pytest
+from .harness import Baselines, measure
+
+
+@pytest.fixture(scope='session')
+def baselines(request):
+    config = request.config
+    b = Baselines(config.getoption('--benchmark-baselines'), config.getoption('--benchmark-threshold'))
+    yield b
+
+    if config.getoption('--benchmark-save'):
+        b.save()
+
+
+@pytest.fixture
+def benchmark(baselines, request):
+    """
+    Measures a workload, named after the test, and fails if its throughput regressed.
+    """
+    def run(workload, count_steps, repeat=3):
+        result = measure(request.node.name, workload, count_steps, repeat)
+        request.node.user_properties.append(('benchmark', result.to_json()))
+        regression = baselines.check(result)
+        assert regression is None, regression
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not config.getoption('--benchmark'):
+        return
+
+    terminalreporter.section('benchmarks')
+    terminalreporter.write_line(f'{"name":60} {"steps/s":>12} {"peak MB":>9} {"B/step":>9} {"blocks/step":>11}')
+    for item in terminalreporter.stats.get('passed', []) + terminalreporter.stats.get('failed', []):
+        for name, value in item.user_properties:
+            if name == 'benchmark':
+                terminalreporter.write_line(f'{item.nodeid.split("::")[-1]:60} {value["steps_per_s"]:12.0f} '
+                                            f'{value["peak_bytes"] / 1e6:9.2f} {value["bytes_per_step"]:9.1f} '
+                                            f'{value["blocks_per_step"]:11.3f}')
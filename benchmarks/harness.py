@@ -0,0 +1,138 @@
+"""
+Measures the throughput and memory use of a workload, and compares it to a saved baseline.
+"""
+from typing import Callable, Dict, Optional, Any
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+
+class Result:
+    """
+    Measurements of a workload. A step is whatever unit of work the workload reports, e.g. a simulation step or a
+    sample reduced over.
+    """
+    name: str
+    steps: int
+    seconds: float
+    peak_bytes: int
+    retained_bytes: int
+    retained_blocks: int
+
+    def __init__(self, name: str, steps: int, seconds: float, peak_bytes: int, retained_bytes: int,
+                 retained_blocks: int):
+        self.name = name
+        self.steps = steps
+        self.seconds = seconds
+        self.peak_bytes = peak_bytes
+        self.retained_bytes = retained_bytes
+        self.retained_blocks = retained_blocks
+
+    @property
+    def steps_per_s(self) -> float:
+        return self.steps / self.seconds
+
+    @property
+    def bytes_per_step(self) -> float:
+        return self.retained_bytes / self.steps
+
+    @property
+    def blocks_per_step(self) -> float:
+        return self.retained_blocks / self.steps
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            'steps': self.steps,
+            'seconds': self.seconds,
+            'steps_per_s': self.steps_per_s,
+            'peak_bytes': self.peak_bytes,
+            'bytes_per_step': self.bytes_per_step,
+            'blocks_per_step': self.blocks_per_step,
+        }
+
+
+def measure(name: str, workload: Callable[[], Any], count_steps: Callable[[Any], int], repeat: int = 3) -> Result:
+    """
+    :param workload: function which performs the work to measure.
+    :param count_steps: number of steps performed, given the value returned by `workload`.
+    :param repeat: number of times to time the workload. The fastest time is used.
+    :return: fastest time, and memory use of the workload traced separately. Memory retained is what is still
+             allocated when the workload returns, including its result, i.e. what a stored step costs.
+    """
+    best = float('inf')
+    steps = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        value = workload()
+        best = min(best, time.perf_counter() - start)
+        steps = count_steps(value)
+        del value
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        value = workload()
+        end_bytes, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del value
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(s.count for s in after.statistics('filename')) - sum(s.count for s in before.statistics('filename'))
+    return Result(name, steps, best, peak - start_bytes, end_bytes - start_bytes, blocks)
+
+
+class Baselines:
+    """
+    Results of previous runs, stored as JSON keyed by benchmark name.
+    """
+    path: str
+    threshold: float
+    results: Dict[str, Dict[str, Any]]
+
+    def __init__(self, path: str, threshold: float):
+        """
+        :param path: JSON file of baselines. Need not exist.
+        :param threshold: fraction by which throughput may drop below the baseline before a benchmark fails.
+        """
+        self.path = path
+        self.threshold = threshold
+        self.results = {}
+        self._saved: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self._saved = json.load(f)
+
+    def check(self, result: Result) -> Optional[str]:
+        """
+        Records the result.
+        :return: description of the regression, if throughput dropped further below the baseline than allowed.
+        """
+        self.results[result.name] = result.to_json()
+
+        baseline = self._saved.get(result.name)
+        if baseline is None:
+            return None
+
+        minimum = baseline['steps_per_s'] * (1.0 - self.threshold)
+        if result.steps_per_s < minimum:
+            return f'{result.name}: {result.steps_per_s:.0f} steps/s, baseline {baseline["steps_per_s"]:.0f} steps/s'
+
+        return None
+
+    def save(self):
+        """
+        Writes the recorded results, keeping baselines of benchmarks which were not run.
+        """
+        saved = dict(self._saved)
+        saved.update(self.results)
+        with open(self.path, 'w') as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
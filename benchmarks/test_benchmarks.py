@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from rocket_sim.simulations import simulate, Simulation
+from rocket_sim.stage import Stage, const, linear, lerp
+from rocket_sim.trajectory import Trajectory, FIELDS
+from vehicle_examples import single_stage_const_thrust, single_stage_var_thrust, single_stage_parachute, three_stage
+
+pytestmark = pytest.mark.benchmark
+
+EXAMPLES = [single_stage_const_thrust, single_stage_var_thrust, single_stage_parachute, three_stage]
+STAGE_STEPS = 100000
+SAMPLES = 1000000
+
+
+@pytest.mark.parametrize('kernel', [False, True], ids=['reference', 'kernel'])
+@pytest.mark.parametrize('dt', [0.1, 0.01, 0.001, 0.0001])
+@pytest.mark.parametrize('example', EXAMPLES, ids=lambda f: f.__name__)
+def test_simulate(benchmark, example, dt, kernel):
+    vehicle, _ = example()
+    repeat = 3 if dt >= 0.001 else 1
+    benchmark(lambda: simulate(vehicle, dt, kernel=kernel), lambda sim: len(sim.trajectory), repeat)
+
+
+def _stage(f_thrust_N) -> Stage:
+    return Stage(stage_time_s=0.0, area_m2=0.000979, drag_coefficient=0.75, empty_mass_kg=0.106,
+                 engine_case_mass_kg=0.0248, propellant_mass_kg=0.0215, thrust_N=6.38,
+                 f_propellant_mass_kg=linear(-0.00342925), f_thrust_N=f_thrust_N)
+
+
+THRUST_FUNCTIONS = {
+    'const': const(),
+    'linear': linear(-0.5),
+    'lerp': lerp(1.0, [8, 8, 6, 5, 5, 5, 0]),
+}
+
+
+@pytest.mark.parametrize('in_place', [False, True], ids=['immutable', 'in_place'])
+@pytest.mark.parametrize('thrust', list(THRUST_FUNCTIONS))
+def test_stage_step(benchmark, thrust, in_place):
+    def step_stage():
+        stage = _stage(THRUST_FUNCTIONS[thrust])
+        for _ in range(STAGE_STEPS):
+            if in_place:
+                stage.step_in_place(1e-4)
+            else:
+                stage = stage.step(1e-4)
+        return stage
+
+    benchmark(step_stage, lambda _: STAGE_STEPS)
+
+
+@pytest.fixture(scope='module')
+def long_simulation() -> Simulation:
+    """
+    Flight with a million samples: a parabola with events at burnout and touchdown.
+    """
+    rng = np.random.RandomState(0)
+    t = np.linspace(0.0, 100.0, SAMPLES)
+    columns = rng.uniform(0.0, 1.0, (len(FIELDS), SAMPLES))
+    columns[FIELDS.index('time_s')] = t
+    columns[FIELDS.index('dist_m')] = 50.0 * t - 0.5 * t * t
+    columns[FIELDS.index('velocity_ms')] = 50.0 - t
+    return Simulation(Trajectory.from_columns(columns, [(SAMPLES // 10, 'Burnout'), (SAMPLES - 1, 'Touchdown')]))
+
+
+def test_reductions(benchmark, long_simulation):
+    def reduce():
+        # Metrics are cached by each Simulation, so measure computing them for a new one.
+        sim = Simulation(long_simulation.trajectory)
+        return (sim.apogee, sim.maximum_g_force, sim.maximum_velocity, sim.maximum_acceleration,
+                sim.impact_velocity, sim.total_time, sim.events)
+
+    benchmark(reduce, lambda _: SAMPLES)
+
+
+def test_plot_data(benchmark, long_simulation):
+    def prepare():
+        plots = long_simulation.plot_data()
+        # Finding where to place the event labels is the costly part of preparing the plots.
+        return [(np.max(data), np.min(data)) for (_, data, _, _, _) in plots]
+
+    benchmark(prepare, lambda _: SAMPLES)
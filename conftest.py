@@ -1,8 +1,56 @@
+from typing import Optional
+import numpy as np
 import pytest
 from rocket_sim.state import VehicleState
+from rocket_sim.trajectory import FIELDS
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption('--benchmark', action='store_true', help='run benchmarks, which are skipped by default')
+    group.addoption('--benchmark-baselines', default='benchmarks/baselines.json',
+                    help='JSON file of baseline results to compare against')
+    group.addoption('--benchmark-save', action='store_true', help='save results as the new baselines')
+    group.addoption('--benchmark-threshold', type=float, default=0.25,
+                    help='fraction throughput may drop below the baseline before a benchmark fails')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: performance benchmark, only run with --benchmark')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+
+    skip = pytest.mark.skip(reason='benchmarks only run with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
 
 
 @pytest.fixture
 def zeroed_vehicle_states():
     return [VehicleState.zero(time/10) for time in range(0, 100)]
 
+
+def _assert_same_flight(actual, expected, rtol: Optional[float] = None):
+    if hasattr(actual, 'trajectory'):
+        assert actual.events == expected.events
+        actual, expected = actual.trajectory, expected.trajectory
+
+    assert actual.events == expected.events
+    for field in FIELDS:
+        if rtol is None:
+            assert np.array_equal(actual.column(field), expected.column(field)), field
+        else:
+            np.testing.assert_allclose(actual.column(field), expected.column(field), rtol=rtol, atol=1e-12)
+
+
+@pytest.fixture
+def assert_same_flight():
+    """
+    Asserts that two simulations, or trajectories, recorded the same flight: the same events, and the same value of
+    every field at every sample, or within `rtol` of it if given.
+    """
+    return _assert_same_flight
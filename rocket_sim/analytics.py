@@ -0,0 +1,214 @@
+"""
+Metrics of a simulated flight, computed from its trajectory when first needed and cached until the trajectory
+changes. Metrics may use other metrics, which are then only computed once, e.g. `events` uses `apogee`.
+
+Further metrics are added to every Simulation by registering a function of an Analysis, e.g.
+
+    @metric('minimum_mass')
+    def minimum_mass(a: Analysis) -> float:
+        return float(np.min(a.column('mass_kg')))
+
+    sim.metric('minimum_mass')
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
+from .atmosphere import Atmosphere, DEFAULT
+from .trajectory import Trajectory
+
+"""
+Function computing each metric, by name.
+"""
+METRICS: Dict[str, Callable[['Analysis'], Any]] = {}
+
+_G = 9.81
+
+
+def metric(name: str) -> Callable[[Callable[['Analysis'], Any]], Callable[['Analysis'], Any]]:
+    """
+    Decorator registering a function as the metric `name`, replacing any existing metric of that name.
+    """
+    def register(f: Callable[['Analysis'], Any]) -> Callable[['Analysis'], Any]:
+        METRICS[name] = f
+        return f
+
+    return register
+
+
+class Analysis:
+    """
+    Cache of the metrics of a trajectory.
+    """
+    trajectory: Trajectory
+    touchdown: Optional[Tuple[float, float]]
+    atmosphere: Optional[Atmosphere]
+
+    def __init__(self, trajectory: Trajectory, touchdown: Optional[Tuple[float, float]] = None,
+                 atmosphere: Optional[Atmosphere] = None):
+        """
+        :param touchdown: estimated time and velocity at which the vehicle reaches the ground, if the trajectory ends
+               before it does.
+        :param atmosphere: atmosphere the vehicle flew through, or None for constant sea level conditions.
+        """
+        self.trajectory = trajectory
+        self.touchdown = touchdown
+        self.atmosphere = atmosphere
+        self._version = trajectory.version
+        self._values: Dict[str, Any] = {}
+
+    def column(self, field: str) -> np.ndarray:
+        return self.trajectory.column(field)
+
+    def segments(self, field: str) -> List[np.ndarray]:
+        """
+        :return: parts of the column of the field, see Trajectory.segments.
+        """
+        return self.trajectory.segments(field)
+
+    def value(self, field: str, i: int) -> float:
+        return self.trajectory.value(field, i)
+
+    def get(self, name: str) -> Any:
+        """
+        :return: value of the metric `name`, computing it if the trajectory has changed since it was last computed.
+        """
+        if self._version != self.trajectory.version:
+            self._values.clear()
+            self._version = self.trajectory.version
+
+        if name in self._values:
+            return self._values[name]
+
+        f = METRICS.get(name)
+        if f is None:
+            raise KeyError(f'Unknown metric {name}')
+
+        value = f(self)
+        self._values[name] = value
+        return value
+
+    def maximum(self, values: Union[np.ndarray, List[np.ndarray]]) -> Tuple[float, float]:
+        """
+        :param values: value of something at each sample, or in each of the segments of the trajectory, see
+               `segments`, which are reduced without joining them.
+        :return: first occurrence of the maximum value, and the time it occurred.
+        """
+        if isinstance(values, np.ndarray):
+            values = [values]
+
+        best, index, start = None, 0, 0
+        for segment in values:
+            if len(segment) > 0:
+                i = int(np.argmax(segment))
+                if best is None or segment[i] > best:
+                    best, index = float(segment[i]), start + i
+            start += len(segment)
+
+        if best is None:
+            raise ValueError('Trajectory has no samples')
+        return best, self.value('time_s', index)
+
+    def event_time(self, name: str) -> Optional[float]:
+        """
+        :return: time of first occurrence of event, or None if it did not occur.
+        """
+        for t, event in self.get('events'):
+            if event == name:
+                return t
+        return None
+
+
+@metric('apogee')
+def _apogee(a: Analysis) -> Tuple[float, float]:
+    return a.maximum(a.segments('dist_m'))
+
+
+@metric('maximum_velocity')
+def _maximum_velocity(a: Analysis) -> Tuple[float, float]:
+    return a.maximum(a.segments('velocity_ms'))
+
+
+@metric('maximum_acceleration')
+def _maximum_acceleration(a: Analysis) -> Tuple[float, float]:
+    return a.maximum(a.segments('accel_ms2'))
+
+
+@metric('maximum_g_force')
+def _maximum_g_force(a: Analysis) -> Tuple[float, float]:
+    accel, t = a.get('maximum_acceleration')
+    return accel/_G, t
+
+
+@metric('events')
+def _events(a: Analysis) -> List[Tuple[float, str]]:
+    es = [(a.value('time_s', i), name) for i, name in a.trajectory.events]
+
+    _, t = a.get('apogee')
+    es.append((t, 'Apogee'))
+
+    return es
+
+
+@metric('impact_velocity')
+def _impact_velocity(a: Analysis) -> float:
+    if a.touchdown is not None:
+        return a.touchdown[1]
+    return a.value('velocity_ms', -1)
+
+
+@metric('total_time')
+def _total_time(a: Analysis) -> float:
+    if a.touchdown is not None:
+        return a.touchdown[0]
+    return a.value('time_s', -1)
+
+
+@metric('burnout_time')
+def _burnout_time(a: Analysis) -> Optional[float]:
+    """
+    Time of the first sample without thrust after the last sample with thrust, or None if there was never thrust.
+    """
+    burning = np.flatnonzero(a.column('thrust_N') > 0.0)
+    if len(burning) == 0:
+        return None
+
+    ts = a.column('time_s')
+    return float(ts[min(burning[-1] + 1, len(ts) - 1)])
+
+
+@metric('maximum_dynamic_pressure')
+def _maximum_dynamic_pressure(a: Analysis) -> Tuple[float, float]:
+    """
+    Highest 0.5*rho*V^2 (Pa) of the air flowing over the vehicle, and the time it occurred.
+    """
+    atmosphere = a.atmosphere or DEFAULT
+    pressures = []
+    for dist, v in zip(a.segments('dist_m'), a.segments('velocity_ms')):
+        density, _, _, wind = atmosphere.evaluate(dist)
+        pressures.append(0.5 * density * (v*v + wind*wind))
+    return a.maximum(pressures)
+
+
+@metric('maximum_drag')
+def _maximum_drag(a: Analysis) -> Tuple[float, float]:
+    """
+    Largest magnitude of drag (N), in either direction, and the time it occurred.
+    """
+    return a.maximum([np.abs(s) for s in a.segments('air_resistance_N')])
+
+
+@metric('parachute_descent_rate')
+def _parachute_descent_rate(a: Analysis) -> Optional[float]:
+    """
+    Average speed of descent (m/s) from the parachute being ejected to the end of the trajectory, or None if it was
+    never ejected.
+    """
+    t0 = a.event_time('Parachute')
+    if t0 is None:
+        return None
+
+    ts = a.column('time_s')
+    dist = a.column('dist_m')
+    i = int(np.searchsorted(ts, t0))
+    if ts[-1] <= ts[i]:
+        return None
+    return float((dist[i] - dist[-1]) / (ts[-1] - ts[i]))
@@ -0,0 +1,216 @@
+"""
+Properties of the air, and gravity, as a function of altitude. Vehicles without an atmosphere use constant sea level
+air density and gravity.
+"""
+from typing import Optional, Tuple
+import math
+import numpy as np
+from .curves import Curve
+from .stage import Stage
+
+# Universal gas constant (J/(mol K)), molar mass of air (kg/mol), and ratio of specific heats of air, as in ISA 1976.
+_R = 8.31432
+_M = 0.0289644
+_GAMMA = 1.4
+
+# Standard gravity (m/s2) and effective radius of the Earth (m) used to convert to geopotential altitude.
+_G0 = 9.80665
+_EARTH_RADIUS_M = 6356766.0
+
+# Base geopotential altitude (m) and temperature lapse rate (K/m) of each layer of the ISA 1976 model up to 86 km.
+_LAYERS = [(0.0, -0.0065), (11000.0, 0.0), (20000.0, 0.001), (32000.0, 0.0028), (47000.0, 0.0), (51000.0, -0.0028),
+           (71000.0, -0.002)]
+_SEA_LEVEL_TEMPERATURE_K = 288.15
+_SEA_LEVEL_PRESSURE_PA = 101325.0
+
+
+class Atmosphere:
+    """
+    Air density, gravity, speed of sound, and horizontal wind speed at each altitude.
+
+    The simulation is one dimensional, so the vehicle is assumed to stay upright and not drift with the wind. Wind
+    only increases the speed of the air over the vehicle, and so its drag.
+    """
+
+    def at(self, altitude_m: float) -> Tuple[float, float, float, float]:
+        """
+        :return: density (kg/m3), gravity (m/s2), speed of sound (m/s), and wind speed (m/s) at the altitude.
+        """
+        raise NotImplementedError
+
+    def evaluate(self, altitudes_m: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: same as `at`, for each altitude.
+        """
+        raise NotImplementedError
+
+    @property
+    def minimum_gravity_ms2(self) -> float:
+        """
+        :return: lowest gravity at any altitude.
+        """
+        raise NotImplementedError
+
+
+def _wind_at(wind: Optional[Curve], altitude_m: float) -> float:
+    return 0.0 if wind is None else wind.value(altitude_m)
+
+
+def _wind_evaluate(wind: Optional[Curve], altitudes_m: np.ndarray) -> np.ndarray:
+    return np.zeros(len(altitudes_m)) if wind is None else wind.evaluate(altitudes_m)
+
+
+class ConstantAtmosphere(Atmosphere):
+    """
+    Same air and gravity at every altitude. With the default values, gives the same results as a vehicle without an
+    atmosphere.
+    """
+    density_kg_m3: float
+    gravity_ms2: float
+    speed_of_sound_ms: float
+    wind: Optional[Curve]
+
+    def __init__(self, density_kg_m3: float = 1.2, gravity_ms2: float = 9.81, speed_of_sound_ms: float = 340.29,
+                 wind: Optional[Curve] = None):
+        """
+        :param wind: horizontal wind speed over altitude, or None for still air.
+        """
+        self.density_kg_m3 = density_kg_m3
+        self.gravity_ms2 = gravity_ms2
+        self.speed_of_sound_ms = speed_of_sound_ms
+        self.wind = wind
+
+    def at(self, altitude_m: float) -> Tuple[float, float, float, float]:
+        return self.density_kg_m3, self.gravity_ms2, self.speed_of_sound_ms, _wind_at(self.wind, altitude_m)
+
+    def evaluate(self, altitudes_m: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        n = len(altitudes_m)
+        return (np.full(n, self.density_kg_m3), np.full(n, self.gravity_ms2), np.full(n, self.speed_of_sound_ms),
+                _wind_evaluate(self.wind, altitudes_m))
+
+    @property
+    def minimum_gravity_ms2(self) -> float:
+        return self.gravity_ms2
+
+
+def isa_1976(altitudes_m: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    International Standard Atmosphere (1976), up to 86 km.
+    :param altitudes_m: geometric altitudes.
+    :return: temperature (K), pressure (Pa), and density (kg/m3) at each altitude.
+    """
+    h = np.asarray(altitudes_m, dtype=np.float64)
+    geopotential = _EARTH_RADIUS_M * h / (_EARTH_RADIUS_M + h)
+
+    temperature = np.empty_like(h)
+    pressure = np.empty_like(h)
+    base_t = _SEA_LEVEL_TEMPERATURE_K
+    base_p = _SEA_LEVEL_PRESSURE_PA
+    k = _G0 * _M / _R
+
+    for j, (base_h, lapse) in enumerate(_LAYERS):
+        top_h = _LAYERS[j + 1][0] if j + 1 < len(_LAYERS) else np.inf
+        in_layer = (geopotential >= base_h) | (j == 0)
+        in_layer &= geopotential < top_h
+        dh = geopotential[in_layer] - base_h
+
+        if lapse == 0.0:
+            temperature[in_layer] = base_t
+            pressure[in_layer] = base_p * np.exp(-k * dh / base_t)
+        else:
+            temperature[in_layer] = base_t + lapse * dh
+            pressure[in_layer] = base_p * (base_t / temperature[in_layer]) ** (k / lapse)
+
+        # Conditions at the base of the next layer.
+        if np.isfinite(top_h):
+            top_t = base_t + lapse * (top_h - base_h)
+            if lapse == 0.0:
+                base_p = base_p * math.exp(-k * (top_h - base_h) / base_t)
+            else:
+                base_p = base_p * (base_t / top_t) ** (k / lapse)
+            base_t = top_t
+
+    density = pressure * _M / (_R * temperature)
+    return temperature, pressure, density
+
+
+class StandardAtmosphere(Atmosphere):
+    """
+    ISA 1976 atmosphere, with gravity falling with the square of distance from the centre of the Earth. Precomputed
+    into tables at evenly spaced altitudes, so finding the properties at an altitude is a single interpolation.
+    Above the top of the table, the properties at the top are used.
+    """
+    max_altitude_m: float
+    resolution_m: float
+    wind: Optional[Curve]
+
+    def __init__(self, max_altitude_m: float = 86000.0, resolution_m: float = 10.0, wind: Optional[Curve] = None):
+        """
+        :param max_altitude_m: highest altitude to tabulate, at most 86 km.
+        :param resolution_m: spacing of altitudes in the tables.
+        :param wind: horizontal wind speed over altitude, or None for still air.
+        """
+        if max_altitude_m > 86000.0:
+            raise ValueError('ISA 1976 tables are only computed up to 86 km')
+
+        self.max_altitude_m = max_altitude_m
+        self.resolution_m = resolution_m
+        self.wind = wind
+
+        altitudes = resolution_m * np.arange(int(math.ceil(max_altitude_m / resolution_m)) + 1)
+        temperature, _, density = isa_1976(altitudes)
+        gravity = _G0 * (_EARTH_RADIUS_M / (_EARTH_RADIUS_M + altitudes))**2
+        speed_of_sound = np.sqrt(_GAMMA * _R / _M * temperature)
+
+        self.density = Curve(altitudes, density)
+        self.gravity = Curve(altitudes, gravity)
+        self.speed_of_sound = Curve(altitudes, speed_of_sound)
+        self.temperature = Curve(altitudes, temperature)
+
+    def at(self, altitude_m: float) -> Tuple[float, float, float, float]:
+        # Every table is sampled at the same altitudes, so only needs to be searched once.
+        i, offset = self.density.segment(altitude_m)
+        return (self.density.segment_value(i, offset), self.gravity.segment_value(i, offset),
+                self.speed_of_sound.segment_value(i, offset), _wind_at(self.wind, altitude_m))
+
+    def evaluate(self, altitudes_m: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return (self.density.evaluate(altitudes_m), self.gravity.evaluate(altitudes_m),
+                self.speed_of_sound.evaluate(altitudes_m), _wind_evaluate(self.wind, altitudes_m))
+
+    @property
+    def minimum_gravity_ms2(self) -> float:
+        return float(self.gravity.values[-1])
+
+
+def power_law_wind(speed_ms: float, reference_altitude_m: float = 10.0, exponent: float = 1/7,
+                   max_altitude_m: float = 2000.0, resolution_m: float = 10.0) -> Curve:
+    """
+    Wind profile of the atmospheric boundary layer, speed*(altitude/reference_altitude)^exponent, held constant above
+    `max_altitude_m`.
+    :param speed_ms: wind speed at the reference altitude.
+    :return: wind speed over altitude, for use as the wind of an atmosphere.
+    """
+    altitudes = resolution_m * np.arange(int(math.ceil(max_altitude_m / resolution_m)) + 1)
+    return Curve(altitudes, speed_ms * (altitudes / reference_altitude_m) ** exponent)
+
+
+DEFAULT = ConstantAtmosphere()
+
+
+def drag_and_gravity(stage: Stage, altitude_m: float, velocity_ms: float, atmosphere: Optional[Atmosphere]) \
+        -> Tuple[float, float]:
+    """
+    :param stage: current stage, whose drag coefficient is either constant, or a Curve over Mach number.
+    :param atmosphere: atmosphere the vehicle is flying through, or None for constant sea level conditions.
+    :return: upwards drag force (N) and gravity (m/s2).
+    """
+    density, gravity, speed_of_sound, wind = (atmosphere or DEFAULT).at(altitude_m)
+    # Rather than hypot, so batches of vehicles, using NumPy, get identical results.
+    airspeed = abs(velocity_ms) if wind == 0.0 else math.sqrt(velocity_ms*velocity_ms + wind*wind)
+
+    cd = stage.drag_coefficient
+    if isinstance(cd, Curve):
+        cd = cd.value(airspeed / speed_of_sound)
+
+    # 0.5*rho*Cd*A*V*|V_air|, the same as 0.5*rho*Cd*A*SIGN(V)*V^2 in still air.
+    return 0.5 * density * cd * stage.area_m2 * velocity_ms * airspeed, gravity
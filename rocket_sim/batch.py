@@ -0,0 +1,517 @@
+from typing import List, Optional, Tuple, Dict
+import numpy as np
+from .flight_comp import Action, CompState, Id, Timer
+from .transitions import TransitionTable
+from .stage import Stage, Const, Linear
+from .curves import Curve
+from .state import VehicleState
+from .vehicle import Vehicle
+from .trajectory import Trajectory, FIELDS
+from .simulations import Simulation
+from .atmosphere import Atmosphere, DEFAULT
+
+# Kinds of stage function which can be evaluated on arrays.
+_CONST = 0
+_LINEAR = 1
+_CURVE = 2
+_OTHER = 3
+
+
+def _kind(f) -> int:
+    """
+    :param f: stage function, e.g. f_thrust_N.
+    :return: how to evaluate the function in the batch.
+    """
+    if type(f) is Const:
+        return _CONST
+    if type(f) is Linear:
+        return _LINEAR
+    if isinstance(f, Curve):
+        return _CURVE
+    return _OTHER
+
+
+class _CurveTable:
+    """
+    Every curve stage function in the batch, padded into arrays so they can all be evaluated at once.
+    """
+
+    def __init__(self, fs: List[Optional[Curve]]):
+        """
+        :param fs: stage function of each stage row, or None if the row does not use a curve.
+        """
+        groups: Dict[Tuple[bytes, bytes], int] = {}
+        curves: List[Curve] = []
+        self.group = np.zeros(len(fs), dtype=np.int64)
+        for i, f in enumerate(fs):
+            if f is not None:
+                key = (f.times.tobytes(), f.values.tobytes())
+                if key not in groups:
+                    groups[key] = len(curves)
+                    curves.append(f)
+                self.group[i] = groups[key]
+
+        curves = curves or [Curve([0.0], [0.0])]
+        width = max(len(c) for c in curves)
+        self.count = np.array([len(c) for c in curves], dtype=np.int64)
+        self.first = np.array([c.times[0] for c in curves])
+        self.last = np.array([c.times[-1] for c in curves])
+        self.uniform = np.array([c.step_s is not None for c in curves])
+        self.step = np.array([c.step_s or 1.0 for c in curves])
+
+        self.times = np.zeros((len(curves), width))
+        self.values = np.zeros((len(curves), width))
+        self.slopes = np.zeros((len(curves), width))
+        for g, c in enumerate(curves):
+            self.times[g, :len(c)] = c.times
+            self.values[g, :len(c)] = c.values
+            self.slopes[g, :len(c)] = c.slopes
+
+        # Times of all curves relative to their first sample, offset so that they can be searched together.
+        span = float(np.max(self.last - self.first)) + 1.0
+        self.offset = span * np.arange(len(curves))
+        self.start = np.concatenate(([0], np.cumsum(self.count)[:-1]))
+        self.keys = np.concatenate([self.offset[g] + (c.times - c.times[0]) for g, c in enumerate(curves)])
+
+    def evaluate(self, rows: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """
+        :param rows: stage rows using a curve.
+        :param t: stage time of each row.
+        :return: same values as calling the curve of each row at its stage time.
+        """
+        g = self.group[rows]
+        first = self.first[g]
+        last_i = self.count[g] - 1
+        inside = np.clip(t, first, self.last[g])
+
+        uniform_i = ((inside - first) / self.step[g]).astype(np.int64)
+        irregular_i = np.searchsorted(self.keys, self.offset[g] + (inside - first), side='right') - 1 - self.start[g]
+        i = np.clip(np.where(self.uniform[g], uniform_i, irregular_i), 0, np.maximum(last_i - 1, 0))
+
+        result = self.values[g, i] + self.slopes[g, i] * (inside - self.times[g, i])
+        result = np.where(t <= first, self.values[g, 0], result)
+        return np.where(t >= self.last[g], self.values[g, last_i], result)
+
+
+def _is_passive(comp: CompState) -> bool:
+    """
+    :return: whether the computer state can never perform an action or change, in which case it does not need to be
+        evaluated each step.
+    """
+    return type(comp) is Id and len(comp.ts) == 0
+
+
+class _StageTable:
+    """
+    Parameters of every stage of every vehicle in the batch, one row per stage.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        def col(get) -> np.ndarray:
+            return np.array([get(s) for s in stages], dtype=np.float64)
+
+        self.stages = stages
+        self.stage_time_s = col(lambda s: s.stage_time_s)
+        # Same order of operations as Stage.total_mass_kg and VehicleState.step, so results are identical.
+        self.dry_mass_kg = col(lambda s: s.engine_case_mass_kg + s.empty_mass_kg)
+        self.drag_factor = col(lambda s: 0.0 if isinstance(s.drag_coefficient, Curve) else
+                               0.5 * 1.2 * s.drag_coefficient * s.area_m2)
+        self.propellant_mass_kg = col(lambda s: s.propellant_mass_kg)
+        self.thrust_N = col(lambda s: s.thrust_N)
+
+        self.prop_kind = np.array([_kind(s.f_propellant_mass_kg) for s in stages], dtype=np.int8)
+        self.thrust_kind = np.array([_kind(s.f_thrust_N) for s in stages], dtype=np.int8)
+        # Constant functions are linear functions with a rate of zero.
+        self.prop_rate = col(lambda s: s.f_propellant_mass_kg.dx_per_sec if type(s.f_propellant_mass_kg) is Linear else 0.0)
+        self.thrust_rate = col(lambda s: s.f_thrust_N.dx_per_sec if type(s.f_thrust_N) is Linear else 0.0)
+        self.prop_curves = _CurveTable([s.f_propellant_mass_kg if isinstance(s.f_propellant_mass_kg, Curve) else None
+                                        for s in stages])
+        self.thrust_curves = _CurveTable([s.f_thrust_N if isinstance(s.f_thrust_N, Curve) else None for s in stages])
+
+        # Drag coefficients, which may be curves over Mach number, for vehicles flying through an atmosphere.
+        self.cd_curve = np.array([isinstance(s.drag_coefficient, Curve) for s in stages], dtype=bool)
+        self.cd = col(lambda s: 0.0 if isinstance(s.drag_coefficient, Curve) else s.drag_coefficient)
+        self.area_m2 = col(lambda s: s.area_m2)
+        self.cd_curves = _CurveTable([s.drag_coefficient if isinstance(s.drag_coefficient, Curve) else None
+                                      for s in stages])
+
+
+class _Batch:
+    """
+    State of the vehicles which are still being simulated. Vehicles which have touched down are periodically removed
+    so the arrays only contain vehicles which are still running.
+    """
+    _arrays = ('ids', 'stage_row', 'next_engine', 'running', 'active_comp', 'comp_state', 'timer_rem', 'rows_in_chunk',
+               'elapsed', 'air_group',
+               'stage_time_s', 'dry_mass_kg', 'drag_factor', 'cd', 'cd_curve', 'area_m2', 'propellant_mass_kg', 'thrust',
+               'prop_kind', 'thrust_kind', 'prop_rate', 'thrust_rate', 'time_s', 'mass_kg', 'thrust_N', 'air_resistance_N',
+               'weight_N', 'net_force_N', 'accel_ms2', 'velocity_ms', 'dist_m')
+
+    def __init__(self, vehicles: List[Vehicle]):
+        n = len(vehicles)
+
+        # Lay out stages as: current stage, remaining engine stages, then parachute stage.
+        stages: List[Stage] = []
+        self.stage_row = np.empty(n, dtype=np.int64)
+        self.parachute = np.full(n, -1, dtype=np.int64)
+        self.engines = np.full((n, max(max(len(v.remaining_engine_stages) for v in vehicles), 1)), -1, dtype=np.int64)
+
+        for i, v in enumerate(vehicles):
+            self.stage_row[i] = len(stages)
+            stages.append(v.stage)
+
+            for j, s in enumerate(v.remaining_engine_stages):
+                self.engines[i, j] = len(stages)
+                stages.append(s)
+
+            if v.parachute_stage is not None:
+                self.parachute[i] = len(stages)
+                stages.append(v.parachute_stage)
+
+        self.table = _StageTable(stages)
+
+        # Vehicles without an atmosphere fly through the default one. Each atmosphere is evaluated for all the
+        # vehicles flying through it at once.
+        self.atmospheres: List[Atmosphere] = [DEFAULT]
+        groups: Dict[int, int] = {}
+        self.air_group = np.zeros(n, dtype=np.int64)
+        for i, v in enumerate(vehicles):
+            if v.atmosphere is not None:
+                if id(v.atmosphere) not in groups:
+                    groups[id(v.atmosphere)] = len(self.atmospheres)
+                    self.atmospheres.append(v.atmosphere)
+                self.air_group[i] = groups[id(v.atmosphere)]
+
+        # Constant air density and gravity, and constant drag coefficients, allow a simpler calculation of drag.
+        self.still_air = len(self.atmospheres) == 1 and not self.table.cd_curve.any()
+
+        # Flight computers in declarative states are evaluated together from a compiled table, in which case
+        # comp_state is the index of the state in the table. Otherwise, comp_state is -1 and the computer is
+        # evaluated by calling its transitions.
+        self.transitions = TransitionTable()
+        self.computers: List[CompState] = [v.computer_state for v in vehicles]
+        self.comp_state = np.full(n, -1, dtype=np.int64)
+        self.timer_rem = np.zeros(n)
+        self.active_comp = np.zeros(n, dtype=bool)
+
+        self.ids = np.arange(n)
+        for i, v in enumerate(vehicles):
+            self._enter(i, v.computer_state)
+
+        self.next_engine = np.zeros(n, dtype=np.int64)
+        self.running = np.ones(n, dtype=bool)
+        self.rows_in_chunk = np.zeros(n, dtype=np.int64)
+        self.elapsed = np.zeros(n)
+
+        # Parameters of the current stage of each vehicle.
+        t = self.table
+        rows = self.stage_row
+        self.stage_time_s = t.stage_time_s[rows]
+        self.dry_mass_kg = t.dry_mass_kg[rows]
+        self.drag_factor = t.drag_factor[rows]
+        self.cd = t.cd[rows]
+        self.cd_curve = t.cd_curve[rows]
+        self.area_m2 = t.area_m2[rows]
+        self.propellant_mass_kg = t.propellant_mass_kg[rows]
+        self.thrust = t.thrust_N[rows]
+        self.prop_kind = t.prop_kind[rows]
+        self.thrust_kind = t.thrust_kind[rows]
+        self.prop_rate = t.prop_rate[rows]
+        self.thrust_rate = t.thrust_rate[rows]
+
+        def state_col(get) -> np.ndarray:
+            return np.array([get(v.state) for v in vehicles], dtype=np.float64)
+
+        self.time_s = state_col(lambda s: s.time_s)
+        self.mass_kg = state_col(lambda s: s.mass_kg)
+        self.thrust_N = state_col(lambda s: s.thrust_N)
+        self.air_resistance_N = state_col(lambda s: s.air_resistance_N)
+        self.weight_N = state_col(lambda s: s.weight_N)
+        self.net_force_N = state_col(lambda s: s.net_force_N)
+        self.accel_ms2 = state_col(lambda s: s.accel_ms2)
+        self.velocity_ms = state_col(lambda s: s.velocity_ms)
+        self.dist_m = state_col(lambda s: s.dist_m)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def load_stage(self, k: int, row: int):
+        """
+        :param k: index of vehicle in the batch.
+        :param row: stage the vehicle transitions to.
+        """
+        t = self.table
+        self.stage_row[k] = row
+        self.stage_time_s[k] = t.stage_time_s[row]
+        self.dry_mass_kg[k] = t.dry_mass_kg[row]
+        self.drag_factor[k] = t.drag_factor[row]
+        self.cd[k] = t.cd[row]
+        self.cd_curve[k] = t.cd_curve[row]
+        self.area_m2[k] = t.area_m2[row]
+        self.propellant_mass_kg[k] = t.propellant_mass_kg[row]
+        self.thrust[k] = t.thrust_N[row]
+        self.prop_kind[k] = t.prop_kind[row]
+        self.thrust_kind[k] = t.thrust_kind[row]
+        self.prop_rate[k] = t.prop_rate[row]
+        self.thrust_rate[k] = t.thrust_rate[row]
+
+    def drag_and_gravity(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Equivalent to atmosphere.drag_and_gravity for the current state of each vehicle.
+        :return: drag and gravity of each vehicle.
+        """
+        n = len(self)
+        density = np.empty(n)
+        gravity = np.empty(n)
+        speed_of_sound = np.empty(n)
+        wind = np.empty(n)
+        for g, atmosphere in enumerate(self.atmospheres):
+            ks = np.flatnonzero(self.air_group == g)
+            if len(ks) > 0:
+                density[ks], gravity[ks], speed_of_sound[ks], wind[ks] = atmosphere.evaluate(self.dist_m[ks])
+
+        v = self.velocity_ms
+        airspeed = np.where(wind == 0.0, np.abs(v), np.sqrt(v*v + wind*wind))
+
+        cd = self.cd.copy()
+        curve = self.cd_curve
+        if curve.any():
+            cd[curve] = self.table.cd_curves.evaluate(self.stage_row[curve], airspeed[curve] / speed_of_sound[curve])
+
+        return 0.5 * density * cd * self.area_m2 * v * airspeed, gravity
+
+    def compact(self):
+        """
+        Removes vehicles which are no longer running.
+        """
+        keep = self.running
+        for name in _Batch._arrays:
+            setattr(self, name, getattr(self, name)[keep])
+
+    def _apply(self, kinds: np.ndarray, rates: np.ndarray, curves: _CurveTable, values: np.ndarray, dt: float,
+               get_f) -> np.ndarray:
+        """
+        :param kinds: kind of stage function of each vehicle's stage.
+        :param rates: rate of linear stage functions.
+        :param curves: curve stage functions.
+        :param values: current values of the parameter.
+        :param get_f: returns the stage function from a stage.
+        :return: new values of the parameter.
+        """
+        new = values + rates * dt
+
+        curve = kinds == _CURVE
+        if curve.any():
+            new[curve] = curves.evaluate(self.stage_row[curve], self.stage_time_s[curve])
+
+        for k in np.flatnonzero(kinds == _OTHER):
+            f = get_f(self.table.stages[self.stage_row[k]])
+            new[k] = f(dt, float(self.stage_time_s[k]), float(values[k]))
+
+        return new
+
+    def step_stages(self, dt: float):
+        """
+        Equivalent to Stage.step for the current stage of each vehicle.
+        :param dt: delta time since last step.
+        """
+        t = self.table
+        prop = self.propellant_mass_kg
+        burning = prop > 0.0
+
+        new_prop = self._apply(self.prop_kind, self.prop_rate, t.prop_curves, prop, dt, lambda s: s.f_propellant_mass_kg)
+        new_thrust = self._apply(self.thrust_kind, self.thrust_rate, t.thrust_curves, self.thrust, dt,
+                                 lambda s: s.f_thrust_N)
+
+        self.propellant_mass_kg = np.where(burning, np.maximum(new_prop, 0.0), 0.0)
+        self.thrust = np.where(burning, new_thrust, 0.0)
+        self.stage_time_s += dt
+
+    def _enter(self, k: int, comp: CompState):
+        """
+        :param k: index of vehicle in the batch.
+        :param comp: computer state the vehicle transitions to.
+        """
+        i = self.ids[k]
+        self.computers[i] = comp
+
+        if self.transitions.compilable(comp):
+            s = self.transitions.index(comp)
+            self.comp_state[k] = s
+            self.timer_rem[k] = comp.time_rem_s if type(comp) is Timer else 0.0
+            self.active_comp[k] = self.transitions.arrays().active[s]
+        else:
+            self.comp_state[k] = -1
+            self.active_comp[k] = not _is_passive(comp)
+
+    def _perform(self, k: int, action: Optional[Action]) -> Optional[str]:
+        """
+        Interprets an action of a vehicle's flight computer.
+        :param k: index of vehicle in the batch.
+        :return: name of event which occurred, if any.
+        """
+        i = self.ids[k]
+
+        if action is None:
+            return None
+
+        elif action == Action.NEXT_STAGE:
+            j = self.next_engine[k]
+            if j >= self.engines.shape[1] or self.engines[i, j] < 0:
+                raise RuntimeError('No engine stage to fire')
+            self.load_stage(k, self.engines[i, j])
+            self.next_engine[k] += 1
+            return 'Stage'
+
+        elif action == Action.PARACHUTE:
+            if self.parachute[i] < 0:
+                raise RuntimeError('No parachute to eject')
+            self.load_stage(k, self.parachute[i])
+            return 'Parachute'
+
+        raise RuntimeError('Unknown action')
+
+    def transition(self, k: int, prev: VehicleState, now: VehicleState) -> Optional[str]:
+        """
+        Evaluates the flight computer of a vehicle, which is not in a compiled state, by calling its transitions.
+        :param k: index of vehicle in the batch.
+        :return: name of event which occurred, if any.
+        """
+        comp = self.computers[self.ids[k]]
+        action, next_comp = comp.transition(prev, now)
+        if next_comp is not comp:
+            self._enter(k, next_comp)
+
+        return self._perform(k, action)
+
+    def transition_compiled(self, ks: np.ndarray, now: Tuple[np.ndarray, ...]) -> List[Tuple[int, str]]:
+        """
+        Evaluates the flight computers of vehicles in compiled states, equivalent to calling their transitions.
+        :param ks: indices of vehicles in the batch.
+        :param now: newly computed value of each field, in the order of FIELDS, for every vehicle in the batch.
+        :return: (index of vehicle, name of event) of events which occurred.
+        """
+        table = self.transitions.arrays()
+        states = self.comp_state[ks]
+
+        # Same order of operations as Timer.
+        timer_rem = self.timer_rem[ks] - (now[0][ks] - self.time_s[ks])
+        values = np.stack([column[ks] for column in now] + [timer_rem])
+        rows = table.evaluate(states, values)
+
+        counting = (rows < 0) & table.counting_down[states]
+        self.timer_rem[ks[counting]] = timer_rem[counting]
+
+        events = []
+        for j in np.flatnonzero(rows >= 0):
+            k = ks[j]
+            self._enter(k, table.states[table.row_target(states[j], rows[j])])
+            event = self._perform(k, table.row_action(states[j], rows[j]))
+            if event is not None:
+                events.append((k, event))
+
+        return events
+
+
+def simulate_batch(vehicles: List[Vehicle], dt: float, chunk_size: int = 4096) -> List[Simulation]:
+    """
+    Simulates many vehicles in lockstep, performing the physics and stage updates of every vehicle with array
+    operations. Flight computers whose transitions are declarative (see `transitions.When`) are evaluated together
+    from a compiled table. Stage functions other than `const`, `linear`, and curves (including `lerp`), and other
+    flight computer transitions, are evaluated per-vehicle.
+    :param vehicles: vehicles to simulate.
+    :param dt: time step, i.e. resolution.
+    :param chunk_size: number of steps to buffer before copying into each vehicle's trajectory.
+    :return: simulation of each vehicle, in the same order as `vehicles`, equivalent to calling `simulate`.
+    """
+    if len(vehicles) == 0:
+        return []
+
+    b = _Batch(vehicles)
+    trajectories = [Trajectory() for _ in vehicles]
+    chunk_events: List[List[Tuple[int, str]]] = [[] for _ in vehicles]
+    buffer = np.empty((len(FIELDS), chunk_size, len(b)), dtype=np.float64)
+    row = 0
+
+    def flush():
+        # Transpose once so each vehicle's samples are contiguous.
+        per_vehicle = np.ascontiguousarray(buffer[:, :row, :].transpose(2, 0, 1))
+        for k in np.flatnonzero(b.rows_in_chunk):
+            i = b.ids[k]
+            trajectories[i].extend(per_vehicle[k, :, :b.rows_in_chunk[k]], chunk_events[i])
+            chunk_events[i] = []
+        b.rows_in_chunk[:] = 0
+
+    while True:
+        v = b.velocity_ms
+        new_time = b.time_s + dt
+        new_mass = b.dry_mass_kg + b.propellant_mass_kg
+
+        if b.still_air:
+            # 0.5*rho*Cd*A*SIGN(V)*V^2
+            new_air = b.drag_factor * v * np.abs(v)
+            new_weight = new_mass * 9.81
+        else:
+            new_air, gravity = b.drag_and_gravity()
+            new_weight = new_mass * gravity
+        new_thrust = b.thrust.copy()
+        new_net = new_thrust - new_weight - new_air
+        new_accel = new_net / new_mass
+        new_velocity = v + new_accel * dt
+        new_dist = b.dist_m + v * dt + 0.5 * b.accel_ms2 * dt**2
+
+        # Flight computers are evaluated against the previous and newly computed state.
+        active = np.flatnonzero(b.active_comp & b.running)
+        if len(active) > 0:
+            compiled = active[b.comp_state[active] >= 0]
+            if len(compiled) > 0:
+                now = (new_time, new_mass, new_thrust, new_air, new_weight, new_net, new_accel, new_velocity, new_dist)
+                for k, event in b.transition_compiled(compiled, now):
+                    chunk_events[b.ids[k]].append((row, event))
+
+            for k in active[b.comp_state[active] < 0]:
+                prev = VehicleState(None, b.time_s[k], b.mass_kg[k], b.thrust_N[k], b.air_resistance_N[k],
+                                    b.weight_N[k], b.net_force_N[k], b.accel_ms2[k], b.velocity_ms[k], b.dist_m[k])
+                now = VehicleState(None, new_time[k], new_mass[k], new_thrust[k], new_air[k], new_weight[k],
+                                   new_net[k], new_accel[k], new_velocity[k], new_dist[k])
+
+                event = b.transition(k, prev, now)
+                if event is not None:
+                    chunk_events[b.ids[k]].append((row, event))
+
+        b.step_stages(dt)
+
+        b.time_s = new_time
+        b.mass_kg = new_mass
+        b.thrust_N = new_thrust
+        b.air_resistance_N = new_air
+        b.weight_N = new_weight
+        b.net_force_N = new_net
+        b.accel_ms2 = new_accel
+        b.velocity_ms = new_velocity
+        b.dist_m = new_dist
+
+        for f, values in enumerate((new_time, new_mass, new_thrust, new_air, new_weight, new_net, new_accel,
+                                    new_velocity, new_dist)):
+            buffer[f, row] = values
+        b.rows_in_chunk += b.running
+        row += 1
+
+        b.elapsed += dt
+        b.running &= ~((new_velocity < 0) & (new_dist <= 0) & (b.elapsed >= 5.0))
+        remaining = np.count_nonzero(b.running)
+
+        if remaining == 0:
+            break
+
+        # Stop spending time on vehicles which have touched down once they make up a large part of the batch.
+        if row == chunk_size or remaining <= len(b) // 2:
+            flush()
+            row = 0
+
+            if remaining <= len(b) // 2:
+                b.compact()
+                buffer = np.empty((len(FIELDS), chunk_size, len(b)), dtype=np.float64)
+
+    flush()
+    return [Simulation(t, atmosphere=v.atmosphere) for t, v in zip(trajectories, vehicles)]
@@ -0,0 +1,292 @@
+from collections import OrderedDict
+from enum import Enum
+from typing import Optional, Dict, Any
+import glob
+import hashlib
+import os
+import types
+import numpy as np
+from .vehicle import Vehicle
+from .simulations import Simulation, simulate
+
+# Increment when a change to the simulation would change the results of a cached vehicle.
+_VERSION = 1
+
+# Attributes which are buffers, or copies of other attributes, so do not affect the result of a simulation.
+_IGNORED_ATTRIBUTES = ('_scratch', '_times', '_values', '_slopes')
+
+
+class Unfingerprintable(Exception):
+    """
+    Raised when part of a vehicle, e.g. a user callable, cannot be reliably identified by its contents.
+    """
+    pass
+
+
+def _slots(cls) -> list:
+    names = []
+    for c in reversed(cls.__mro__):
+        for name in getattr(c, '__slots__', ()):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+class _Hasher:
+    """
+    Hashes objects by their contents. Objects reachable more than once, e.g. flight computer states which reference
+    each other through their transitions, are hashed by the order in which they were first reached.
+    """
+
+    def __init__(self):
+        self._h = hashlib.sha256()
+        self._seen: Dict[int, int] = {}
+        # Keeps visited objects alive so their ids are not reused while hashing.
+        self._alive = []
+
+    def _write(self, *parts):
+        for p in parts:
+            self._h.update(str(p).encode('utf-8'))
+            self._h.update(b'\x00')
+
+    def digest(self) -> str:
+        return self._h.hexdigest()
+
+    def feed(self, obj: Any):
+        if obj is None or isinstance(obj, (bool, int, float, str, complex)):
+            self._write(type(obj).__name__, repr(obj))
+            return
+
+        if isinstance(obj, bytes):
+            self._write('bytes', obj.hex())
+            return
+
+        if isinstance(obj, np.generic):
+            self._write('np', obj.dtype.str, repr(obj.item()))
+            return
+
+        if isinstance(obj, type):
+            self._write('type', obj.__module__, obj.__qualname__)
+            return
+
+        if isinstance(obj, Enum):
+            self._write('enum', type(obj).__module__, type(obj).__qualname__, obj.name)
+            return
+
+        if isinstance(obj, types.ModuleType):
+            self._write('module', obj.__name__)
+            return
+
+        if isinstance(obj, types.BuiltinFunctionType):
+            self._write('builtin', obj.__module__, obj.__qualname__)
+            return
+
+        if id(obj) in self._seen:
+            self._write('ref', self._seen[id(obj)])
+            return
+        self._seen[id(obj)] = len(self._seen)
+        self._alive.append(obj)
+
+        if isinstance(obj, (list, tuple)):
+            self._write(type(obj).__name__, len(obj))
+            for x in obj:
+                self.feed(x)
+
+        elif isinstance(obj, dict):
+            self._write('dict', len(obj))
+            for k in sorted(obj, key=repr):
+                self.feed(k)
+                self.feed(obj[k])
+
+        elif isinstance(obj, np.ndarray):
+            self._write('ndarray', obj.dtype.str, obj.shape)
+            self._h.update(np.ascontiguousarray(obj).tobytes())
+
+        elif isinstance(obj, types.FunctionType):
+            self._feed_function(obj)
+
+        elif isinstance(obj, types.MethodType):
+            self._write('method')
+            self.feed(obj.__func__)
+            self.feed(obj.__self__)
+
+        elif isinstance(obj, types.CodeType):
+            self._write('code', obj.co_code.hex(), obj.co_names, obj.co_varnames, obj.co_freevars)
+            self.feed(obj.co_consts)
+
+        elif type(obj).__module__.split('.')[0] == 'rocket_sim':
+            # Vehicle definitions: stages, stage functions, computer states, etc.
+            self._write('object', type(obj).__module__, type(obj).__qualname__)
+            attrs = getattr(obj, '__dict__', {})
+            for name in _slots(type(obj)):
+                if name in _IGNORED_ATTRIBUTES:
+                    continue
+                self._write(name)
+                self.feed(getattr(obj, name, None))
+            for name in sorted(attrs):
+                if name in _IGNORED_ATTRIBUTES:
+                    continue
+                self._write(name)
+                self.feed(attrs[name])
+
+        else:
+            raise Unfingerprintable(f'Cannot fingerprint {type(obj).__qualname__}')
+
+    def _feed_function(self, f: types.FunctionType):
+        """
+        Functions are identified by their code, defaults, captured variables, and the globals they use.
+        """
+        self._write('function', f.__module__, f.__qualname__)
+        self.feed(f.__code__)
+        self.feed(f.__defaults__)
+        self.feed(f.__kwdefaults__)
+        try:
+            cells = [c.cell_contents for c in (f.__closure__ or ())]
+        except ValueError:
+            # A variable the function captures which has not been assigned yet.
+            raise Unfingerprintable(f'Cannot fingerprint {f.__qualname__}, as a variable it captures is unassigned')
+        self.feed(cells)
+
+        def global_names(code: types.CodeType) -> list:
+            names = list(code.co_names)
+            for const in code.co_consts:
+                if isinstance(const, types.CodeType):
+                    names.extend(global_names(const))
+            return names
+
+        for name in sorted(set(global_names(f.__code__))):
+            if name in f.__globals__:
+                self._write(name)
+                self.feed(f.__globals__[name])
+
+
+def fingerprint(obj: Any) -> str:
+    """
+    :param obj: vehicle, or other part of a simulation's definition.
+    :return: hash of the contents of the object.
+    :raises Unfingerprintable: if the object contains something which cannot be hashed by its contents.
+    """
+    hasher = _Hasher()
+    hasher.feed(obj)
+    return hasher.digest()
+
+
+class SimulationCache:
+    """
+    Memoizes `simulate`, keyed on the contents of the vehicle and the simulation options. Results are held in an
+    in-memory LRU, and optionally in a directory of trajectory files with a maximum total size.
+    """
+    max_entries: int
+    directory: Optional[str]
+    max_disk_bytes: int
+
+    hits: int
+    misses: int
+    uncacheable: int
+
+    def __init__(self, max_entries: int = 32, directory: Optional[str] = None, max_disk_bytes: int = 1 << 30):
+        """
+        :param max_entries: number of simulations to keep in memory.
+        :param directory: directory to store simulations in, or None to only cache in memory.
+        :param max_disk_bytes: maximum total size of the files in `directory`. Least recently used files are removed
+               first.
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: 'OrderedDict[str, Simulation]' = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, vehicle: Vehicle, dt: float, **options) -> Optional[str]:
+        """
+        :return: key of the simulation, or None if the vehicle cannot be fingerprinted.
+        """
+        try:
+            return fingerprint((_VERSION, vehicle, dt, options))
+        except Unfingerprintable:
+            return None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.traj')
+
+    def get(self, key: str) -> Optional[Simulation]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        if self.directory is not None and os.path.exists(self._path(key)):
+            # Mark as recently used for eviction.
+            os.utime(self._path(key))
+            sim = Simulation.load(self._path(key))
+            self._remember(key, sim)
+            return sim
+
+        return None
+
+    def _remember(self, key: str, sim: Simulation):
+        self._memory[key] = sim
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, sim: Simulation, dt: Optional[float] = None):
+        self._remember(key, sim)
+
+        if self.directory is not None:
+            sim.save(self._path(key), dt)
+            self._evict()
+
+    def _evict(self):
+        """
+        Removes least recently used files until the directory is within its size limit.
+        """
+        files = [(os.path.getmtime(p), os.path.getsize(p), p) for p in glob.glob(os.path.join(self.directory, '*.traj'))]
+        total = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory is not None:
+            for path in glob.glob(os.path.join(self.directory, '*.traj')):
+                os.remove(path)
+
+    def simulate(self, vehicle: Vehicle, dt: float, **options) -> Simulation:
+        """
+        Same as `simulate`, but returns a cached result if the same vehicle has been simulated with the same options.
+        Vehicles which cannot be fingerprinted are always simulated.
+        """
+        key = self.key(vehicle, dt, **options)
+        if key is None:
+            self.uncacheable += 1
+            return simulate(vehicle, dt, **options)
+
+        sim = self.get(key)
+        if sim is not None:
+            self.hits += 1
+            return sim
+
+        self.misses += 1
+        sim = simulate(vehicle, dt, **options)
+        self.put(key, sim, dt)
+        return sim
+
+
+default_cache = SimulationCache()
+
+
+def cached_simulate(vehicle: Vehicle, dt: float, **options) -> Simulation:
+    """
+    `simulate` using the default, in-memory, cache.
+    """
+    return default_cache.simulate(vehicle, dt, **options)
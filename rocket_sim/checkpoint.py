@@ -0,0 +1,98 @@
+"""
+Checkpoints part way through a flight, from which variants of the vehicle are simulated without repeating the flight
+up to the checkpoint, e.g. sweeping the parachute of a vehicle while simulating its ascent once:
+
+    start = checkpoint(single_stage_parachute()[0], dt=0.001, at=AtApogee())
+    sims = start.simulate_variants([lambda v, a=a: setattr(v.parachute_stage, 'area_m2', a) for a in areas])
+
+The trajectory of each variant shares the samples before the checkpoint, see ForkedTrajectory.
+"""
+from typing import Callable, List, Optional
+import copy
+from .vehicle import Vehicle
+from .trajectory import Trajectory, ForkedTrajectory
+from .simulations import Simulation, _Run
+from .stop import StopCondition
+from .kernel import compatible, simulate_kernel
+
+
+class Checkpoint:
+    """
+    Snapshot of a vehicle part way through its flight: its stages, flight computer state, and state, with the
+    trajectory up to that point.
+    """
+    vehicle: Vehicle
+    trajectory: Trajectory
+    dt: float
+    elapsed_s: float
+
+    def __init__(self, vehicle: Vehicle, trajectory: Trajectory, dt: float, elapsed_s: float):
+        """
+        :param vehicle: vehicle at the checkpoint. It is not modified.
+        :param trajectory: states of the vehicle up to and including the checkpoint.
+        :param dt: time step the vehicle was simulated with.
+        :param elapsed_s: time the vehicle was simulated for.
+        """
+        self.vehicle = vehicle
+        self.trajectory = trajectory
+        self.dt = dt
+        self.elapsed_s = elapsed_s
+
+    def fork(self, modify: Optional[Callable[[Vehicle], None]] = None) -> Vehicle:
+        """
+        :param modify: changes the copy of the vehicle, e.g. the area of its parachute, or the thresholds of its
+               flight computer's transitions.
+        :return: independent copy of the vehicle at the checkpoint.
+        """
+        # The atmosphere is not changed by simulating, so is shared.
+        atmosphere = self.vehicle.atmosphere
+        vehicle = copy.deepcopy(self.vehicle, {id(atmosphere): atmosphere})
+        if modify is not None:
+            modify(vehicle)
+        return vehicle
+
+    def simulate(self, vehicle: Optional[Vehicle] = None, kernel: bool = True) -> Simulation:
+        """
+        Continues the flight from the checkpoint until the vehicle returns to the ground.
+        :param vehicle: vehicle to continue with, e.g. from `fork`. By default, the vehicle at the checkpoint.
+        :param kernel: use the numeric kernel when the vehicle is compatible, see `simulate`.
+        :return: whole flight, whose trajectory shares the states up to the checkpoint.
+        """
+        if vehicle is None:
+            vehicle = self.fork()
+
+        trajectory = ForkedTrajectory(self.trajectory)
+        if kernel and compatible(vehicle):
+            simulate_kernel(vehicle, self.dt, trajectory=trajectory, elapsed_s=self.elapsed_s)
+        else:
+            for state in _Run(vehicle, self.dt, True, None, elapsed_s=self.elapsed_s):
+                trajectory.append(state)
+
+        return Simulation(trajectory, atmosphere=vehicle.atmosphere)
+
+    def simulate_variants(self, modifications: List[Callable[[Vehicle], None]], kernel: bool = True) \
+            -> List[Simulation]:
+        """
+        :param modifications: changes to make to the vehicle at the checkpoint for each variant, see `fork`.
+        :return: whole flight of each variant.
+        """
+        return [self.simulate(self.fork(m), kernel) for m in modifications]
+
+
+def checkpoint(vehicle: Vehicle, dt: float, at: StopCondition) -> Checkpoint:
+    """
+    Simulates a vehicle up to a point in its flight.
+    :param vehicle: vehicle to simulate. It is not modified.
+    :param dt: time step, i.e. resolution.
+    :param at: condition at which to take the checkpoint, e.g. AtApogee(), or AtEvent('Stage') for when the next
+           stage is fired.
+    :raise ValueError: if the vehicle returns to the ground before the checkpoint.
+    """
+    trajectory = Trajectory()
+    run = _Run(vehicle, dt, True, at)
+    for state in run:
+        trajectory.append(state)
+
+    if run.stopped_by is None:
+        raise ValueError('The vehicle returned to the ground before the checkpoint')
+    return Checkpoint(run.vehicle, trajectory, dt, run.elapsed_s)
@@ -0,0 +1,140 @@
+"""
+Command line runner, which simulates vehicles and prints a summary of each flight:
+
+    python -m rocket_sim three_stage single_stage_parachute --dt 0.1 0.01
+    python -m rocket_sim rocket.toml vehicle_examples:three_stage --format json --workers 4
+    python -m rocket_sim three_stage --dt 0.1 --plot
+
+Vehicles are the names of examples in vehicle_examples.py, factories as 'module:name', or spec files, see
+rocket_sim.spec. Only the modules needed are imported, and plotting libraries only when plots are requested, so
+summaries are quick enough to drive from shell loops.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import os
+import sys
+
+# Summary of a flight, in column order.
+COLUMNS = ['vehicle', 'dt', 'apogee_m', 'apogee_time_s', 'maximum_velocity_ms', 'maximum_velocity_time_s',
+           'maximum_g_force', 'maximum_g_force_time_s', 'impact_velocity_ms', 'total_time_s', 'events']
+
+_SPEC_EXTENSIONS = ('.json', '.toml')
+
+
+def _factory(vehicle: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    :return: path of the factory which builds the vehicle, as 'module:name', and its parameters, as in FactorySpec.
+    """
+    if vehicle.endswith(_SPEC_EXTENSIONS):
+        if not os.path.isfile(vehicle):
+            raise ValueError(f'Spec file {vehicle} does not exist')
+        return 'rocket_sim.spec:load_vehicle', {'path': vehicle}
+    if ':' in vehicle:
+        return vehicle, {}
+    return f'vehicle_examples:{vehicle}', {}
+
+
+def _simulate(factories: List[Tuple[str, Dict[str, Any]]], dt: float, workers: int) -> list:
+    if workers != 1:
+        from .scheduler import FactorySpec, simulate_parallel
+        return simulate_parallel([FactorySpec(f, params) for f, params in factories], dt, workers=workers or None)
+
+    from .factories import build_vehicle
+    from .simulations import simulate
+    return [simulate(build_vehicle(path, params), dt) for path, params in factories]
+
+
+def summarize(name: str, dt: float, sim) -> Dict[str, Any]:
+    """
+    :param sim: Simulation of the vehicle.
+    :return: value of each of COLUMNS.
+    """
+    apogee_m, apogee_time_s = sim.apogee
+    maximum_velocity_ms, maximum_velocity_time_s = sim.maximum_velocity
+    maximum_g_force, maximum_g_force_time_s = sim.maximum_g_force
+    return {'vehicle': name, 'dt': dt, 'apogee_m': apogee_m, 'apogee_time_s': apogee_time_s,
+            'maximum_velocity_ms': maximum_velocity_ms, 'maximum_velocity_time_s': maximum_velocity_time_s,
+            'maximum_g_force': maximum_g_force, 'maximum_g_force_time_s': maximum_g_force_time_s,
+            'impact_velocity_ms': sim.impact_velocity, 'total_time_s': sim.total_time,
+            'events': [(float(t), event) for t, event in sim.events]}
+
+
+def _write_table(rows: List[Dict[str, Any]], out):
+    for row in rows:
+        out.write(f'{row["vehicle"]} (dt={row["dt"]})\n')
+        for column in COLUMNS[2:-1]:
+            out.write(f'  {column:24s}{row[column]:.6g}\n')
+        events = ', '.join(f'{event} at {t:.6g} s' for t, event in row['events'])
+        out.write(f'  {"events":24s}{events}\n')
+
+
+def _write_csv(rows: List[Dict[str, Any]], out):
+    import csv
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    for row in rows:
+        events = ';'.join(f'{t}:{event}' for t, event in row['events'])
+        writer.writerow([row[c] for c in COLUMNS[:-1]] + [events])
+
+
+def _write_json(rows: List[Dict[str, Any]], out):
+    import json
+    json.dump(rows, out, indent=2)
+    out.write('\n')
+
+
+_WRITERS = {'table': _write_table, 'csv': _write_csv, 'json': _write_json}
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m rocket_sim', description='Simulates vehicles and summarizes '
+                                     'their flights.')
+    parser.add_argument('vehicles', nargs='+', help='example name, e.g. three_stage, factory as module:name, or spec '
+                        'file (.json or .toml)')
+    parser.add_argument('--dt', type=float, nargs='+', default=[0.01], help='time steps to simulate each vehicle with '
+                        '(default: %(default)s)')
+    parser.add_argument('--format', choices=sorted(_WRITERS), default='table', help='format of the summaries '
+                        '(default: %(default)s)')
+    parser.add_argument('--output', '-o', help='file to write the summaries to, instead of standard output')
+    parser.add_argument('--workers', '-j', type=int, default=1, help='number of processes to simulate with, or 0 for '
+                        'one per CPU (default: %(default)s)')
+    parser.add_argument('--plot', action='store_true', help='display the plots of each flight')
+    parser.add_argument('--plot-dir', help='directory to save the plots of each flight to, as .png files')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    :param argv: command line arguments, without the program name. By default, sys.argv.
+    :return: exit status.
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error('--workers must be at least 0')
+    if any(dt <= 0 for dt in args.dt):
+        parser.error('--dt must be positive')
+
+    try:
+        factories = [_factory(v) for v in args.vehicles]
+        rows = []
+        for dt in args.dt:
+            for name, sim in zip(args.vehicles, _simulate(factories, dt, args.workers)):
+                rows.append(summarize(name, dt, sim))
+                if args.plot_dir:
+                    os.makedirs(args.plot_dir, exist_ok=True)
+                    stem = os.path.splitext(os.path.basename(name))[0] if name.endswith(_SPEC_EXTENSIONS) \
+                        else name.split(':')[-1]
+                    sim.save_plots(os.path.join(args.plot_dir, f'{stem}_dt{dt:g}.png'), f'{name} (dt={dt:g})')
+                if args.plot:
+                    sim.display_plots(f'{name} (dt={dt:g})')
+    except (ValueError, ImportError, AttributeError, OSError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as out:
+            _WRITERS[args.format](rows, out)
+    else:
+        _WRITERS[args.format](rows, sys.stdout)
+    return 0
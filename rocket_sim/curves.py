@@ -0,0 +1,195 @@
+from bisect import bisect_right
+from typing import Sequence, Optional, Tuple
+import numpy as np
+
+
+class Curve:
+    """
+    Piecewise linear function through (time, value) samples, which may be irregularly spaced. Slopes are precomputed
+    so a lookup is a single multiply-add, found in O(1) for uniformly spaced samples and by bisection otherwise.
+    Outside the sampled times the first or last value is used.
+
+    Can be used directly as a stage function, e.g. `f_thrust_N`, in which case it returns its value at the stage time.
+    """
+    __slots__ = ('times', 'values', 'slopes', 'step_s', '_times', '_values', '_slopes')
+
+    times: np.ndarray
+    values: np.ndarray
+    slopes: np.ndarray
+    step_s: Optional[float]
+
+    def __init__(self, times: Sequence[float], values: Sequence[float]):
+        """
+        :param times: strictly increasing times of samples.
+        :param values: value at each time.
+        """
+        self.times = np.array(times, dtype=np.float64)
+        self.values = np.array(values, dtype=np.float64)
+
+        if self.times.ndim != 1 or len(self.times) == 0 or self.times.shape != self.values.shape:
+            raise ValueError('Curve needs the same, non-zero, number of times and values')
+
+        gaps = np.diff(self.times)
+        if np.any(gaps <= 0):
+            raise ValueError('Curve times must be strictly increasing')
+
+        # Slope of the segment starting at each sample. Zero after the last sample, as the value is held.
+        self.slopes = np.zeros(len(self.times))
+        self.slopes[:-1] = np.diff(self.values) / gaps
+
+        uniform = len(gaps) > 0 and np.allclose(gaps, gaps[0], rtol=1e-12, atol=0.0)
+        self.step_s = float(gaps[0]) if uniform else None
+
+        # Python floats are faster than NumPy scalars when evaluating a single time.
+        self._times = self.times.tolist()
+        self._values = self.values.tolist()
+        self._slopes = self.slopes.tolist()
+
+    @classmethod
+    def uniform(cls, step_s: float, values: Sequence[float]) -> 'Curve':
+        """
+        :param step_s: time between successive values, starting at time zero.
+        """
+        return cls(step_s * np.arange(len(values)), values)
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def _index(self, t: float) -> int:
+        """
+        :return: index of the segment containing `t`, which must be within the sampled times.
+        """
+        if self.step_s is not None:
+            return min(int((t - self._times[0]) / self.step_s), len(self._times) - 2)
+        return bisect_right(self._times, t) - 1
+
+    def value(self, t: float) -> float:
+        """
+        :return: value of curve at time `t`.
+        """
+        if t <= self._times[0]:
+            return self._values[0]
+        if t >= self._times[-1]:
+            return self._values[-1]
+
+        i = self._index(t)
+        return self._values[i] + self._slopes[i] * (t - self._times[i])
+
+    def segment(self, t: float) -> Tuple[int, float]:
+        """
+        Locates a time, so the values of several curves sampled at the same times can be found with one search.
+        :return: index of the segment containing `t`, and the offset of `t` from its start. Outside the sampled times,
+            the first or last sample, with an offset of zero.
+        """
+        if t <= self._times[0]:
+            return 0, 0.0
+        if t >= self._times[-1]:
+            return len(self._times) - 1, 0.0
+
+        i = self._index(t)
+        return i, t - self._times[i]
+
+    def segment_value(self, i: int, offset: float) -> float:
+        """
+        :return: value of the curve at a location found by `segment`.
+        """
+        return self._values[i] + self._slopes[i] * offset
+
+    def __call__(self, _dt: float, t: float, _prev_x: float) -> float:
+        return self.value(t)
+
+    def evaluate(self, ts: np.ndarray) -> np.ndarray:
+        """
+        :param ts: times to evaluate curve at.
+        :return: value of curve at each time, the same as calling `value` on each.
+        """
+        ts = np.asarray(ts, dtype=np.float64)
+        n = len(self._times)
+        if n == 1:
+            return np.full(ts.shape, self._values[0])
+
+        inside = np.clip(ts, self.times[0], self.times[-1])
+        if self.step_s is not None:
+            i = np.minimum(((inside - self.times[0]) / self.step_s).astype(np.int64), n - 2)
+        else:
+            i = np.minimum(np.searchsorted(self.times, inside, side='right') - 1, n - 2)
+
+        result = self.values[i] + self.slopes[i] * (inside - self.times[i])
+        result[ts <= self.times[0]] = self.values[0]
+        result[ts >= self.times[-1]] = self.values[-1]
+        return result
+
+    def cumulative_integral(self) -> np.ndarray:
+        """
+        :return: integral of the curve from the first sample to each sample.
+        """
+        areas = 0.5 * (self.values[1:] + self.values[:-1]) * np.diff(self.times)
+        return np.concatenate(([0.0], np.cumsum(areas)))
+
+
+class ThrustCurve(Curve):
+    """
+    Thrust of a motor over time, e.g. from a RASP .eng file.
+    """
+    __slots__ = ('name',)
+
+    name: Optional[str]
+
+    def __init__(self, times: Sequence[float], thrusts_N: Sequence[float], name: Optional[str] = None):
+        super(ThrustCurve, self).__init__(times, thrusts_N)
+        self.name = name
+
+    @property
+    def total_impulse_Ns(self) -> float:
+        return float(self.cumulative_integral()[-1])
+
+    @property
+    def burn_time_s(self) -> float:
+        return float(self.times[-1])
+
+    def propellant_mass_curve(self, propellant_mass_kg: float) -> Curve:
+        """
+        Assumes propellant is burnt in proportion to the impulse delivered.
+        :param propellant_mass_kg: mass of propellant at ignition.
+        :return: mass of propellant remaining over time, for use as `f_propellant_mass_kg`.
+        """
+        impulse = self.cumulative_integral()
+        if impulse[-1] <= 0.0:
+            raise ValueError('Thrust curve delivers no impulse')
+
+        return Curve(self.times, propellant_mass_kg * (1.0 - impulse / impulse[-1]))
+
+    @staticmethod
+    def from_eng(text: str) -> 'ThrustCurve':
+        """
+        :param text: contents of a RASP .eng motor file.
+        :return: thrust curve of the first motor in the file. Starts at zero thrust at time zero.
+        """
+        lines = [line.split(';')[0].strip() for line in text.splitlines()]
+        lines = [line for line in lines if line]
+        if len(lines) < 2:
+            raise ValueError('Motor file has no thrust data')
+
+        name = lines[0].split()[0]
+        times = [0.0]
+        thrusts = [0.0]
+        for line in lines[1:]:
+            fields = line.split()
+            if len(fields) != 2:
+                # Header of the next motor in the file.
+                break
+
+            t, thrust = float(fields[0]), float(fields[1])
+            if t == 0.0:
+                thrusts[0] = thrust
+                continue
+
+            times.append(t)
+            thrusts.append(thrust)
+
+        return ThrustCurve(times, thrusts, name)
+
+    @staticmethod
+    def load_eng(path: str) -> 'ThrustCurve':
+        with open(path) as f:
+            return ThrustCurve.from_eng(f.read())
@@ -0,0 +1,70 @@
+"""
+Reduction of long time series to what can be seen when plotted, so plotting takes time proportional to the size of
+the plot rather than the length of the flight.
+"""
+from typing import Sequence, Tuple
+import numpy as np
+from .trajectory import Trajectory
+
+
+def m4(time: np.ndarray, values: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    M4 downsampling: splits the time range into `width` columns, e.g. one per pixel, and keeps the first, last,
+    minimum and maximum sample of each. A line drawn through the kept samples covers the same pixels as one drawn
+    through every sample.
+    :param time: increasing times of samples.
+    :param values: value of each sample.
+    :param width: number of columns, at least 1.
+    :return: times and values of the kept samples, in order.
+    """
+    time = np.asarray(time, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(time)
+    if n <= 4 * width:
+        return time, values
+
+    span = time[-1] - time[0]
+    column = np.minimum(((time - time[0]) * (width / span)).astype(np.int64), width - 1) if span > 0 else \
+        np.zeros(n, dtype=np.int64)
+
+    # Samples are in time order, so each column is a contiguous run of samples.
+    starts = np.flatnonzero(np.diff(column, prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    lengths = ends - starts + 1
+
+    minimums = np.repeat(np.minimum.reduceat(values, starts), lengths)
+    maximums = np.repeat(np.maximum.reduceat(values, starts), lengths)
+
+    def first_where(mask: np.ndarray) -> np.ndarray:
+        indices = np.flatnonzero(mask)
+        _, first = np.unique(column[indices], return_index=True)
+        return indices[first]
+
+    keep = np.unique(np.concatenate((starts, ends, first_where(values == minimums), first_where(values == maximums))))
+    return time[keep], values[keep]
+
+
+def band(trajectories: Sequence[Trajectory], field: str, points: int = 1000,
+         percentiles: Sequence[float] = (5, 25, 50, 75, 95)) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distribution of a field over many flights, e.g. Monte Carlo runs, at each time.
+    :param trajectories: recorded flights.
+    :param field: name of field, one of FIELDS.
+    :param points: number of evenly spaced times to evaluate the distribution at.
+    :param percentiles: percentiles of the distribution to find.
+    :return: times, and array of shape (len(percentiles), points) of each percentile at each time. Flights which have
+        not started, or have ended, by a time are excluded from the distribution at that time.
+    """
+    if len(trajectories) == 0:
+        raise ValueError('No trajectories')
+
+    start = min(float(t.column('time_s')[0]) for t in trajectories)
+    end = max(float(t.column('time_s')[-1]) for t in trajectories)
+    grid = np.linspace(start, end, points)
+
+    samples = np.empty((len(trajectories), points))
+    for i, t in enumerate(trajectories):
+        samples[i] = np.interp(grid, t.column('time_s'), t.column(field), left=np.nan, right=np.nan)
+
+    return grid, np.nanpercentile(samples, percentiles, axis=0)
+
@@ -0,0 +1,30 @@
+"""
+Vehicle factories referred to by their import path, 'module:name', e.g. 'vehicle_examples:three_stage', so they can
+be named on the command line or sent to worker processes. Kept free of heavy imports, for quick startup of the
+command line runner.
+"""
+from importlib import import_module
+from typing import Any, Callable, Dict
+from .vehicle import Vehicle
+
+
+def resolve_factory(path: str) -> Callable[..., Any]:
+    """
+    :param path: 'module:name', where name may be dotted, e.g. 'module:Class.method'.
+    :return: the factory function.
+    """
+    module, name = path.split(':')
+    f = import_module(module)
+    for attribute in name.split('.'):
+        f = getattr(f, attribute)
+    return f
+
+
+def build_vehicle(path: str, params: Dict[str, Any]) -> Vehicle:
+    """
+    :param path: factory, see `resolve_factory`.
+    :param params: keyword parameters of the factory.
+    :return: new vehicle from the factory, without its name if it returns one.
+    """
+    vehicle = resolve_factory(path)(**params)
+    return vehicle[0] if isinstance(vehicle, tuple) else vehicle
@@ -22,6 +22,8 @@ class CompState:
     """
     Stores state of flight computer and makes transitions to new computer states.
     """
+    __slots__ = ('name', 'ts')
+
     name: str
     ts: List[transition]
 
@@ -41,6 +43,20 @@ class CompState:
         """
         pass
 
+    def transition_in_place(self, prev: VehicleState, now: VehicleState) -> Tuple[Optional[Action], 'CompState']:
+        """
+        Same as `transition`, but states which change over time update themselves rather than creating a new state.
+        Only used on states returned from `entered`.
+        """
+        return self.transition(prev, now)
+
+    def entered(self) -> 'CompState':
+        """
+        :return: state to use when the computer transitions into this state and is stepped in place. States which are
+            updated in place return a copy, so the original can be entered again.
+        """
+        return self
+
     def check(self, prev: VehicleState, now: VehicleState) -> Optional[Tuple[Optional[Action], 'CompState']]:
         """
         Helper method for subclasses.
@@ -59,34 +75,68 @@ class CompState:
 
 class Timer(CompState):
     """
-    Counts down time to zero.
+    Counts down time to zero. Alternatively, expires at an absolute time, in which case the timer does not need to be
+    updated each step.
     """
+    __slots__ = ('time_rem_s', 'expires_at_s')
+
     time_rem_s: float
+    expires_at_s: Optional[float]
 
-    def __init__(self, name: str, ts: List[transition], time_rem_s: float):
+    def __init__(self, name: str, ts: List[transition], time_rem_s: float = 0.0, expires_at_s: Optional[float] = None):
         """
         :param ts: transitions from state.
         :param time_rem_s: time to count down from.
+        :param expires_at_s: total time at which the timer expires. If given, `time_rem_s` is not counted down.
         """
         super(Timer, self).__init__(name, ts)
         self.time_rem_s = time_rem_s
+        self.expires_at_s = expires_at_s
+
+    def expired(self, prev: VehicleState, now: VehicleState) -> bool:
+        """
+        :return: whether no time remains on the timer at the current state of the vehicle.
+        """
+        if self.expires_at_s is not None:
+            return now.time_s >= self.expires_at_s
+        return self.time_rem_s - (now.time_s - prev.time_s) <= 0
 
     def transition(self, prev: VehicleState, now: VehicleState) -> Tuple[Optional[Action], CompState]:
         r = self.check(prev, now)
         if r is not None:
             return r
 
+        if self.expires_at_s is not None:
+            return None, self
+
         dt = now.time_s - prev.time_s
         return None, Timer(self.name, self.ts, self.time_rem_s - dt)
 
+    def transition_in_place(self, prev: VehicleState, now: VehicleState) -> Tuple[Optional[Action], CompState]:
+        r = self.check(prev, now)
+        if r is not None:
+            return r
+
+        if self.expires_at_s is None:
+            self.time_rem_s -= now.time_s - prev.time_s
+        return None, self
+
+    def entered(self) -> 'Timer':
+        if self.expires_at_s is not None:
+            return self
+        return Timer(self.name, self.ts, self.time_rem_s)
+
 
 class Id(CompState):
     """
     Flight computer state that does not change over time.
     """
+    __slots__ = ()
+
     def transition(self, prev: VehicleState, now: VehicleState) -> Tuple[Optional[Action], CompState]:
         r = self.check(prev, now)
         if r is not None:
             return r
 
-        return None, Id(self.name, self.ts)
+        # Nothing changes, so there is no need for a new state.
+        return None, self
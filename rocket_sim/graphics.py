@@ -1,34 +1,112 @@
-import matplotlib.pyplot as plt
 import math
-from typing import Tuple, List
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from typing import Tuple, List, Sequence, Optional
+from .downsample import m4, band
+from .trajectory import Trajectory
 
+# Size of a group of plots, in inches, and the resolution it is drawn at.
+_FIGSIZE = (20, 10)
+_DPI = 100
 
-def time_series_plot_group(title, plot_data):
 
-    def time_series_subplot(plot, time: List[float], data: List[float], events: List[Tuple[float, str]], x_label: str, y_label: str):
-        plot.plot(time, data)
+def _time_series_subplot(plot, time: np.ndarray, data: np.ndarray, events: List[Tuple[float, str]], x_label: str,
+                         y_label: str, width_px: int):
+    # Only the samples which can affect the drawn pixels are plotted.
+    plot.plot(*m4(time, data, width_px))
 
-        text_at_top = True
-        for (event_time, event_name) in events:
-            y = max(data) if text_at_top else min(data)
-            plot.axvline(x=event_time, color='black', linewidth=0.5, linestyle='--')
-            plot.text(x=event_time, y=y, s=event_name)
-            text_at_top = not text_at_top
+    # Extremes are found once, rather than per event, as the data may have millions of samples.
+    top, bottom = (np.max(data), np.min(data)) if len(events) > 0 else (0.0, 0.0)
+    text_at_top = True
+    for (event_time, event_name) in events:
+        y = top if text_at_top else bottom
+        plot.axvline(x=event_time, color='black', linewidth=0.5, linestyle='--')
+        plot.text(x=event_time, y=y, s=event_name)
+        text_at_top = not text_at_top
 
-        plot.set_xlabel(x_label)
-        plot.set_ylabel(y_label)
+    plot.set_xlabel(x_label)
+    plot.set_ylabel(y_label)
 
+
+def _band_subplot(plot, time: np.ndarray, percentiles: np.ndarray, x_label: str, y_label: str):
+    """
+    :param percentiles: outermost to innermost percentiles, then the median, e.g. (5, 25, 50, 75, 95).
+    """
+    middle = len(percentiles) // 2
+    for i in range(middle):
+        plot.fill_between(time, percentiles[i], percentiles[-1 - i], color='C0', alpha=0.2, linewidth=0)
+    plot.plot(time, percentiles[middle], color='C0')
+
+    plot.set_xlabel(x_label)
+    plot.set_ylabel(y_label)
+
+
+def _figure(plot_count: int, title: Optional[str], pyplot: bool):
+    """
+    :param pyplot: create the figure through pyplot, so it can be shown, otherwise create a standalone figure which
+           can only be saved. Standalone figures are freed as soon as they are no longer used.
+    :return: figure and a grid of its axes.
+    """
     cols = 2
-    rows = math.ceil(len(plot_data) / cols)
+    rows = math.ceil(plot_count / cols)
+
+    if pyplot:
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(nrows=rows, ncols=cols, figsize=_FIGSIZE, dpi=_DPI, squeeze=False)
+    else:
+        fig = Figure(figsize=_FIGSIZE, dpi=_DPI)
+        FigureCanvasAgg(fig)
+        ax = fig.subplots(nrows=rows, ncols=cols, squeeze=False)
+
+    if title is not None:
+        fig.suptitle(title)
+
+    return fig, ax
 
-    fig, ax = plt.subplots(nrows=rows, ncols=cols, figsize=(20, 10))
+
+def _draw(title: Optional[str], plot_data, path: Optional[str], draw_subplot):
+    pyplot = path is None
+    fig, ax = _figure(len(plot_data), title, pyplot)
+    width_px = int(fig.get_figwidth() * fig.dpi / ax.shape[1])
 
     for i, row in enumerate(ax):
         for j, col in enumerate(row):
-            index = i*cols + j
+            index = i*ax.shape[1] + j
 
             if index < len(plot_data):
-                time_series_subplot(col, *plot_data[index])
+                draw_subplot(col, plot_data[index], width_px)
+            else:
+                col.set_visible(False)
+
+    fig.tight_layout(pad=3)
+
+    if pyplot:
+        import matplotlib.pyplot as plt
+        plt.show()
+    else:
+        fig.savefig(path)
+
+
+def time_series_plot_group(title: Optional[str], plot_data, path: Optional[str] = None):
+    """
+    :param plot_data: time series, events, and axis labels of each plot, see Simulation.plot_data. Series are
+           downsampled to the width of the plot before drawing, so may be of any length.
+    :param path: file to save the plots to, e.g. a .png, without needing a display. If None, the plots are shown.
+    """
+    _draw(title, plot_data, path, lambda plot, data, width_px: _time_series_subplot(plot, *data, width_px))
+
+
+def band_plot_group(title: Optional[str], trajectories: Sequence[Trajectory], fields: Sequence[Tuple[str, str]],
+                    path: Optional[str] = None, percentiles: Sequence[float] = (5, 25, 50, 75, 95)):
+    """
+    Plots the distribution of fields over many flights, e.g. Monte Carlo runs, as bands between percentiles around
+    the median, rather than a line per flight.
+    :param fields: name of each field to plot, and its axis label.
+    :param path: file to save the plots to. If None, the plots are shown.
+    """
+    def draw(plot, field: Tuple[str, str], width_px: int):
+        time, values = band(trajectories, field[0], points=width_px, percentiles=percentiles)
+        _band_subplot(plot, time, values, 'Time (s)', field[1])
 
-    plt.tight_layout(pad=3)
-    plt.show()
+    _draw(title, fields, path, draw)
@@ -0,0 +1,338 @@
+"""
+Hardware-in-the-loop mode, in which a flight computer outside the simulation, e.g. in another process, flies the
+vehicle. Each step, the state of the vehicle is sent to the controller as a sensor sample, optionally with noise, and
+the actions it sends back are performed after a latency. Steps are paced to the wall clock, or a multiple of it:
+
+    sim, timing = asyncio.run(simulate_hil(three_stage()[0], dt=0.01, rate=1.0, latency_s=0.05))
+    print(timing.deadline_misses, timing.jitter_s)
+
+Without a path, the controller is a stand-in which replays the vehicle's own flight computer, so the mode can be
+tested without hardware. With a path, the simulation waits for a controller to connect to a Unix socket there, e.g.
+`connect_controller` in another process.
+
+Frames are fixed size little-endian structs, starting with their kind:
+
+- SAMPLE, simulation to controller: sequence number, then the fields of the state, in the order of FIELDS.
+- ACTION, controller to simulation: sequence number of the sample the decision was made from, then the value of the
+  Action, or -1 for none.
+- END, simulation to controller: the vehicle has returned to the ground.
+"""
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import socket
+import struct
+import numpy as np
+from .flight_comp import Action, CompState, Id
+from .state import VehicleState
+from .trajectory import Trajectory, FIELDS
+from .simulations import Simulation, has_landed
+from .vehicle import Vehicle
+
+SAMPLE = 1
+ACTION = 2
+END = 3
+
+_SAMPLE = struct.Struct(f'<BI{len(FIELDS)}d')
+_ACTION = struct.Struct('<BIb')
+_END = struct.Struct('<BI')
+_FRAMES = {SAMPLE: _SAMPLE, ACTION: _ACTION, END: _END}
+_NONE = -1
+
+
+def encode_sample(seq: int, state: VehicleState) -> bytes:
+    return _SAMPLE.pack(SAMPLE, seq, *[getattr(state, f) for f in FIELDS])
+
+
+def encode_action(seq: int, action: Optional[Action]) -> bytes:
+    return _ACTION.pack(ACTION, seq, _NONE if action is None else action.value)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[tuple]:
+    """
+    :return: fields of the next frame, starting with its kind, or None if the stream has ended.
+    """
+    try:
+        kind = await reader.readexactly(1)
+        if kind[0] not in _FRAMES:
+            raise ValueError(f'Unknown frame kind {kind[0]}')
+        frame = _FRAMES[kind[0]]
+        return frame.unpack(kind + await reader.readexactly(frame.size - 1))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+class HilTiming:
+    """
+    How closely the simulation kept to the wall clock, and how quickly the controller responded.
+    """
+    period_s: Optional[float]
+    lateness_s: np.ndarray
+    round_trip_s: np.ndarray
+
+    def __init__(self, period_s: Optional[float], lateness_s: List[float], round_trip_s: List[float]):
+        """
+        :param period_s: wall clock time of each step, or None if not paced.
+        :param lateness_s: time after its deadline at which each step was simulated.
+        :param round_trip_s: time from sending each sample to receiving the controller's action.
+        """
+        self.period_s = period_s
+        self.lateness_s = np.array(lateness_s, dtype=np.float64)
+        self.round_trip_s = np.array(round_trip_s, dtype=np.float64)
+
+    @property
+    def deadline_misses(self) -> int:
+        """
+        :return: number of steps simulated after the deadline of the next step had passed.
+        """
+        if self.period_s is None:
+            return 0
+        return int(np.count_nonzero(self.lateness_s > self.period_s))
+
+    @property
+    def jitter_s(self) -> float:
+        """
+        :return: standard deviation of the time between steps.
+        """
+        return float(np.std(np.diff(self.lateness_s))) if len(self.lateness_s) > 2 else 0.0
+
+    @property
+    def max_lateness_s(self) -> float:
+        return float(self.lateness_s.max()) if len(self.lateness_s) else 0.0
+
+    def __repr__(self) -> str:
+        return (f'HilTiming(steps={len(self.lateness_s)}, deadline_misses={self.deadline_misses}, '
+                f'jitter_s={self.jitter_s:.3g}, max_lateness_s={self.max_lateness_s:.3g})')
+
+
+async def replay_controller(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, computer_state: CompState,
+                            delay_s: float = 0.0):
+    """
+    Stand-in controller, which makes the transitions of a flight computer from the samples it is sent, replying to
+    each sample with its action, or none.
+    :param computer_state: initial state of the flight computer, e.g. the `computer_state` of a vehicle.
+    :param delay_s: wall clock time to take to reply, e.g. to mimic the processing time of hardware.
+    """
+    prev: Optional[VehicleState] = None
+    try:
+        while True:
+            frame = await read_frame(reader)
+            if frame is None or frame[0] == END:
+                break
+            if frame[0] != SAMPLE:
+                raise ValueError(f'Expected a sample, got frame kind {frame[0]}')
+
+            _, seq, *values = frame
+            now = VehicleState(None, *values)
+            action = None
+            if prev is not None:
+                action, computer_state = computer_state.transition(prev, now)
+            prev = now
+
+            if delay_s > 0:
+                await asyncio.sleep(delay_s)
+            writer.write(encode_action(seq, action))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def connect_controller(path: str, computer_state: CompState, delay_s: float = 0.0):
+    """
+    Runs the stand-in controller against a simulation waiting at a Unix socket, see `simulate_hil`.
+    """
+    reader, writer = await asyncio.open_unix_connection(path)
+    await replay_controller(reader, writer, computer_state, delay_s)
+
+
+class _Link:
+    """
+    Sends samples, and collects the controller's actions as they arrive.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.sent_at: List[float] = []
+        self.sample_time_s = 0.0
+        self.replies: asyncio.Queue = asyncio.Queue()
+        self.round_trip_s: List[float] = []
+        self._task = asyncio.ensure_future(self._receive(reader))
+
+    async def _receive(self, reader: asyncio.StreamReader):
+        """
+        Queues each reply, then None when the controller hangs up, or the error if it sends a bad frame.
+        """
+        loop = asyncio.get_running_loop()
+        end = None
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                if frame[0] != ACTION:
+                    raise ValueError(f'Expected an action, got frame kind {frame[0]}')
+
+                _, seq, value = frame
+                if seq < len(self.sent_at):
+                    self.round_trip_s.append(loop.time() - self.sent_at[seq])
+                # Actions take effect relative to the latest sample when they arrive.
+                self.replies.put_nowait((seq, None if value == _NONE else Action(value), self.sample_time_s))
+        except ValueError as e:
+            end = e
+        finally:
+            self.replies.put_nowait(end)
+
+    async def send(self, state: VehicleState, noise: Dict[str, float], rng: np.random.RandomState):
+        seq = len(self.sent_at)
+        self.sample_time_s = state.time_s
+        if noise:
+            state = state.copy()
+            for f, std in noise.items():
+                setattr(state, f, getattr(state, f) + rng.normal(0.0, std))
+
+        self.sent_at.append(asyncio.get_running_loop().time())
+        self.writer.write(encode_sample(seq, state))
+        await self.writer.drain()
+
+    async def close(self, timeout_s: float = 1.0):
+        """
+        Tells the controller the flight has ended, and waits for it to hang up, so replies it is still sending are
+        not lost.
+        """
+        try:
+            self.writer.write(_END.pack(END, len(self.sent_at)))
+            await self.writer.drain()
+            await asyncio.wait_for(asyncio.shield(self._task), timeout_s)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        self.writer.close()
+        self._task.cancel()
+
+
+async def run_hil(vehicle: Vehicle, dt: float, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                  rate: Optional[float] = 1.0, lockstep: bool = False, latency_s: float = 0.0,
+                  noise: Optional[Dict[str, float]] = None, seed: int = 0) -> Tuple[Simulation, HilTiming]:
+    """
+    Simulates a vehicle flown by a controller connected through a stream.
+    :param vehicle: vehicle to simulate. Its flight computer is not used, and it is not modified.
+    :param dt: time step, i.e. resolution.
+    :param rate: simulated time per wall clock time, e.g. 1.0 for real time, or None to step as fast as possible.
+    :param lockstep: wait for the controller's reply to each sample before the next step, so the flight does not
+           depend on how quickly it replies. Needed if `rate` is None.
+    :param latency_s: simulated time after an action arrives before it is performed, e.g. the delay of the actuators.
+    :param noise: standard deviation of noise to add to the fields of the samples, e.g. {'dist_m': 0.5}.
+    :param seed: seed of the noise.
+    :return: flight of the vehicle, and the timing of the steps.
+    """
+    if rate is None and not lockstep:
+        raise ValueError('Stepping as fast as possible needs lockstep, or the controller cannot keep up')
+    noise = noise or {}
+    for f in noise:
+        if f not in FIELDS:
+            raise ValueError(f'Unknown field {f}, expected one of {list(FIELDS)}')
+
+    vehicle = vehicle.copy()
+    vehicle.computer_state = Id('External', [])
+    rng = np.random.RandomState(seed)
+    link = _Link(reader, writer)
+    trajectory = Trajectory()
+    pending: List[Tuple[float, Action]] = []
+    lateness: List[float] = []
+    loop = asyncio.get_running_loop()
+    period_s = None if rate is None else dt / rate
+    replied = -1
+    connected = True
+
+    def receive(reply):
+        nonlocal replied, connected
+        if isinstance(reply, Exception):
+            raise reply
+        if reply is None:
+            connected = False
+            return
+        seq, action, received_s = reply
+        replied = max(replied, seq)
+        if action is not None:
+            pending.append((received_s + latency_s, action))
+
+    try:
+        await link.send(vehicle.state, noise, rng)
+        start = loop.time()
+        elapsed_s = 0.0
+        k = 0
+        while True:
+            if lockstep:
+                while connected and replied < k:
+                    receive(await link.replies.get())
+                if not connected:
+                    raise RuntimeError('The controller disconnected')
+
+            if period_s is not None:
+                deadline = start + k * period_s
+                delay = deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                lateness.append(loop.time() - deadline)
+
+            while not link.replies.empty():
+                receive(link.replies.get_nowait())
+
+            # Actions due by the current state are performed as if the flight computer took them at this step.
+            pending.sort(key=lambda p: p[0])
+            while pending and pending[0][0] <= vehicle.state.time_s + 1e-9:
+                vehicle.perform(pending.pop(0)[1], dt)
+
+            if k > 0:
+                trajectory.append(vehicle.state)
+                if has_landed(elapsed_s, vehicle.state):
+                    break
+
+            vehicle.step_in_place(dt)
+            elapsed_s += dt
+            k += 1
+            await link.send(vehicle.state, noise, rng)
+    finally:
+        await link.close()
+
+    return Simulation(trajectory, atmosphere=vehicle.atmosphere), HilTiming(period_s, lateness, link.round_trip_s)
+
+
+async def simulate_hil(vehicle: Vehicle, dt: float, path: Optional[str] = None, controller_delay_s: float = 0.0,
+                       **options) -> Tuple[Simulation, HilTiming]:
+    """
+    :param vehicle: vehicle to simulate.
+    :param dt: time step, i.e. resolution.
+    :param path: Unix socket to wait for a controller to connect to. If None, uses the stand-in controller, which
+           replays the vehicle's flight computer.
+    :param controller_delay_s: time the stand-in controller takes to reply, see `replay_controller`.
+    :param options: keyword arguments of `run_hil`, e.g. `rate`, `latency_s`, `noise`.
+    :return: flight of the vehicle, and the timing of the steps.
+    """
+    if path is not None:
+        connected: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        def accept(r: asyncio.StreamReader, w: asyncio.StreamWriter):
+            if connected.done():
+                w.close()
+            else:
+                connected.set_result((r, w))
+
+        server = await asyncio.start_unix_server(accept, path)
+        try:
+            reader, writer = await connected
+        finally:
+            server.close()
+        return await run_hil(vehicle, dt, reader, writer, **options)
+
+    ours, theirs = socket.socketpair()
+    reader, writer = await asyncio.open_connection(sock=ours)
+    controller_reader, controller_writer = await asyncio.open_connection(sock=theirs)
+    controller = asyncio.ensure_future(replay_controller(controller_reader, controller_writer,
+                                                         vehicle.computer_state, controller_delay_s))
+    try:
+        return await run_hil(vehicle, dt, reader, writer, **options)
+    finally:
+        # Hangs up on the controller, if the simulation failed before doing so.
+        writer.close()
+        await controller
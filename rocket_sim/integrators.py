@@ -0,0 +1,284 @@
+from typing import Callable, Tuple, Optional, List
+from .flight_comp import Action, CompState
+from .stage import Stage, Const, Linear
+from .curves import Curve
+from .state import VehicleState
+from .vehicle import Vehicle
+from .trajectory import Trajectory
+from .atmosphere import Atmosphere, drag_and_gravity
+
+# Dormand-Prince 5(4) coefficients.
+_C = (0.0, 1/5, 3/10, 4/5, 8/9, 1.0, 1.0)
+_A = (
+    (),
+    (1/5,),
+    (3/40, 9/40),
+    (44/45, -56/15, 32/9),
+    (19372/6561, -25360/2187, 64448/6561, -212/729),
+    (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+    (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84),
+)
+# Difference between the 5th and embedded 4th order weights, used to estimate the error of a step.
+_E = (71/57600, 0.0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40)
+
+
+class Integrator:
+    """
+    Method of advancing a vehicle through time.
+    """
+    def integrate(self, vehicle: Vehicle, dt: float) -> Trajectory:
+        """
+        :param vehicle: vehicle to simulate.
+        :param dt: time step, or initial time step for integrators which choose their own.
+        :return: recorded states of the vehicle until it returns to ground.
+        """
+        raise NotImplementedError
+
+
+def _closed_form(f) -> bool:
+    """
+    :param f: stage function, e.g. f_thrust_N.
+    :return: whether `f` can be evaluated at any time since the start of a phase, rather than only step by step.
+    """
+    return type(f) is Const or type(f) is Linear or isinstance(f, Curve)
+
+
+class _Phase:
+    """
+    Continuous description of a stage from the point it became the current stage. The stage functions are called with
+    the time elapsed since the start of the phase, the stage time, and the value at the start of the phase. This gives
+    the exact value over time for `const`, `linear` and curves.
+    """
+
+    def __init__(self, stage: Stage, t0: float, atmosphere: Optional[Atmosphere] = None):
+        """
+        :param stage: stage which is current from time `t0`.
+        :param t0: vehicle time at which the phase starts.
+        :param atmosphere: atmosphere the vehicle is flying through.
+        """
+        self.stage = stage
+        self.t0 = t0
+        self.atmosphere = atmosphere
+        self.burning = stage.propellant_mass_kg > 0.0
+
+    def propellant_mass_kg(self, t: float) -> float:
+        if not self.burning:
+            return 0.0
+
+        s = self.stage
+        elapsed = t - self.t0
+        return max(s.f_propellant_mass_kg(elapsed, s.stage_time_s + elapsed, s.propellant_mass_kg), 0.0)
+
+    def thrust_N(self, t: float) -> float:
+        if not self.burning:
+            return 0.0
+
+        s = self.stage
+        elapsed = t - self.t0
+        return s.f_thrust_N(elapsed, s.stage_time_s + elapsed, s.thrust_N)
+
+    def state(self, t: float, dist_m: float, velocity_ms: float, event: Optional[str] = None) -> VehicleState:
+        """
+        :return: full state of the vehicle at time `t`, with forces evaluated at that instant.
+        """
+        s = self.stage
+        mass_kg = s.engine_case_mass_kg + s.empty_mass_kg + self.propellant_mass_kg(t)
+
+        air_resistance_N, gravity_ms2 = drag_and_gravity(s, dist_m, velocity_ms, self.atmosphere)
+        weight_N = mass_kg * gravity_ms2
+        thrust_N = self.thrust_N(t)
+        net_force_N = thrust_N - weight_N - air_resistance_N
+        accel_ms2 = net_force_N / mass_kg
+
+        return VehicleState(event, t, mass_kg, thrust_N, air_resistance_N, weight_N, net_force_N, accel_ms2,
+                            velocity_ms, dist_m)
+
+    def derivative(self, t: float, y: Tuple[float, float]) -> Tuple[float, float]:
+        """
+        :param y: altitude and velocity.
+        :return: rate of change of altitude and velocity.
+        """
+        return y[1], self.state(t, y[0], y[1]).accel_ms2
+
+
+def _hermite(t0: float, y0: Tuple[float, float], f0: Tuple[float, float], t1: float, y1: Tuple[float, float],
+             f1: Tuple[float, float], t: float) -> Tuple[float, float]:
+    """
+    :return: cubic Hermite interpolation of the solution at `t`, between two accepted points of a step.
+    """
+    h = t1 - t0
+    s = (t - t0) / h
+    h00 = (1 + 2*s) * (1 - s)**2
+    h10 = s * (1 - s)**2
+    h01 = s**2 * (3 - 2*s)
+    h11 = s**2 * (s - 1)
+    return (h00*y0[0] + h10*h*f0[0] + h01*y1[0] + h11*h*f1[0],
+            h00*y0[1] + h10*h*f0[1] + h01*y1[1] + h11*h*f1[1])
+
+
+class DormandPrince(Integrator):
+    """
+    Adaptive Runge-Kutta 5(4) integrator. Takes large steps where the dynamics are smooth, ends steps exactly at
+    burnout, and finds the time of flight computer actions, apogee and touchdown to within `event_tolerance_s` by
+    bisection.
+    """
+    rtol: float
+    atol: float
+    max_step_s: float
+    min_step_s: float
+    event_tolerance_s: float
+
+    def __init__(self, rtol: float = 1e-8, atol: float = 1e-8, max_step_s: float = 0.5, min_step_s: float = 1e-9,
+                 event_tolerance_s: float = 1e-9):
+        """
+        :param rtol: relative error allowed per step.
+        :param atol: absolute error allowed per step.
+        :param max_step_s: largest step to take. The flight computer is only consulted at the end of each step, so
+               this bounds how long a condition can be missed for.
+        :param min_step_s: smallest step to take before giving up.
+        :param event_tolerance_s: how precisely to locate the time of events.
+        """
+        self.rtol = rtol
+        self.atol = atol
+        self.max_step_s = max_step_s
+        self.min_step_s = min_step_s
+        self.event_tolerance_s = event_tolerance_s
+
+    def _step(self, phase: _Phase, t: float, y: Tuple[float, float], k1: Tuple[float, float], h: float) \
+            -> Tuple[Tuple[float, float], Tuple[float, float], float]:
+        """
+        :return: solution at `t + h`, its derivative, and the normalised error of the step.
+        """
+        ks = [k1]
+        for i in range(1, 7):
+            a = _A[i]
+            yi = (y[0] + h * sum(a[j] * ks[j][0] for j in range(i)),
+                  y[1] + h * sum(a[j] * ks[j][1] for j in range(i)))
+            ks.append(phase.derivative(t + _C[i] * h, yi))
+
+        # The last stage is evaluated at the 5th order solution, so it is also the derivative there.
+        y1 = yi
+        err = 0.0
+        for c in range(2):
+            e = h * sum(_E[j] * ks[j][c] for j in range(7))
+            scale = self.atol + self.rtol * max(abs(y[c]), abs(y1[c]))
+            err += (e / scale)**2
+
+        return y1, ks[6], (err / 2)**0.5
+
+    def _locate(self, lo: float, hi: float, happened: Callable[[float], bool]) -> float:
+        """
+        :param happened: whether the event has occurred by a given time. Must be false at `lo` and true at `hi`.
+        :return: earliest time, within tolerance, at which the event has occurred.
+        """
+        while hi - lo > self.event_tolerance_s:
+            mid = 0.5 * (lo + hi)
+            if happened(mid):
+                hi = mid
+            else:
+                lo = mid
+        return hi
+
+    def integrate(self, vehicle: Vehicle, dt: float) -> Trajectory:
+        """
+        :raise ValueError: if a stage which burns has a function other than `const`, `linear` or a curve, which would
+               be evaluated incorrectly over a phase.
+        """
+        stages = [vehicle.stage] + vehicle.remaining_engine_stages[vehicle._next_engine:] + \
+            ([] if vehicle.parachute_stage is None else [vehicle.parachute_stage])
+        for i, stage in enumerate(stages):
+            if stage.propellant_mass_kg > 0.0:
+                for name in ('f_propellant_mass_kg', 'f_thrust_N'):
+                    if not _closed_form(getattr(stage, name)):
+                        raise ValueError(f'{type(self).__name__} needs const, linear or curve stage functions, but '
+                                         f'{name} of stage {i} is {getattr(stage, name)!r}. Use the fixed step '
+                                         f'integration of simulate instead.')
+
+        trajectory = Trajectory()
+
+        comp = vehicle.computer_state
+        remaining: List[Stage] = list(vehicle.remaining_engine_stages)
+        parachute = vehicle.parachute_stage
+
+        t = vehicle.state.time_s
+        y = (vehicle.state.dist_m, vehicle.state.velocity_ms)
+        atmosphere = vehicle.atmosphere
+        phase = _Phase(vehicle.stage, t, atmosphere)
+        prev = phase.state(t, *y)
+        k1 = phase.derivative(t, y)
+        h = min(dt, self.max_step_s)
+
+        while True:
+            # Burnout depends only on time, so end the step exactly at burnout rather than stepping over the
+            # discontinuity in thrust.
+            burnout = False
+            if phase.burning and phase.propellant_mass_kg(t + h) <= 0.0:
+                h = self._locate(t, t + h, lambda s: phase.propellant_mass_kg(s) <= 0.0) - t
+                burnout = True
+
+            y1, k7, err = self._step(phase, t, y, k1, h)
+            if err > 1.0:
+                h *= max(0.2, 0.9 * err**-0.2)
+                if h < self.min_step_s:
+                    raise RuntimeError('Step size became too small')
+                continue
+
+            t1 = t + h
+
+            def at(s: float) -> Tuple[float, float]:
+                return _hermite(t, y, k1, t1, y1, k7, s)
+
+            # Find the earliest event which occurred within the step.
+            events: List[Tuple[float, str]] = []
+
+            if y[1] > 0.0 >= y1[1]:
+                events.append((self._locate(t, t1, lambda s: at(s)[1] <= 0.0), 'apogee'))
+
+            if y1[0] <= 0.0 and y1[1] < 0.0:
+                events.append((self._locate(t, t1, lambda s: at(s)[0] <= 0.0 and at(s)[1] < 0.0), 'touchdown'))
+
+            action, next_comp = comp.transition(prev, phase.state(t1, *y1))
+            if action is not None or next_comp.name != comp.name:
+                def transitioned(s: float) -> bool:
+                    a, c = comp.transition(prev, phase.state(s, *at(s)))
+                    return a is not None or c.name != comp.name
+
+                events.append((self._locate(t, t1, transitioned), 'computer'))
+
+            if len(events) == 0:
+                comp = next_comp
+                t, y, k1 = t1, y1, k7
+                prev = phase.state(t, *y)
+                trajectory.append(prev)
+
+                if burnout:
+                    phase.burning = False
+                    k1 = phase.derivative(t, y)
+                else:
+                    h = min(h * min(5.0, 0.9 * max(err, 1e-10)**-0.2), self.max_step_s)
+                continue
+
+            te, kind = min(events)
+            ye = at(te)
+            event_name = None
+
+            if kind == 'computer':
+                action, comp = comp.transition(prev, phase.state(te, *ye))
+                event_name = Vehicle._interpret_event_name(action)
+
+                if action == Action.NEXT_STAGE:
+                    phase = _Phase(remaining.pop(0), te, atmosphere)
+                elif action == Action.PARACHUTE:
+                    if parachute is None:
+                        raise RuntimeError('No parachute to eject')
+                    phase = _Phase(parachute, te, atmosphere)
+
+            t, y = te, ye
+            prev = phase.state(t, *y, event=event_name)
+            trajectory.append(prev)
+
+            if kind == 'touchdown':
+                return trajectory
+
+            # Dynamics may be discontinuous at the event, so restart from the new derivative.
+            k1 = phase.derivative(t, y)
@@ -0,0 +1,450 @@
+"""
+The fixed step simulation as a numeric kernel over flat arrays of floats and integers, without any objects. Used by
+`simulate` for vehicles built only from components the kernel understands:
+
+- stage functions `const`, `linear`, and curves (including `lerp`),
+- constant drag coefficients, and no atmosphere,
+- flight computers whose transitions are all declarative, see rocket_sim.transitions.
+
+The kernel performs the same floating point operations, in the same order, as `Vehicle.step`. Run as Python, its
+results are identical to stepping the vehicle. When Numba is installed the kernel is compiled, and results match to
+within a relative tolerance of `TOLERANCE`, allowing for the compiler evaluating expressions differently.
+"""
+from typing import List, Optional
+import numpy as np
+from .flight_comp import Timer
+from .stage import Stage, Const, Linear
+from .curves import Curve
+from .transitions import TransitionTable, compile_computer
+from .trajectory import Trajectory, FIELDS
+from .vehicle import Vehicle
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+"""
+Whether the kernel is compiled with Numba.
+"""
+COMPILED = numba is not None
+
+"""
+Relative difference allowed between the results of the compiled kernel and of stepping the vehicle.
+"""
+TOLERANCE = 1e-9
+
+
+def _jit(f):
+    return numba.njit(cache=True)(f) if COMPILED else f
+
+
+# Columns of the stage table, one row per stage.
+_STAGE_TIME = 0
+_DRY_MASS = 1
+_DRAG_FACTOR = 2
+_PROPELLANT = 3
+_THRUST = 4
+_PROP_KIND = 5
+_PROP_RATE = 6
+_PROP_CURVE = 7
+_THRUST_KIND = 8
+_THRUST_RATE = 9
+_THRUST_CURVE = 10
+_STAGE_COLUMNS = 11
+
+# Kinds of stage function.
+_CONST = 0
+_LINEAR = 1
+_CURVE = 2
+
+# Float registers of a run: the fields of the vehicle state, in the order of FIELDS, then the following.
+_ELAPSED = 9
+_STAGE_TIME_S = 10
+_PROPELLANT_KG = 11
+_STAGE_THRUST_N = 12
+_TIMER_S = 13
+# Newly computed fields of the state, and the time remaining on the timer, as compared by the transition table.
+_NOW = 14
+_FLOAT_REGISTERS = _NOW + len(FIELDS) + 1
+
+# Integer registers of a run.
+_ROW = 0
+_NEXT_ENGINE = 1
+_COMP_STATE = 2
+_STATUS = 3
+_INT_REGISTERS = 4
+
+# Values of the status register.
+_RUNNING = 0
+_LANDED = 1
+_NO_ENGINE = 2
+_NO_PARACHUTE = 3
+
+# Comparison codes of a transition table, as in rocket_sim.transitions.
+_LT = 0
+_LE = 1
+_GT = 2
+_GE = 3
+
+_EVENT_NAMES = (None, 'Stage', 'Parachute')
+
+
+@_jit
+def _curve_value(times, values, slopes, start, count, step, t):
+    """
+    Same as Curve.value, for the curve stored at `start` of the packed curve arrays.
+    """
+    first = times[start]
+    last = start + count - 1
+    if t <= first:
+        return values[start]
+    if t >= times[last]:
+        return values[last]
+
+    if step > 0.0:
+        i = int((t - first) / step)
+        if i > count - 2:
+            i = count - 2
+    else:
+        # Same as bisect_right.
+        lo = start
+        hi = start + count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if t < times[mid]:
+                hi = mid
+            else:
+                lo = mid + 1
+        i = lo - 1 - start
+
+    j = start + i
+    return values[j] + slopes[j] * (t - times[j])
+
+
+@_jit
+def _stage_constants(stages, row):
+    """
+    :return: mass, drag factor, and functions of the stage at a row of the stage table.
+    """
+    base = row * _STAGE_COLUMNS
+    return (stages[base + _DRY_MASS], stages[base + _DRAG_FACTOR], int(stages[base + _PROP_KIND]),
+            stages[base + _PROP_RATE], int(stages[base + _PROP_CURVE]), int(stages[base + _THRUST_KIND]),
+            stages[base + _THRUST_RATE], int(stages[base + _THRUST_CURVE]))
+
+
+@_jit
+def run(x, ix, stages, engines, parachute, curve_times, curve_values, curve_slopes, curve_start, curve_count,
+        curve_step, field, op, threshold, valid, action, target, counting_down, timer_start, rows, conditions,
+        dt, dt2, out, events, capacity):
+    """
+    Steps a vehicle until it lands, or `capacity` steps have been taken, in which case it can be resumed by calling
+    again with the same registers. All arrays are flat, and may equally be lists.
+    :param x: float registers.
+    :param ix: integer registers. The status register is set once the vehicle lands, or cannot perform an action.
+    :param stages: stage table, of `_STAGE_COLUMNS` columns.
+    :param engines: stage rows of the engine stages to fire, in order.
+    :param parachute: stage row of the parachute, or -1 if none.
+    :param field: transition table, as built by TransitionTable, flattened, through `conditions`.
+    :param dt2: dt**2, as evaluated by Python.
+    :param out: receives each new state, `len(FIELDS)` values per step.
+    :param events: receives the code of the action performed at each step, or 0.
+    :return: number of steps taken.
+    """
+    time = x[0]
+    accel = x[6]
+    velocity = x[7]
+    dist = x[8]
+    elapsed = x[_ELAPSED]
+    stage_time = x[_STAGE_TIME_S]
+    propellant = x[_PROPELLANT_KG]
+    stage_thrust = x[_STAGE_THRUST_N]
+    timer = x[_TIMER_S]
+    row = ix[_ROW]
+    next_engine = ix[_NEXT_ENGINE]
+    s = ix[_COMP_STATE]
+    dry, drag, prop_kind, prop_rate, prop_curve, thrust_kind, thrust_rate, thrust_curve = \
+        _stage_constants(stages, row)
+
+    n = 0
+    while n < capacity:
+        # Same as VehicleState.step.
+        new_time = time + dt
+        mass = dry + propellant
+        air = drag * velocity * abs(velocity)
+        weight = mass * 9.81
+        thrust = stage_thrust
+        net = thrust - weight - air
+        new_accel = net / mass
+        new_velocity = velocity + new_accel * dt
+        new_dist = dist + velocity * dt + 0.5 * accel * dt2
+
+        # Same as the flight computer's transition, see TransitionTable.evaluate. Rows are filled from the first, so
+        # states without transitions are skipped.
+        timer_after = timer - (new_time - time)
+        code = 0
+        taken = -1
+        if valid[s * rows]:
+            x[_NOW] = new_time
+            x[_NOW + 1] = mass
+            x[_NOW + 2] = thrust
+            x[_NOW + 3] = air
+            x[_NOW + 4] = weight
+            x[_NOW + 5] = net
+            x[_NOW + 6] = new_accel
+            x[_NOW + 7] = new_velocity
+            x[_NOW + 8] = new_dist
+            x[_NOW + 9] = timer_after
+
+            for j in range(rows):
+                r = s * rows + j
+                if not valid[r]:
+                    break
+
+                holds = True
+                for c in range(conditions):
+                    k = r * conditions + c
+                    o = op[k]
+                    value = x[_NOW + field[k]]
+                    if o == _LT:
+                        holds = value < threshold[k]
+                    elif o == _LE:
+                        holds = value <= threshold[k]
+                    elif o == _GT:
+                        holds = value > threshold[k]
+                    elif o == _GE:
+                        holds = value >= threshold[k]
+                    if not holds:
+                        break
+
+                if holds:
+                    taken = r
+                    break
+
+        if taken >= 0:
+            code = action[taken]
+            s = target[taken]
+            timer = timer_start[s]
+        elif counting_down[s]:
+            timer = timer_after
+
+        # Same as Vehicle._interpret.
+        if code != 0:
+            if code == 1:
+                if next_engine >= len(engines):
+                    ix[_STATUS] = _NO_ENGINE
+                    break
+                row = engines[next_engine]
+                next_engine += 1
+            else:
+                if parachute < 0:
+                    ix[_STATUS] = _NO_PARACHUTE
+                    break
+                row = parachute
+
+            base = row * _STAGE_COLUMNS
+            stage_time = stages[base + _STAGE_TIME]
+            propellant = stages[base + _PROPELLANT]
+            stage_thrust = stages[base + _THRUST]
+            dry, drag, prop_kind, prop_rate, prop_curve, thrust_kind, thrust_rate, thrust_curve = \
+                _stage_constants(stages, row)
+
+        # Same as Stage.step, with the stage functions `const`, `linear`, or a curve.
+        if propellant > 0.0:
+            if prop_kind == _CONST:
+                new_prop = propellant
+            elif prop_kind == _LINEAR:
+                new_prop = propellant + prop_rate * dt
+            else:
+                new_prop = _curve_value(curve_times, curve_values, curve_slopes, curve_start[prop_curve],
+                                        curve_count[prop_curve], curve_step[prop_curve], stage_time)
+            if thrust_kind == _LINEAR:
+                stage_thrust = stage_thrust + thrust_rate * dt
+            elif thrust_kind == _CURVE:
+                stage_thrust = _curve_value(curve_times, curve_values, curve_slopes, curve_start[thrust_curve],
+                                            curve_count[thrust_curve], curve_step[thrust_curve], stage_time)
+            # Same as max(new_prop, 0.0).
+            propellant = 0.0 if 0.0 > new_prop else new_prop
+        else:
+            propellant = 0.0
+            stage_thrust = 0.0
+        stage_time = stage_time + dt
+
+        k = n * 9
+        out[k] = new_time
+        out[k + 1] = mass
+        out[k + 2] = thrust
+        out[k + 3] = air
+        out[k + 4] = weight
+        out[k + 5] = net
+        out[k + 6] = new_accel
+        out[k + 7] = new_velocity
+        out[k + 8] = new_dist
+        events[n] = code
+        n += 1
+
+        time = new_time
+        accel = new_accel
+        velocity = new_velocity
+        dist = new_dist
+
+        # Same as has_landed.
+        elapsed += dt
+        if elapsed >= 5.0 and velocity < 0 and dist <= 0:
+            ix[_STATUS] = _LANDED
+            break
+
+    if n > 0:
+        k = (n - 1) * 9
+        for f in range(9):
+            x[f] = out[k + f]
+    x[_ELAPSED] = elapsed
+    x[_STAGE_TIME_S] = stage_time
+    x[_PROPELLANT_KG] = propellant
+    x[_STAGE_THRUST_N] = stage_thrust
+    x[_TIMER_S] = timer
+    ix[_ROW] = row
+    ix[_NEXT_ENGINE] = next_engine
+    ix[_COMP_STATE] = s
+    return n
+
+
+def _kind(f) -> Optional[int]:
+    if type(f) is Const:
+        return _CONST
+    if type(f) is Linear:
+        return _LINEAR
+    if isinstance(f, Curve):
+        return _CURVE
+    return None
+
+
+def _stages(vehicle: Vehicle) -> List[Stage]:
+    stages = [vehicle.stage] + vehicle.remaining_engine_stages[vehicle._next_engine:]
+    if vehicle.parachute_stage is not None:
+        stages.append(vehicle.parachute_stage)
+    return stages
+
+
+def compatible(vehicle: Vehicle) -> bool:
+    """
+    :return: whether the vehicle can be simulated by the kernel.
+    """
+    if vehicle.atmosphere is not None:
+        return False
+
+    for s in _stages(vehicle):
+        if isinstance(s.drag_coefficient, Curve):
+            return False
+        if _kind(s.f_propellant_mass_kg) is None or _kind(s.f_thrust_N) is None:
+            return False
+
+    return not any(compile_computer(vehicle.computer_state).opaque)
+
+
+class _Program:
+    """
+    A vehicle converted to the arrays the kernel runs on.
+    """
+
+    def __init__(self, vehicle: Vehicle, dt: float):
+        stages = _stages(vehicle)
+        curves: List[Curve] = []
+
+        def curve_index(f) -> int:
+            if not isinstance(f, Curve):
+                return 0
+            curves.append(f)
+            return len(curves) - 1
+
+        table = np.zeros((len(stages), _STAGE_COLUMNS))
+        for i, s in enumerate(stages):
+            p = s.f_propellant_mass_kg
+            t = s.f_thrust_N
+            # Same order of operations as Stage.total_mass_kg and VehicleState.step.
+            table[i] = (s.stage_time_s, s.engine_case_mass_kg + s.empty_mass_kg,
+                        0.5 * 1.2 * s.drag_coefficient * s.area_m2, s.propellant_mass_kg, s.thrust_N,
+                        _kind(p), p.dx_per_sec if type(p) is Linear else 0.0, curve_index(p),
+                        _kind(t), t.dx_per_sec if type(t) is Linear else 0.0, curve_index(t))
+
+        engine_count = len(vehicle.remaining_engine_stages) - vehicle._next_engine
+        self.stages = table.ravel()
+        self.engines = np.arange(1, 1 + engine_count, dtype=np.int64)
+        self.parachute = -1 if vehicle.parachute_stage is None else len(stages) - 1
+
+        curves = curves or [Curve([0.0], [0.0])]
+        self.curve_times = np.concatenate([c.times for c in curves])
+        self.curve_values = np.concatenate([c.values for c in curves])
+        self.curve_slopes = np.concatenate([c.slopes for c in curves])
+        self.curve_count = np.array([len(c) for c in curves], dtype=np.int64)
+        self.curve_start = np.concatenate(([0], np.cumsum(self.curve_count)[:-1])).astype(np.int64)
+        self.curve_step = np.array([c.step_s or 0.0 for c in curves])
+
+        transitions: TransitionTable = compile_computer(vehicle.computer_state).arrays()
+        self.field = transitions.field.ravel().astype(np.int64)
+        self.op = transitions.op.ravel().astype(np.int64)
+        self.threshold = transitions.threshold.ravel()
+        self.valid = transitions.valid.ravel().astype(np.int64)
+        self.action = transitions.action.ravel().astype(np.int64)
+        self.target = transitions.target.ravel().astype(np.int64)
+        self.counting_down = transitions.counting_down.astype(np.int64)
+        self.timer_start = np.array([c.time_rem_s if type(c) is Timer else 0.0 for c in transitions.states])
+        self.rows, self.conditions = transitions.threshold.shape[1:]
+
+        self.x = np.zeros(_FLOAT_REGISTERS)
+        state = vehicle.state
+        self.x[:len(FIELDS)] = [getattr(state, f) for f in FIELDS]
+        self.x[_STAGE_TIME_S] = vehicle.stage.stage_time_s
+        self.x[_PROPELLANT_KG] = vehicle.stage.propellant_mass_kg
+        self.x[_STAGE_THRUST_N] = vehicle.stage.thrust_N
+        self.x[_TIMER_S] = self.timer_start[0]
+        self.ix = np.zeros(_INT_REGISTERS, dtype=np.int64)
+
+        self.dt = dt
+        self.dt2 = dt**2
+
+    def arguments(self) -> tuple:
+        args = (self.x, self.ix, self.stages, self.engines, self.parachute, self.curve_times, self.curve_values,
+                self.curve_slopes, self.curve_start, self.curve_count, self.curve_step, self.field, self.op,
+                self.threshold, self.valid, self.action, self.target, self.counting_down, self.timer_start)
+        if not COMPILED:
+            # Python floats and lists are much faster than NumPy scalars when not compiled.
+            args = tuple(a.tolist() if isinstance(a, np.ndarray) else a for a in args)
+        return args + (self.rows, self.conditions, self.dt, self.dt2)
+
+
+def simulate_kernel(vehicle: Vehicle, dt: float, chunk_size: int = 65536, trajectory: Optional[Trajectory] = None,
+                    elapsed_s: float = 0.0) -> Trajectory:
+    """
+    :param vehicle: vehicle for which `compatible` holds. It is not modified.
+    :param dt: time step, i.e. resolution.
+    :param chunk_size: number of steps to take between copying states into the trajectory.
+    :param trajectory: trajectory to add the states to, if not a new one.
+    :param elapsed_s: time the vehicle has already been simulated for, when continuing a simulation.
+    :return: recorded states of the vehicle until it returns to ground, the same as stepping it.
+    """
+    program = _Program(vehicle, dt)
+    program.x[_ELAPSED] = elapsed_s
+    args = program.arguments()
+    ix = args[1]
+    if trajectory is None:
+        trajectory = Trajectory(chunk_size)
+
+    if COMPILED:
+        out = np.empty(chunk_size * len(FIELDS))
+        events = np.zeros(chunk_size, dtype=np.int64)
+    else:
+        out = [0.0] * (chunk_size * len(FIELDS))
+        events = [0] * chunk_size
+
+    while ix[_STATUS] == _RUNNING:
+        n = run(*args, out, events, chunk_size)
+        columns = np.asarray(out[:n * len(FIELDS)], dtype=np.float64).reshape(n, len(FIELDS)).T
+        trajectory.extend(columns, [(i, _EVENT_NAMES[events[i]]) for i in range(n) if events[i] != 0])
+
+    if ix[_STATUS] == _NO_ENGINE:
+        raise RuntimeError('No engine stage to fire')
+    if ix[_STATUS] == _NO_PARACHUTE:
+        raise RuntimeError('No parachute to eject')
+
+    return trajectory
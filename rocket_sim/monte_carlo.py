@@ -0,0 +1,159 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from .vehicle import Vehicle
+from .simulations import Simulation
+from .batch import simulate_batch
+
+"""
+Creates a vehicle, and its name, from keyword parameters, e.g. the examples in vehicle_examples.py.
+"""
+vehicle_factory = Callable[..., Tuple[Vehicle, str]]
+
+
+class Distribution:
+    """
+    Distribution of a vehicle parameter.
+    """
+    def sample(self, rng: np.random.RandomState) -> float:
+        raise NotImplementedError
+
+
+class Normal(Distribution):
+    mean: float
+    std: float
+
+    def __init__(self, mean: float, std: float):
+        self.mean = mean
+        self.std = std
+
+    def sample(self, rng: np.random.RandomState) -> float:
+        return float(rng.normal(self.mean, self.std))
+
+
+class Uniform(Distribution):
+    low: float
+    high: float
+
+    def __init__(self, low: float, high: float):
+        self.low = low
+        self.high = high
+
+    def sample(self, rng: np.random.RandomState) -> float:
+        return float(rng.uniform(self.low, self.high))
+
+
+class FlightSummary:
+    """
+    Key results of a simulation, small enough to send between processes.
+    """
+    apogee_m: float
+    apogee_time_s: float
+    maximum_g_force: float
+    maximum_g_force_time_s: float
+    maximum_velocity_ms: float
+    impact_velocity_ms: float
+    total_time_s: float
+    events: List[Tuple[float, str]]
+
+    def __init__(self, sim: Simulation):
+        self.apogee_m, self.apogee_time_s = sim.apogee
+        self.maximum_g_force, self.maximum_g_force_time_s = sim.maximum_g_force
+        self.maximum_velocity_ms, _ = sim.maximum_velocity
+        self.impact_velocity_ms = sim.impact_velocity
+        self.total_time_s = sim.total_time
+        self.events = sim.events
+
+    def event_time(self, name: str) -> Optional[float]:
+        """
+        :return: time of first occurrence of event, or None if it did not occur.
+        """
+        for t, event in self.events:
+            if event == name:
+                return t
+        return None
+
+
+class MonteCarloResult:
+    """
+    Sampled parameters and flight summary of each run, in run order.
+    """
+    params: List[Dict[str, float]]
+    summaries: List[FlightSummary]
+
+    def __init__(self, params: List[Dict[str, float]], summaries: List[FlightSummary]):
+        self.params = params
+        self.summaries = summaries
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def metric(self, name: str) -> np.ndarray:
+        """
+        :param name: attribute of FlightSummary, e.g. 'apogee_m', or name of an event, e.g. 'Parachute', for the
+               time of that event (NaN for runs where it did not occur).
+        :return: value of the metric for each run.
+        """
+        if name in FlightSummary.__annotations__:
+            return np.array([getattr(s, name) for s in self.summaries], dtype=np.float64)
+
+        times = [s.event_time(name) for s in self.summaries]
+        return np.array([np.nan if t is None else t for t in times], dtype=np.float64)
+
+    def param(self, name: str) -> np.ndarray:
+        return np.array([p[name] for p in self.params], dtype=np.float64)
+
+    def percentiles(self, name: str, qs=(5, 50, 95)) -> np.ndarray:
+        return np.nanpercentile(self.metric(name), qs)
+
+
+def sample_params(distributions: Dict[str, Distribution], seed: int, run: int) -> Dict[str, float]:
+    """
+    Each run has its own random stream derived from the seed and run index, so results do not depend on how runs are
+    split between workers.
+    :return: parameters of the run.
+    """
+    rng = np.random.RandomState([seed, run])
+    return {name: distributions[name].sample(rng) for name in sorted(distributions)}
+
+
+def _run_chunk(factory: vehicle_factory, distributions: Dict[str, Distribution], dt: float, seed: int,
+               start: int, stop: int) -> List[Tuple[Dict[str, float], FlightSummary]]:
+    """
+    Simulates runs `start` to `stop`, returning only their summaries.
+    """
+    params = [sample_params(distributions, seed, run) for run in range(start, stop)]
+    sims = simulate_batch([factory(**p)[0] for p in params], dt)
+    return [(p, FlightSummary(sim)) for p, sim in zip(params, sims)]
+
+
+def monte_carlo(factory: vehicle_factory,
+                distributions: Dict[str, Distribution],
+                runs: int,
+                dt: float,
+                seed: int = 0,
+                workers: Optional[int] = None,
+                chunk_size: int = 64) -> MonteCarloResult:
+    """
+    :param factory: creates a vehicle from parameters sampled from `distributions`.
+    :param distributions: distribution of each keyword parameter of `factory`.
+    :param runs: number of vehicles to simulate.
+    :param dt: time step, i.e. resolution.
+    :param seed: seed of the random streams. The same seed gives the same results, regardless of `workers`.
+    :param workers: number of processes to use. If 1, runs are performed in this process. If None, uses a process
+           per CPU.
+    :param chunk_size: number of runs simulated together by a worker.
+    :return: parameters and flight summary of each run.
+    """
+    chunks = [(start, min(start + chunk_size, runs)) for start in range(0, runs, chunk_size)]
+
+    if workers == 1:
+        results = [_run_chunk(factory, distributions, dt, seed, start, stop) for start, stop in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_chunk, factory, distributions, dt, seed, start, stop)
+                       for start, stop in chunks]
+            results = [f.result() for f in futures]
+
+    rows = [row for chunk in results for row in chunk]
+    return MonteCarloResult([p for p, _ in rows], [s for _, s in rows])
@@ -0,0 +1,481 @@
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Tuple, Union, Callable
+import csv
+import itertools
+import math
+import os
+import numpy as np
+from .vehicle import Vehicle
+from .sinks import Summary
+from .simulations import has_landed
+from .monte_carlo import vehicle_factory, FlightSummary
+
+"""
+Lower and upper bound of each keyword parameter of a vehicle factory.
+"""
+param_bounds = Dict[str, Tuple[float, float]]
+
+# Status of a trial.
+COMPLETE = 'complete'
+INFEASIBLE = 'infeasible'
+PRUNED = 'pruned'
+
+_G = 9.81
+
+# Metrics of FlightSummary which can be optimized or limited.
+_METRICS = [name for name in FlightSummary.__annotations__ if name != 'events']
+
+
+class Objective:
+    """
+    Metric of a flight to maximize or minimize, subject to limits on other metrics.
+    """
+    metric: str
+    maximize: bool
+    limits: Dict[str, Tuple[Optional[float], Optional[float]]]
+
+    def __init__(self, metric: str = 'apogee_m', maximize: bool = True,
+                 limits: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None):
+        """
+        :param metric: attribute of FlightSummary, e.g. 'apogee_m'.
+        :param maximize: whether to maximize, rather than minimize, the metric.
+        :param limits: lowest and highest allowed value, either of which may be None, of metrics, e.g.
+               {'maximum_g_force': (None, 15.0), 'impact_velocity_ms': (-8.0, None)}.
+        """
+        self.limits = limits or {}
+        for name in [metric] + list(self.limits):
+            if name not in _METRICS:
+                raise ValueError(f'Unknown metric {name}, expected one of {_METRICS}')
+
+        self.metric = metric
+        self.maximize = maximize
+
+    def violation(self, summary: FlightSummary) -> float:
+        """
+        :return: total amount by which metrics exceed their limits, relative to the limits, or zero if within them.
+        """
+        total = 0.0
+        for name, (low, high) in self.limits.items():
+            value = getattr(summary, name)
+            if low is not None and value < low:
+                total += (low - value) / max(abs(low), 1.0)
+            if high is not None and value > high:
+                total += (value - high) / max(abs(high), 1.0)
+        return total
+
+    def violations(self, summary: FlightSummary) -> List[str]:
+        """
+        :return: metrics which are outside of their limits.
+        """
+        violated = []
+        for name, (low, high) in self.limits.items():
+            value = getattr(summary, name)
+            if (low is not None and value < low) or (high is not None and value > high):
+                violated.append(name)
+        return violated
+
+    def score(self, summary: FlightSummary) -> float:
+        """
+        :return: value of the metric, negated if minimizing, so a higher score is always better.
+        """
+        value = getattr(summary, self.metric)
+        return value if self.maximize else -value
+
+
+class Trial:
+    """
+    Result of simulating a vehicle with a set of parameters.
+    """
+    params: Dict[str, float]
+    status: str
+    summary: Optional[FlightSummary]
+    score: float
+    violation: float
+
+    def __init__(self, params: Dict[str, float], status: str, summary: Optional[FlightSummary], score: float,
+                 violation: float = 0.0):
+        """
+        :param status: COMPLETE, INFEASIBLE if the flight violated a limit, or PRUNED if the simulation was stopped
+               early as it could not beat the best score.
+        :param summary: results of the flight, or None if the simulation was stopped early.
+        :param score: score of the flight, or -inf unless it is complete.
+        :param violation: amount by which the flight exceeded its limits, see `Objective.violation`. If the flight
+               was stopped early, the amount by which it had exceeded them when it was stopped.
+        """
+        self.params = params
+        self.status = status
+        self.summary = summary
+        self.score = score
+        self.violation = violation
+
+    def rank(self) -> Tuple[int, float]:
+        """
+        :return: key ordering trials from worst to best: pruned trials, then infeasible trials by how far they
+            exceeded their limits, then complete trials by score.
+        """
+        if self.status == COMPLETE:
+            return 1, self.score
+        if self.status == INFEASIBLE:
+            return 0, -self.violation
+        return -1, 0.0
+
+
+def _apogee_bound(state, dt: float, gravity_ms2: float = _G) -> float:
+    """
+    Gravity and drag both slow a coasting vehicle while it ascends, so it can climb at most as high as it would under
+    gravity alone. Includes a step of slack for the discrete integration.
+    :param state: state of a coasting vehicle.
+    :param gravity_ms2: lowest gravity the vehicle can experience.
+    :return: upper bound on the highest altitude the vehicle will reach.
+    """
+    v = max(state.velocity_ms, 0.0)
+    return state.dist_m + v*v / (2*gravity_ms2) + v*dt + 0.5 * max(state.accel_ms2, 0.0) * dt**2
+
+
+def evaluate(factory: vehicle_factory, params: Dict[str, float], dt: float, objective: Objective,
+             threshold: Optional[float] = None) -> Trial:
+    """
+    Simulates a vehicle, stopping as soon as it is known to violate a limit on its maximum g-force or velocity, or,
+    when maximizing apogee, as soon as it can no longer reach `threshold`.
+    :param factory: creates the vehicle from `params`.
+    :param threshold: score the flight needs to reach to be of interest, e.g. the best score so far.
+    :return: result of the flight.
+    """
+    vehicle, _ = factory(**params)
+    vehicle = vehicle.copy()
+
+    max_g = objective.limits.get('maximum_g_force', (None, None))[1]
+    max_velocity = objective.limits.get('maximum_velocity_ms', (None, None))[1]
+    prune_apogee = threshold is not None and objective.metric == 'apogee_m' and objective.maximize
+
+    gravity_ms2 = _G if vehicle.atmosphere is None else vehicle.atmosphere.minimum_gravity_ms2
+
+    summary = Summary()
+    t = 0.0
+    while True:
+        vehicle.step_in_place(dt)
+        s = vehicle.state
+        summary.append(s)
+
+        t += dt
+        if has_landed(t, s):
+            break
+
+        # Maxima only increase, so once over the limit the flight is infeasible.
+        if max_g is not None and s.accel_ms2 / _G > max_g:
+            return Trial(params, INFEASIBLE, None, -math.inf, (s.accel_ms2 / _G - max_g) / max(abs(max_g), 1.0))
+        if max_velocity is not None and s.velocity_ms > max_velocity:
+            return Trial(params, INFEASIBLE, None, -math.inf,
+                         (s.velocity_ms - max_velocity) / max(abs(max_velocity), 1.0))
+
+        if prune_apogee and vehicle.coasting() and max(summary.apogee[0], _apogee_bound(s, dt, gravity_ms2)) < threshold:
+            return Trial(params, PRUNED, None, -math.inf)
+
+    result = FlightSummary(summary)
+    if objective.violations(result):
+        return Trial(params, INFEASIBLE, result, -math.inf, objective.violation(result))
+
+    return Trial(params, COMPLETE, result, objective.score(result))
+
+
+class SweepResult:
+    """
+    Trials of a sweep or optimization, in the order they were run.
+    """
+    trials: List[Trial]
+
+    def __init__(self, factory: vehicle_factory, dt: float, objective: Objective, trials: List[Trial]):
+        self.factory = factory
+        self.dt = dt
+        self.objective = objective
+        self.trials = trials
+
+    def __len__(self) -> int:
+        return len(self.trials)
+
+    @property
+    def best(self) -> Optional[Trial]:
+        """
+        :return: complete trial with the highest score, the earliest if tied, or None if no trial was feasible.
+        """
+        complete = [t for t in self.trials if t.status == COMPLETE]
+        if len(complete) == 0:
+            return None
+        return max(complete, key=lambda t: t.score)
+
+    def best_vehicle(self) -> Tuple[Vehicle, str]:
+        """
+        :return: vehicle of the best trial, recreated from its parameters. Simulating it with `dt` gives the same
+            results as the trial.
+        """
+        best = self.best
+        if best is None:
+            raise RuntimeError('No feasible trial')
+        return self.factory(**best.params)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        :return: parameters, status, score, and metrics of each trial. Metrics of trials stopped early are NaN.
+        """
+        names = sorted({name for t in self.trials for name in t.params})
+        columns = {name: np.array([t.params.get(name, np.nan) for t in self.trials], dtype=np.float64)
+                   for name in names}
+        columns['status'] = np.array([t.status for t in self.trials], dtype=object)
+        columns['score'] = np.array([t.score for t in self.trials], dtype=np.float64)
+
+        for metric in _METRICS:
+            columns[metric] = np.array([np.nan if t.summary is None else getattr(t.summary, metric)
+                                        for t in self.trials], dtype=np.float64)
+        return columns
+
+    def to_csv(self, path: str):
+        columns = self.columns()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(columns))
+            writer.writerows(zip(*columns.values()))
+
+
+def grid(bounds: param_bounds, steps: Union[int, Dict[str, int]]) -> List[Dict[str, float]]:
+    """
+    :param steps: number of evenly spaced values of each parameter, including its bounds.
+    :return: every combination of parameter values.
+    """
+    names = sorted(bounds)
+    axes = []
+    for name in names:
+        n = steps[name] if isinstance(steps, dict) else steps
+        axes.append(np.linspace(bounds[name][0], bounds[name][1], n).tolist())
+
+    return [dict(zip(names, values)) for values in itertools.product(*axes)]
+
+
+def latin_hypercube(bounds: param_bounds, n: int, seed: int = 0) -> List[Dict[str, float]]:
+    """
+    :return: `n` parameter sets, such that each of `n` equal divisions of each parameter's range contains exactly one.
+    """
+    rng = np.random.RandomState(seed)
+    names = sorted(bounds)
+    samples = []
+    for name in names:
+        low, high = bounds[name]
+        u = (rng.permutation(n) + rng.uniform(size=n)) / n
+        samples.append(low + u * (high - low))
+
+    return [{name: float(samples[j][i]) for j, name in enumerate(names)} for i in range(n)]
+
+
+class _Runner:
+    """
+    Evaluates trials, in this process or in a pool of processes.
+    """
+
+    def __init__(self, factory: vehicle_factory, dt: float, objective: Objective, workers: Optional[int]):
+        self.factory = factory
+        self.dt = dt
+        self.objective = objective
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+
+    def __enter__(self) -> '_Runner':
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def run(self, candidates: List[Dict[str, float]], threshold: Callable[[List[Trial]], Optional[float]]) \
+            -> List[Trial]:
+        """
+        :param threshold: score to prune against when a trial is started, given the trials finished so far.
+        :return: trial of each candidate, in order.
+        """
+        trials: List[Optional[Trial]] = [None] * len(candidates)
+        finished: List[Trial] = []
+
+        if self.pool is None:
+            for i, params in enumerate(candidates):
+                trials[i] = evaluate(self.factory, params, self.dt, self.objective, threshold(finished))
+                finished.append(trials[i])
+            return trials
+
+        # Keep a few trials queued per worker, so each starts with a recent threshold.
+        queued = iter(enumerate(candidates))
+        pending = {}
+
+        def submit():
+            for i, params in itertools.islice(queued, 1):
+                f = self.pool.submit(evaluate, self.factory, params, self.dt, self.objective, threshold(finished))
+                pending[f] = i
+
+        for _ in range(2 * self.workers):
+            submit()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                i = pending.pop(f)
+                trials[i] = f.result()
+                finished.append(trials[i])
+                submit()
+
+        return trials
+
+
+def _best_score(trials: List[Trial]) -> Optional[float]:
+    scores = [t.score for t in trials if t.status == COMPLETE]
+    return max(scores) if scores else None
+
+
+def sweep(factory: vehicle_factory,
+          candidates: List[Dict[str, float]],
+          dt: float,
+          objective: Objective,
+          workers: Optional[int] = None,
+          prune: bool = True) -> SweepResult:
+    """
+    Simulates every candidate, e.g. from `grid` or `latin_hypercube`.
+    :param factory: creates a vehicle from the keyword parameters of a candidate.
+    :param dt: time step, i.e. resolution.
+    :param workers: number of processes to use. If 1, candidates are simulated in this process. If None, uses a
+           process per CPU.
+    :param prune: stop simulating candidates which can no longer beat the best score so far. Which candidates are
+           pruned depends on the order trials finish in, but the best trial does not.
+    :return: trial of each candidate, in the same order.
+    """
+    threshold = _best_score if prune else (lambda _: None)
+    with _Runner(factory, dt, objective, workers) as runner:
+        return SweepResult(factory, dt, objective, runner.run(candidates, threshold))
+
+
+def nelder_mead(factory: vehicle_factory,
+                bounds: param_bounds,
+                dt: float,
+                objective: Objective,
+                start: Optional[Dict[str, float]] = None,
+                step: float = 0.1,
+                iterations: int = 100,
+                tolerance: float = 1e-6,
+                restarts: int = 3,
+                workers: Optional[int] = 1,
+                prune: bool = True) -> SweepResult:
+    """
+    Searches for the parameters with the best score using the Nelder-Mead simplex method, with parameters scaled to
+    their bounds. Infeasible parameters rank below feasible ones, by how far they exceed their limits, so the search
+    moves towards feasible parameters.
+    :param start: initial parameters. Defaults to the middle of the bounds.
+    :param step: size of the initial simplex, as a fraction of each parameter's range.
+    :param iterations: maximum number of iterations.
+    :param tolerance: stop when the scores of the simplex differ by no more than this.
+    :param restarts: number of times to rebuild the simplex around the best point if it collapses.
+    :param workers: number of processes to use. With more than one, the candidate points of each iteration are
+           simulated at the same time.
+    :param prune: stop simulating candidates which cannot beat the worst point of the simplex, as they would be
+           rejected anyway.
+    :return: every trial simulated, in order. The best trial is the result of the search.
+    """
+    names = sorted(bounds)
+    low = np.array([bounds[name][0] for name in names])
+    high = np.array([bounds[name][1] for name in names])
+    n = len(names)
+
+    trials: List[Trial] = []
+    # Trial at each point, and the threshold it was pruned against, if any.
+    known: Dict[Tuple[float, ...], Tuple[Trial, Optional[float]]] = {}
+
+    # The search moves freely, with each coordinate folded into its parameter's bounds by (1 - cos(pi*y))/2. Unlike
+    # clipping, this does not collapse the simplex against a bound.
+    def params(y: np.ndarray) -> Dict[str, float]:
+        u = 0.5 * (1.0 - np.cos(np.pi * y))
+        return {name: float(x) for name, x in zip(names, low + u * (high - low))}
+
+    def usable(u: np.ndarray, threshold: Optional[float]) -> bool:
+        if tuple(u) not in known:
+            return False
+        trial, pruned_at = known[tuple(u)]
+        # A trial pruned against a threshold also cannot reach any higher threshold.
+        return trial.status != PRUNED or (threshold is not None and threshold >= pruned_at)
+
+    def ranks(points: List[np.ndarray], threshold: Optional[float]) -> List[Tuple[int, float]]:
+        missing = [u for u in points if not usable(u, threshold)]
+        if missing:
+            run = runner.run([params(u) for u in missing], lambda _: threshold if prune else None)
+            for u, trial in zip(missing, run):
+                trials.append(trial)
+                known[tuple(u)] = (trial, threshold)
+
+        return [known[tuple(u)][0].rank() for u in points]
+
+    if start is None:
+        y0 = np.full(n, 0.5)
+    else:
+        u0 = (np.array([start[name] for name in names]) - low) / (high - low)
+        y0 = np.arccos(1.0 - 2.0 * np.clip(u0, 0.0, 1.0)) / np.pi
+
+    with _Runner(factory, dt, objective, workers) as runner:
+        def around(y: np.ndarray) -> List[np.ndarray]:
+            simplex = [y]
+            for i in range(n):
+                x = y.copy()
+                x[i] += step
+                simplex.append(x)
+            return simplex
+
+        simplex = around(y0)
+        fs = ranks(simplex, None)
+
+        for _ in range(iterations):
+            order = sorted(range(n + 1), key=lambda i: fs[i], reverse=True)
+            simplex = [simplex[i] for i in order]
+            fs = [fs[i] for i in order]
+
+            if all(f[0] == 1 for f in fs) and fs[0][1] - fs[-1][1] <= tolerance:
+                break
+
+            if np.linalg.matrix_rank(np.array(simplex[1:]) - simplex[0], tol=1e-9) < n:
+                if restarts == 0:
+                    break
+                restarts -= 1
+                simplex = around(simplex[0])
+                fs = [fs[0]] + ranks(simplex[1:], None)
+                continue
+
+            worst, f_worst = simplex[-1], fs[-1]
+            centroid = np.mean(simplex[:-1], axis=0)
+            reflected = 2*centroid - worst
+            expanded = 3*centroid - 2*worst
+            outside = centroid + 0.5*(reflected - centroid)
+            inside = centroid + 0.5*(worst - centroid)
+
+            # Every candidate only matters if it beats the worst point, so can be pruned against it.
+            threshold = f_worst[1] if f_worst[0] == 1 else None
+            if runner.pool is not None:
+                # Evaluate every candidate the iteration might need at once.
+                ranks([reflected, expanded, outside, inside], threshold)
+
+            (f_r,) = ranks([reflected], threshold)
+            if f_r > fs[0]:
+                (f_e,) = ranks([expanded], threshold)
+                simplex[-1], fs[-1] = (expanded, f_e) if f_e > f_r else (reflected, f_r)
+                continue
+
+            if f_r >= fs[-2]:
+                simplex[-1], fs[-1] = reflected, f_r
+                continue
+
+            if f_r > f_worst:
+                (f_c,) = ranks([outside], threshold)
+                accepted = f_c >= f_r
+            else:
+                (f_c,) = ranks([inside], threshold)
+                accepted = f_c > f_worst
+
+            if accepted:
+                simplex[-1], fs[-1] = (outside if f_r > f_worst else inside), f_c
+                continue
+
+            # Shrink towards the best point.
+            simplex = [simplex[0]] + [simplex[0] + 0.5*(x - simplex[0]) for x in simplex[1:]]
+            fs = [fs[0]] + ranks(simplex[1:], None)
+
+    return SweepResult(factory, dt, objective, trials)
@@ -0,0 +1,277 @@
+"""
+Opt-in instrumentation of `simulate`, to find where the time of a slow simulation goes, e.g.
+
+    profiler = Profiler()
+    simulate(vehicle, dt=0.001, profiler=profiler)
+    print(profiler.profile)
+
+Simulations which are not profiled are not affected.
+"""
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+import copy
+import cProfile
+import pstats
+import time
+import tracemalloc
+from .stage import Stage, Const, Linear
+from .curves import Curve
+from .state import VehicleState
+from .trajectory import Trajectory
+from .vehicle import Vehicle
+
+# Phases of a step, in the order they occur.
+PHASES = ('physics', 'computer', 'stages', 'record')
+
+
+class Profile:
+    """
+    Measurements of a profiled simulation. Calls are counted per flight computer transition, labelled by the name of
+    the computer state and the position of the transition, and per stage function, labelled by the stage and
+    function.
+    """
+    steps: int
+    wall_s: float
+    phase_s: Dict[str, float]
+    calls: Dict[str, int]
+    call_s: Dict[str, float]
+    peak_bytes: Optional[int]
+    retained_bytes: Optional[int]
+    retained_blocks: Optional[int]
+    stats: Optional[pstats.Stats]
+
+    def __init__(self):
+        self.steps = 0
+        self.wall_s = 0.0
+        self.phase_s = {p: 0.0 for p in PHASES}
+        self.calls = {}
+        self.call_s = {}
+        self.peak_bytes = None
+        self.retained_bytes = None
+        self.retained_blocks = None
+        self.stats = None
+
+    @property
+    def steps_per_s(self) -> float:
+        return self.steps / self.wall_s if self.wall_s > 0.0 else 0.0
+
+    def add_call(self, label: str, seconds: float):
+        self.calls[label] = self.calls.get(label, 0) + 1
+        self.call_s[label] = self.call_s.get(label, 0.0) + seconds
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            'steps': self.steps,
+            'wall_s': self.wall_s,
+            'steps_per_s': self.steps_per_s,
+            'phase_s': dict(self.phase_s),
+            'calls': {label: {'count': n, 'seconds': self.call_s[label]} for label, n in self.calls.items()},
+            'peak_bytes': self.peak_bytes,
+            'retained_bytes': self.retained_bytes,
+            'retained_blocks': self.retained_blocks,
+        }
+
+    def __str__(self) -> str:
+        lines = [f'{self.steps} steps in {self.wall_s:.3f} s ({self.steps_per_s:.0f} steps/s)']
+        for p in PHASES:
+            lines.append(f'  {p:<10} {self.phase_s[p]:10.4f} s')
+        for label in sorted(self.calls, key=lambda k: -self.call_s[k]):
+            lines.append(f'  {self.calls[label]:10d} calls {self.call_s[label]:10.4f} s  {label}')
+        if self.peak_bytes is not None:
+            lines.append(f'  peak {self.peak_bytes} B, retained {self.retained_bytes} B in {self.retained_blocks} '
+                         f'blocks')
+        return '\n'.join(lines)
+
+
+def _describe(f) -> str:
+    if type(f) in (Const, Linear) or isinstance(f, Curve):
+        return type(f).__name__
+    return getattr(f, '__qualname__', type(f).__name__)
+
+
+class _Counted:
+    """
+    Wraps a transition or stage function, counting and timing its calls.
+    """
+    __slots__ = ('f', 'label', 'profile')
+
+    def __init__(self, f, label: str, profile: Profile):
+        self.f = f
+        self.label = label
+        self.profile = profile
+
+    def __call__(self, *args):
+        start = time.perf_counter()
+        try:
+            return self.f(*args)
+        finally:
+            self.profile.add_call(self.label, time.perf_counter() - start)
+
+
+class Profiler:
+    """
+    Measures a simulation: time spent in each phase of a step, calls to each transition and stage function, and
+    optionally memory allocated, through tracemalloc, and a full cProfile of the run.
+
+    Calls are counted through copies of the stages and flight computer states of the vehicle, whose functions and
+    transitions are wrapped, so the vehicle given, and the states its transitions lead to, are not modified.
+    """
+    callback: Optional[Callable[[Profile], None]]
+    every: int
+    allocations: bool
+    cprofile: bool
+    profile: Optional[Profile]
+
+    def __init__(self, callback: Optional[Callable[[Profile], None]] = None, every: int = 1000,
+                 allocations: bool = False, cprofile: bool = False):
+        """
+        :param callback: called with the profile so far every `every` steps, and with the final profile.
+        :param allocations: trace memory allocated during the run with tracemalloc. Slows the run considerably.
+        :param cprofile: also run cProfile, whose statistics are kept in `Profile.stats`.
+        """
+        self.callback = callback
+        self.every = every
+        self.allocations = allocations
+        self.cprofile = cprofile
+        self.profile = None
+
+        # Counted transitions of each transition list, by id of the list, with the list to keep its id in use.
+        self._wrapped: Dict[int, Tuple[list, list]] = {}
+        self._counted: Set[int] = set()
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._started_tracing = False
+        self._before = None
+        self._start = 0.0
+
+    def start(self, vehicle: Vehicle) -> Vehicle:
+        """
+        :param vehicle: vehicle to simulate.
+        :return: copy of the vehicle, whose stage functions are counted, to simulate.
+        """
+        p = self.profile = Profile()
+        vehicle = vehicle.copy()
+
+        stages: List[Tuple[str, Optional[Stage]]] = [('stage 0', vehicle.stage)]
+        stages += [(f'stage {i + 1}', s) for i, s in enumerate(vehicle.remaining_engine_stages)]
+        stages.append(('parachute', vehicle.parachute_stage))
+        for name, s in stages:
+            if s is not None:
+                s.f_propellant_mass_kg = _Counted(s.f_propellant_mass_kg,
+                                                  f'{name} f_propellant_mass_kg {_describe(s.f_propellant_mass_kg)}', p)
+                s.f_thrust_N = _Counted(s.f_thrust_N, f'{name} f_thrust_N {_describe(s.f_thrust_N)}', p)
+
+        self._watch(vehicle)
+
+        if self.allocations:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._before = tracemalloc.take_snapshot()
+
+        if self.cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+        self._start = time.perf_counter()
+        return vehicle
+
+    def stop(self) -> Profile:
+        """
+        Finishes measuring.
+        """
+        p = self.profile
+        p.wall_s = time.perf_counter() - self._start
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            p.stats = pstats.Stats(self._cprofile)
+            self._cprofile = None
+
+        if self.allocations:
+            _, p.peak_bytes = tracemalloc.get_traced_memory()
+            diff = tracemalloc.take_snapshot().compare_to(self._before, 'filename')
+            p.retained_bytes = sum(d.size_diff for d in diff)
+            p.retained_blocks = sum(d.count_diff for d in diff)
+            self._before = None
+            if self._started_tracing:
+                tracemalloc.stop()
+
+        self._wrapped.clear()
+        self._counted.clear()
+
+        if self.callback is not None:
+            self.callback(p)
+        return p
+
+    def _watch(self, vehicle: Vehicle):
+        """
+        Replaces the computer state of the vehicle with a copy whose transitions are counted, if they are not already.
+        """
+        comp = vehicle.computer_state
+        if id(comp.ts) in self._counted:
+            return
+
+        wrapped = self._wrapped.get(id(comp.ts))
+        if wrapped is None:
+            counted = []
+            for i, t in enumerate(comp.ts):
+                condition = getattr(t, 'condition', None)
+                counted.append(_Counted(t, f'{comp.name}[{i}] {_describe(t) if condition is None else repr(condition)}',
+                                        self.profile))
+            wrapped = self._wrapped[id(comp.ts)] = (comp.ts, counted)
+            self._counted.add(id(counted))
+
+        comp = copy.copy(comp)
+        comp.ts = wrapped[1]
+        vehicle.computer_state = comp
+
+    def _end_step(self, vehicle: Vehicle):
+        self._watch(vehicle)
+
+        p = self.profile
+        p.steps += 1
+        if self.callback is not None and p.steps % self.every == 0:
+            p.wall_s = time.perf_counter() - self._start
+            self.callback(p)
+
+    def step(self, vehicle: Vehicle, dt: float) -> Vehicle:
+        """
+        Same as `Vehicle.step`, timing each phase.
+        """
+        phase_s = self.profile.phase_s
+        t0 = time.perf_counter()
+        next_state = vehicle.step_physics(dt)
+        t1 = time.perf_counter()
+        vehicle = vehicle.step_computer(next_state)
+        t2 = time.perf_counter()
+        vehicle.stage = vehicle.stage.step(dt)
+        t3 = time.perf_counter()
+
+        phase_s['physics'] += t1 - t0
+        phase_s['computer'] += t2 - t1
+        phase_s['stages'] += t3 - t2
+        self._end_step(vehicle)
+        return vehicle
+
+    def step_in_place(self, vehicle: Vehicle, dt: float):
+        """
+        Same as `Vehicle.step_in_place`, timing each phase.
+        """
+        phase_s = self.profile.phase_s
+        t0 = time.perf_counter()
+        vehicle.step_physics_in_place(dt)
+        t1 = time.perf_counter()
+        vehicle.step_computer_in_place()
+        t2 = time.perf_counter()
+        vehicle.stage.step_in_place(dt)
+        t3 = time.perf_counter()
+
+        phase_s['physics'] += t1 - t0
+        phase_s['computer'] += t2 - t1
+        phase_s['stages'] += t3 - t2
+        self._end_step(vehicle)
+
+    def record(self, trajectory: Trajectory, state: VehicleState):
+        start = time.perf_counter()
+        trajectory.append(state)
+        self.profile.phase_s['record'] += time.perf_counter() - start
@@ -0,0 +1,173 @@
+"""
+Simulates many independent vehicles across worker processes, e.g. a parameter sweep:
+
+    specs = sweep(single_stage_parachute, thrust_N=[5.0, 6.0, 7.0], deploy_velocity_ms=[-5.0, -7.0])
+    sims = simulate_parallel(specs, dt=0.001, progress=lambda done, total: print(f'{done}/{total}'))
+
+Vehicles are sent to workers as specs, the factory and parameters which build them, so vehicles need not be picklable.
+Trajectories are returned through shared memory rather than pickled.
+"""
+from concurrent.futures import ProcessPoolExecutor, Future, as_completed
+from itertools import product
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from .vehicle import Vehicle
+from .trajectory import Trajectory, FIELDS
+from .simulations import Simulation, simulate
+from .batch import simulate_batch
+from .monte_carlo import vehicle_factory
+from .factories import build_vehicle
+
+
+class FactorySpec:
+    """
+    Serializable description of a vehicle: the import path of a factory function, e.g. the examples in
+    vehicle_examples.py, and the keyword parameters to call it with.
+    """
+    factory: str
+    params: Dict[str, Any]
+
+    def __init__(self, factory: Union[str, vehicle_factory], params: Optional[Dict[str, Any]] = None):
+        """
+        :param factory: function defined at the top level of a module, or its path as 'module:name'.
+        :param params: keyword parameters of the factory.
+        """
+        if not isinstance(factory, str):
+            if '<' in factory.__qualname__:
+                raise ValueError(f'Factory {factory.__qualname__} cannot be imported by a worker, as it is not defined '
+                                 f'at the top level of a module')
+            factory = f'{factory.__module__}:{factory.__qualname__}'
+
+        self.factory = factory
+        self.params = dict(params or {})
+
+    def build(self) -> Vehicle:
+        """
+        :return: new vehicle, from the factory.
+        """
+        return build_vehicle(self.factory, self.params)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FactorySpec) and (self.factory, self.params) == (other.factory, other.params)
+
+    def __repr__(self) -> str:
+        return f'FactorySpec({self.factory!r}, {self.params!r})'
+
+
+def sweep(factory: Union[str, vehicle_factory], **grid: Sequence[Any]) -> List[FactorySpec]:
+    """
+    :param grid: values of each parameter of the factory to sweep.
+    :return: spec of every combination of parameter values, varying the last parameter fastest.
+    """
+    names = list(grid)
+    return [FactorySpec(factory, dict(zip(names, values))) for values in product(*grid.values())]
+
+
+def _simulate_job(specs: List[FactorySpec], dt: float, options: Dict[str, Any]) -> List[Simulation]:
+    vehicles = [s.build() for s in specs]
+    if len(vehicles) > 1:
+        return simulate_batch(vehicles, dt)
+    return [simulate(vehicles[0], dt, **options)]
+
+
+def _run_job(specs: List[FactorySpec], dt: float, options: Dict[str, Any]) -> Tuple[str, List[int], List[tuple]]:
+    """
+    Simulates a job in a worker, copying the trajectories one after another into a shared memory block.
+    :return: name of the block, length of each trajectory, and the rest of each simulation.
+    """
+    sims = _simulate_job(specs, dt, options)
+    lengths = [len(sim.trajectory) for sim in sims]
+    rest = [(sim.trajectory.events, sim.stopped_by, sim.touchdown, sim.atmosphere) for sim in sims]
+
+    shm = SharedMemory(create=True, size=max(8 * len(FIELDS) * sum(lengths), 1))
+    try:
+        columns = np.ndarray((len(FIELDS), sum(lengths)), dtype=np.float64, buffer=shm.buf)
+        start = 0
+        for sim, n in zip(sims, lengths):
+            for k, field in enumerate(FIELDS):
+                columns[k, start:start + n] = sim.trajectory.column(field)
+            start += n
+        del columns
+    except BaseException:
+        # The parent never learns the name of the block, so cannot free it.
+        columns = None
+        shm.close()
+        shm.unlink()
+        raise
+    shm.close()
+    return shm.name, lengths, rest
+
+
+def _receive(result: Tuple[str, List[int], List[tuple]]) -> List[Simulation]:
+    """
+    Copies the simulations of a job out of its shared memory block, which is then freed.
+    """
+    name, lengths, rest = result
+    shm = SharedMemory(name=name)
+    try:
+        columns = np.ndarray((len(FIELDS), sum(lengths)), dtype=np.float64, buffer=shm.buf)
+        sims = []
+        start = 0
+        for n, (events, stopped_by, touchdown, atmosphere) in zip(lengths, rest):
+            trajectory = Trajectory.from_columns(columns[:, start:start + n].copy(), events)
+            sims.append(Simulation(trajectory, stopped_by, touchdown, atmosphere))
+            start += n
+        del columns
+    finally:
+        shm.close()
+        shm.unlink()
+    return sims
+
+
+def simulate_parallel(specs: List[FactorySpec], dt: float, workers: Optional[int] = None, chunk_size: int = 1,
+                      progress: Optional[Callable[[int, int], None]] = None, **options) -> List[Simulation]:
+    """
+    Simulates vehicles in worker processes. Jobs of `chunk_size` vehicles are handed to workers as they become free,
+    so long flights, e.g. under a parachute, do not hold up the others.
+    :param specs: vehicles to simulate.
+    :param dt: time step, i.e. resolution.
+    :param workers: number of processes to use. If 1, vehicles are simulated in this process. If None, uses a process
+           per CPU.
+    :param chunk_size: number of vehicles in each job. Jobs of more than one vehicle are simulated together with
+           `simulate_batch`.
+    :param progress: called with the number of vehicles simulated so far, and the total, as each job finishes.
+    :param options: keyword arguments of `simulate`, e.g. `stop`. Only supported with a `chunk_size` of 1.
+    :return: simulation of each vehicle, in the same order as `specs`.
+    """
+    if options and chunk_size > 1:
+        raise ValueError('Options of simulate are only supported with a chunk size of 1')
+
+    jobs = [specs[start:start + chunk_size] for start in range(0, len(specs), chunk_size)]
+    results: List[Optional[List[Simulation]]] = [None] * len(jobs)
+    done = 0
+
+    def finished(i: int, sims: List[Simulation]):
+        nonlocal done
+        results[i] = sims
+        done += len(sims)
+        if progress is not None:
+            progress(done, len(specs))
+
+    if workers == 1:
+        for i, job in enumerate(jobs):
+            finished(i, _simulate_job(job, dt, options))
+    else:
+        # Workers share this process's tracker of shared memory blocks, rather than each starting their own, which
+        # would report the blocks they create as leaked when they exit.
+        resource_tracker.ensure_running()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures: Dict[Future, int] = {pool.submit(_run_job, job, dt, options): i for i, job in enumerate(jobs)}
+            try:
+                for f in as_completed(futures):
+                    finished(futures[f], _receive(f.result()))
+            finally:
+                # Free the blocks of jobs which finished after another failed.
+                for f in futures:
+                    f.cancel()
+                for f in futures:
+                    if results[futures[f]] is None and not f.cancelled() and f.exception() is None:
+                        _receive(f.result())
+
+    return [sim for sims in results for sim in sims]
@@ -0,0 +1,352 @@
+"""
+Derivatives of flight metrics with respect to stage parameters, found in a single simulation by carrying tangents,
+the derivatives of each value with respect to every parameter, through each step (forward-mode differentiation):
+
+    s = sensitivity(three_stage()[0], dt=0.001, params=['stages[0].thrust_N', 'stages[1].drag_coefficient'])
+    s.gradient('apogee')  # {'stages[0].thrust_N': ..., 'stages[1].drag_coefficient': ...}
+
+Parameters are named as in rocket_sim.spec: a stage, `stages[i]` in firing order or `parachute`, and one of its
+numbers, or the rate of a `linear` stage function, e.g. `stages[0].f_propellant_mass_kg.dx_per_sec`.
+
+Events move when parameters change: a stage burns out earlier, a transition's condition is met later. At each event
+the tangents are corrected by the change in dynamics times the derivative of the event's time, so derivatives are
+those of the continuous flight rather than of the fixed steps, which finite differences only approach as dt shrinks.
+Metrics which occur at an event, e.g. the maximum velocity at burnout, and the impact velocity, which occurs at
+touchdown, include the movement of the event.
+"""
+from typing import Dict, List, Optional, Tuple
+import re
+import numpy as np
+from .stage import Stage, Linear
+from .curves import Curve
+from .flight_comp import Action, CompState, Timer
+from .state import VehicleState
+from .trajectory import Trajectory
+from .transitions import When, Compare, TimerExpired
+from .simulations import Simulation, has_landed
+from .kernel import compatible
+from .vehicle import Vehicle
+
+_G = 9.81
+
+_STAGE_PARAMS = ('thrust_N', 'propellant_mass_kg', 'drag_coefficient', 'area_m2', 'empty_mass_kg',
+                 'engine_case_mass_kg', 'f_propellant_mass_kg.dx_per_sec', 'f_thrust_N.dx_per_sec')
+_PARAM = re.compile(r'^(stages\[\d+\]|parachute)\.(.+)$')
+
+# Fields which change continuously, so their crossing time follows from their rate of change. Others jump when the
+# stage changes.
+_CONTINUOUS = ('time_s', 'velocity_ms', 'dist_m')
+
+"""
+Metrics whose gradients are found.
+"""
+METRICS = ('apogee', 'maximum_velocity', 'maximum_acceleration', 'maximum_g_force', 'impact_velocity', 'total_time')
+
+
+class Sensitivity:
+    """
+    Flight of a vehicle, and the gradients of its metrics with respect to the chosen parameters.
+    """
+    params: List[str]
+    simulation: Simulation
+    gradients: Dict[str, np.ndarray]
+
+    def __init__(self, params: List[str], simulation: Simulation, gradients: Dict[str, np.ndarray]):
+        self.params = params
+        self.simulation = simulation
+        self.gradients = gradients
+
+    def gradient(self, metric: str) -> Dict[str, float]:
+        """
+        :param metric: one of METRICS.
+        :return: derivative of the metric with respect to each parameter.
+        """
+        return dict(zip(self.params, self.gradients[metric].tolist()))
+
+
+def _slope(f: Curve, t: float) -> float:
+    """
+    :return: rate of change of a curve at time `t`, zero where its value is held.
+    """
+    if t <= f.times[0] or t >= f.times[-1]:
+        return 0.0
+    i, _ = f.segment(t)
+    return float(f.slopes[i])
+
+
+class _StageTangents:
+    """
+    Derivatives of the parameters, changing values, and start time of the current stage.
+    """
+
+    def __init__(self, stage: Stage, slot: str, index: Dict[Tuple[str, str], int], n: int, start: np.ndarray):
+        """
+        :param slot: name of the stage, e.g. 'stages[1]'.
+        :param index: position of each (stage, parameter) in the tangents.
+        :param start: derivative of the time the stage starts.
+        """
+        def unit(name: str) -> np.ndarray:
+            e = np.zeros(n)
+            if (slot, name) in index:
+                e[index[(slot, name)]] = 1.0
+            return e
+
+        self.dry = unit('empty_mass_kg') + unit('engine_case_mass_kg')
+        self.cd = unit('drag_coefficient')
+        self.area = unit('area_m2')
+        self.prop_rate = unit('f_propellant_mass_kg.dx_per_sec')
+        self.thrust_rate = unit('f_thrust_N.dx_per_sec')
+        self.start = start
+
+        # Starting later shifts the stage functions' values by their rate of change.
+        self.prop = unit('propellant_mass_kg') - self._rate(stage.f_propellant_mass_kg) * start
+        self.thrust = unit('thrust_N') - self._rate(stage.f_thrust_N) * start
+        self.burnout: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _rate(f) -> float:
+        return f.dx_per_sec if type(f) is Linear else 0.0
+
+    def step(self, stage: Stage, dt: float) -> bool:
+        """
+        Same as `Stage.step`, for the tangents.
+        :param stage: stage before it is stepped.
+        :return: whether the stage burnt out, so its thrust stops.
+        """
+        if stage.propellant_mass_kg > 0.0:
+            f = stage.f_propellant_mass_kg
+            if type(f) is Linear:
+                self.prop = self.prop + self.prop_rate * dt
+                if stage.propellant_mass_kg + f.dx_per_sec * dt <= 0.0:
+                    # Propellant runs out when it reaches zero.
+                    self.burnout = -self.prop / f.dx_per_sec
+                    self.prop = np.zeros_like(self.prop)
+            elif isinstance(f, Curve):
+                self.prop = -_slope(f, stage.stage_time_s) * self.start
+                if f.value(stage.stage_time_s) <= 0.0:
+                    self.burnout = self.start.copy()
+
+            f = stage.f_thrust_N
+            if type(f) is Linear:
+                self.thrust = self.thrust + self.thrust_rate * dt
+            elif isinstance(f, Curve):
+                self.thrust = -_slope(f, stage.stage_time_s) * self.start
+            return False
+
+        stopped = stage.thrust_N != 0.0
+        self.prop = np.zeros_like(self.prop)
+        self.thrust = np.zeros_like(self.thrust)
+        return stopped
+
+
+def _accel(stage: Stage, v: float) -> float:
+    """
+    :return: acceleration of a vehicle at velocity `v` with the stage.
+    """
+    mass = stage.total_mass_kg()
+    return (stage.thrust_N - mass * _G - 0.5 * 1.2 * stage.drag_coefficient * stage.area_m2 * v * abs(v)) / mass
+
+
+def _taken(comp: CompState, prev: VehicleState, now: VehicleState) -> Optional[When]:
+    """
+    :return: transition of the flight computer taken at the step, if any.
+    """
+    for t in comp.ts:
+        if t(prev, now, comp) is not None:
+            return t
+    return None
+
+
+def _event_tangent(transition: When, comp: CompState, prev: VehicleState, now: VehicleState, dt: float,
+                   fields: Dict[str, np.ndarray], prev_fields: Dict[str, np.ndarray], entered: np.ndarray,
+                   recent: Optional[np.ndarray]) -> np.ndarray:
+    """
+    :param fields: tangents of the fields of `now`.
+    :param entered: derivative of the time the computer state was entered.
+    :param recent: derivative of the time of an event in the last two steps, if any.
+    :return: derivative of the time of the transition, the time its last condition to be met was met.
+    """
+    latest = -1.0
+    tangent = entered
+    for c in transition.condition.conjuncts():
+        if type(c) is TimerExpired:
+            if type(comp) is not Timer or comp.expires_at_s is not None:
+                continue
+            # A timer expires a fixed time after its state is entered.
+            fraction, crossing = comp.time_rem_s / dt, entered
+        elif type(c) is Compare:
+            if c.holds(prev, prev, comp):
+                continue
+            before, after = getattr(prev, c.field), getattr(now, c.field)
+            fraction = (c.threshold - before) / (after - before) if after != before else 1.0
+            if c.field in _CONTINUOUS:
+                rate = (after - before) / dt
+                crossing = -fields[c.field] / rate if rate != 0.0 else np.zeros_like(entered)
+            elif recent is not None:
+                # The field jumped, as an event just changed the stage.
+                crossing = recent
+            else:
+                # Assume the field changes linearly over the step.
+                change = fields[c.field] - prev_fields[c.field]
+                crossing = -(prev_fields[c.field] + fraction * change) / ((after - before) / dt)
+        else:
+            continue
+
+        if fraction > latest:
+            latest, tangent = fraction, crossing
+
+    return tangent
+
+
+def _maximum(values: np.ndarray, tangents: np.ndarray, events: List[Tuple[int, np.ndarray]], dt: float) -> np.ndarray:
+    """
+    :param tangents: tangent of each value.
+    :param events: index of the first sample after each event, and the derivative of its time.
+    :return: derivative of the largest value. If it occurs next to an event, the value moves with the event.
+    """
+    i = int(np.argmax(values))
+    for j, event in events:
+        if abs(i - j) <= 2:
+            if i < j:
+                rate = (values[i] - values[max(i - 1, 0)]) / dt
+            else:
+                rate = (values[min(i + 1, len(values) - 1)] - values[i]) / dt
+            return tangents[i] + rate * event
+    return tangents[i]
+
+
+def parameter_names(vehicle: Vehicle) -> List[str]:
+    """
+    :return: names of every parameter of the vehicle's stages which derivatives can be found with respect to.
+    """
+    slots = [(f'stages[{i}]', s) for i, s in enumerate([vehicle.stage] + vehicle.remaining_engine_stages)]
+    if vehicle.parachute_stage is not None:
+        slots.append(('parachute', vehicle.parachute_stage))
+
+    names = []
+    for slot, s in slots:
+        for p in _STAGE_PARAMS:
+            if not p.startswith('f_') or type(getattr(s, p.split('.')[0])) is Linear:
+                names.append(f'{slot}.{p}')
+    return names
+
+
+def sensitivity(vehicle: Vehicle, dt: float, params: Optional[List[str]] = None) -> Sensitivity:
+    """
+    :param vehicle: vehicle which can be simulated by the numeric kernel, see `kernel.compatible`, at the start of its
+           flight. It is not modified.
+    :param dt: time step, i.e. resolution.
+    :param params: names of the parameters to differentiate with respect to. By default, every parameter, see
+           `parameter_names`.
+    :return: the flight, and the derivatives of METRICS.
+    """
+    if not compatible(vehicle):
+        raise ValueError('Sensitivities need a vehicle which the numeric kernel can simulate')
+
+    available = parameter_names(vehicle)
+    params = list(available if params is None else params)
+    for p in params:
+        if p not in available:
+            raise ValueError(f'Unknown parameter {p}, expected one of {available}')
+
+    index = {_PARAM.match(p).groups(): i for i, p in enumerate(params)}
+    n = len(params)
+    zero = np.zeros(n)
+
+    slot_number = 0
+    stage = _StageTangents(vehicle.stage, 'stages[0]', index, n, zero)
+    velocity, dist, accel = zero, zero, zero
+    entered = zero
+    recent: Optional[Tuple[int, np.ndarray]] = None
+    prev_fields = {'mass_kg': zero, 'thrust_N': zero, 'air_resistance_N': zero, 'weight_N': zero,
+                   'net_force_N': zero, 'accel_ms2': zero, 'velocity_ms': zero, 'dist_m': zero, 'time_s': zero}
+
+    trajectory = Trajectory()
+    tangents: Dict[str, List[np.ndarray]] = {'dist_m': [], 'velocity_ms': [], 'accel_ms2': []}
+    events: List[Tuple[int, np.ndarray]] = []
+    t = 0.0
+
+    while True:
+        s = vehicle.stage
+        prev = vehicle.state
+        old = vehicle
+        vehicle = vehicle.step(dt)
+        now = vehicle.state
+        k = len(trajectory)
+        trajectory.append(now)
+
+        # Same as VehicleState.step, for the tangents.
+        v = prev.velocity_ms
+        mass = now.mass_kg
+        d_mass = stage.dry + stage.prop
+        d_drag = 0.5 * 1.2 * (stage.cd * s.area_m2 + s.drag_coefficient * stage.area)
+        d_air = d_drag * v * abs(v) + 0.5 * 1.2 * s.drag_coefficient * s.area_m2 * 2.0 * abs(v) * velocity
+        d_weight = d_mass * _G
+        d_net = stage.thrust - d_weight - d_air
+        d_accel = (d_net - now.accel_ms2 * d_mass) / mass
+        d_velocity = velocity + d_accel * dt
+        d_dist = dist + velocity * dt + 0.5 * accel * dt**2
+
+        fields = {'time_s': zero, 'mass_kg': d_mass, 'thrust_N': stage.thrust, 'air_resistance_N': d_air,
+                  'weight_N': d_weight, 'net_force_N': d_net, 'accel_ms2': d_accel, 'velocity_ms': d_velocity,
+                  'dist_m': d_dist}
+        tangents['dist_m'].append(d_dist)
+        tangents['velocity_ms'].append(d_velocity)
+        tangents['accel_ms2'].append(d_accel)
+        velocity, dist, accel = d_velocity, d_dist, d_accel
+
+        next_stage = s
+        if vehicle.computer_state is not old.computer_state or now.event is not None:
+            transition = _taken(old.computer_state, prev, now)
+            if transition is not None:
+                near = recent[1] if recent is not None and k - recent[0] <= 2 else None
+                event = _event_tangent(transition, old.computer_state, prev, now, dt, fields, prev_fields, entered,
+                                       near)
+                entered = event
+
+                if transition.action is not None:
+                    if transition.action == Action.NEXT_STAGE:
+                        next_stage = old.remaining_engine_stages[old._next_engine]
+                        slot_number += 1
+                        slot = f'stages[{slot_number}]'
+                    else:
+                        next_stage = old.parachute_stage
+                        slot = 'parachute'
+
+                    # The dynamics change at the event, so its movement moves the velocity.
+                    velocity = velocity + (now.accel_ms2 - _accel(next_stage, now.velocity_ms)) * event
+                    stage = _StageTangents(next_stage, slot, index, n, event)
+                    events.append((k + 1, event))
+                    recent = (k, event)
+
+        burnout = stage.burnout
+        if stage.step(next_stage, dt):
+            # Thrust stops, so the earlier the burnout the less the velocity.
+            velocity = velocity + (next_stage.thrust_N / now.mass_kg) * burnout
+            events.append((k + 1, burnout))
+            recent = (k, burnout)
+            stage.burnout = None
+
+        prev_fields = fields
+        t += dt
+        if has_landed(t, now):
+            break
+
+    simulation = Simulation(trajectory)
+    columns = {f: np.array(ts).reshape(-1, n) for f, ts in tangents.items()}
+    dist_m = trajectory.column('dist_m')
+    velocity_ms = trajectory.column('velocity_ms')
+    accel_ms2 = trajectory.column('accel_ms2')
+
+    # Touchdown is when the altitude reaches zero, so moves by the change in altitude over the descent rate.
+    landing = -columns['dist_m'][-1] / velocity_ms[-1]
+    maximum_acceleration = _maximum(accel_ms2, columns['accel_ms2'], events, dt)
+    gradients = {
+        'apogee': _maximum(dist_m, columns['dist_m'], events, dt),
+        'maximum_velocity': _maximum(velocity_ms, columns['velocity_ms'], events, dt),
+        'maximum_acceleration': maximum_acceleration,
+        'maximum_g_force': maximum_acceleration / _G,
+        'impact_velocity': columns['velocity_ms'][-1] + accel_ms2[-1] * landing,
+        'total_time': landing,
+    }
+    return Sensitivity(params, simulation, gradients)
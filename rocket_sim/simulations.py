@@ -1,91 +1,314 @@
-from typing import List, Tuple, Callable
+from typing import List, Tuple, Union, Optional, Iterator, FrozenSet, Any, TYPE_CHECKING
+import numpy as np
 from .vehicle import Vehicle
 from .state import VehicleState
-from .graphics import time_series_plot_group
+from .trajectory import Trajectory
+from .stop import StopCondition, PROPERTIES, is_ballistic, ballistic_tail
+from .atmosphere import Atmosphere
+from .analytics import Analysis
+from .kernel import compatible, simulate_kernel
+
+# Only needed for annotations. Integrators and profilers are passed in by callers which have imported them, and
+# profiling imports cProfile, pstats and tracemalloc, which would slow every import of this module, e.g. by the CLI.
+if TYPE_CHECKING:
+    from .integrators import Integrator
+    from .profiling import Profiler
 
 
 class Simulation:
+    """
+    Recorded flight of a vehicle. Metrics of the flight, see rocket_sim.analytics, are computed when first used and
+    cached until the trajectory changes.
+    """
 
-    def __init__(self, states: List[VehicleState]):
-        self.states = states
+    def __init__(self, states: Union[Trajectory, List[VehicleState]], stopped_by: Optional[StopCondition] = None,
+                 touchdown: Optional[Tuple[float, float]] = None, atmosphere: Optional[Atmosphere] = None):
+        """
+        :param states: recorded trajectory of the vehicle. A list of states is converted to a trajectory.
+        :param stopped_by: condition which stopped the simulation before the vehicle returned to the ground, if any.
+        :param touchdown: estimated time and velocity at which a stopped vehicle reaches the ground, if known.
+        :param atmosphere: atmosphere the vehicle flew through, or None for constant sea level conditions.
+        """
+        if not isinstance(states, Trajectory):
+            states = Trajectory.from_states(states)
 
-    def _max_val(self, get_val: Callable[[VehicleState], float]) -> Tuple[float, float]:
+        self.trajectory = states
+        self.stopped_by = stopped_by
+        self.touchdown = touchdown
+        self.atmosphere = atmosphere
+        self.analysis = Analysis(states, touchdown, atmosphere)
+        self._states: Optional[List[VehicleState]] = None
+        self._states_version = -1
+
+    @property
+    def truncated(self) -> bool:
         """
-        :param get_val: return value to find maximum of.
-        :return: maximum value and time occurred.
+        :return: whether the simulation was stopped before the vehicle returned to the ground.
         """
-        vs = [(get_val(s), s.time_s) for s in self.states]
-        return max(vs, key=lambda v: v[0])
+        return self.stopped_by is not None
 
     @property
-    def events(self):
-        es = [(s.time_s, s.event) for s in self.states if s.event is not None]
+    def valid(self) -> FrozenSet[str]:
+        """
+        :return: names of the properties which describe the whole flight. Other properties only describe the part of
+            the flight which was simulated.
+        """
+        if self.stopped_by is None:
+            return PROPERTIES
 
-        _, t = self.apogee
-        es.append((t, 'Apogee'))
+        valid = set(self.stopped_by.valid)
+        if self.touchdown is not None:
+            valid |= {'impact_velocity', 'total_time'}
+        return frozenset(valid)
 
-        return es
+    @property
+    def states(self) -> List[VehicleState]:
+        """
+        :return: recorded states, converted from the trajectory when first used and kept until it changes. The states
+            are copies: changing them does not change the trajectory, or the metrics computed from it.
+        """
+        if self._states is None or self._states_version != self.trajectory.version:
+            self._states = self.trajectory.states()
+            self._states_version = self.trajectory.version
+        return self._states
+
+    def metric(self, name: str) -> Any:
+        """
+        :param name: name of a metric registered with `analytics.metric`.
+        """
+        return self.analysis.get(name)
+
+    @property
+    def events(self) -> List[Tuple[float, str]]:
+        return list(self.analysis.get('events'))
 
     @property
     def maximum_g_force(self) -> Tuple[float, float]:
-        g = 9.81
-        (a, t) = self._max_val(lambda s: s.accel_ms2)
-        return a/g, t
+        return self.analysis.get('maximum_g_force')
 
     @property
     def impact_velocity(self) -> float:
-        return self.states[-1].velocity_ms
+        return self.analysis.get('impact_velocity')
 
     @property
     def maximum_acceleration(self) -> Tuple[float, float]:
-        return self._max_val(lambda s: s.accel_ms2)
+        return self.analysis.get('maximum_acceleration')
 
     @property
     def maximum_velocity(self) -> Tuple[float, float]:
-        return self._max_val(lambda s: s.velocity_ms)
+        return self.analysis.get('maximum_velocity')
 
     @property
     def apogee(self) -> Tuple[float, float]:
-        return self._max_val(lambda s: s.dist_m)
+        return self.analysis.get('apogee')
 
     @property
     def total_time(self) -> float:
-        return self.states[-1].time_s
+        return self.analysis.get('total_time')
 
     @property
-    def time_series(self) -> List[float]:
-        return [s.time_s for s in self.states]
+    def burnout_time(self) -> Optional[float]:
+        return self.analysis.get('burnout_time')
+
+    @property
+    def maximum_dynamic_pressure(self) -> Tuple[float, float]:
+        return self.analysis.get('maximum_dynamic_pressure')
+
+    @property
+    def maximum_drag(self) -> Tuple[float, float]:
+        return self.analysis.get('maximum_drag')
+
+    @property
+    def parachute_descent_rate(self) -> Optional[float]:
+        return self.analysis.get('parachute_descent_rate')
+
+    @property
+    def time_series(self) -> np.ndarray:
+        return self.trajectory.column('time_s')
+
+    def save(self, path: str, dt: Optional[float] = None, name: Optional[str] = None):
+        """
+        Writes the trajectory to a binary file, see rocket_sim.storage.
+        :param dt: time step the vehicle was simulated with, stored in the file's header.
+        :param name: name of the vehicle, stored in the file's header.
+        """
+        from .storage import save_trajectory
+        save_trajectory(self.trajectory, path, dt, name)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> 'Simulation':
+        """
+        :param path: file written by `save`.
+        :param mmap: read columns from the file only when accessed, without copying them into memory.
+        """
+        from .storage import load_trajectory
+        trajectory, _ = load_trajectory(path, mmap)
+        return Simulation(trajectory)
+
+    def plot_data(self) -> List[Tuple[np.ndarray, np.ndarray, List[Tuple[float, str]], str, str]]:
+        """
+        :return: time series, events, and axis labels of each plot shown by `display_plots`.
+        """
+        time = self.time_series
+        events = self.events
+        column = self.trajectory.column
+
+        return [
+            (time, column('mass_kg'), events, 'Time (s)', 'Mass (kg)'),
+            (time, column('accel_ms2'), events, 'Time (s)', 'Acceleration (m/s2)'),
+            (time, column('velocity_ms'), events, 'Time (s)', 'Velocity (m/s)'),
+            (time, column('dist_m'), events, 'Time (s)', 'Altitude (m)'),
+            (time, column('thrust_N'), events, 'Time (s)', 'Thrust (N)'),
+            (time, column('air_resistance_N'), events, 'Time(s)', 'Air Resistance (N)'),
+        ]
 
     def display_plots(self, title) -> None:
-        time_series_plot_group(title, [
-            (self.time_series, [s.mass_kg for s in self.states], self.events, 'Time (s)', 'Mass (kg)'),
-            (self.time_series, [s.accel_ms2 for s in self.states], self.events, 'Time (s)', 'Acceleration (m/s2)'),
-            (self.time_series, [s.velocity_ms for s in self.states], self.events, 'Time (s)', 'Velocity (m/s)'),
-            (self.time_series, [s.dist_m for s in self.states], self.events, 'Time (s)', 'Altitude (m)'),
-            (self.time_series, [s.thrust_N for s in self.states], self.events, 'Time (s)', 'Thrust (N)'),
-            (self.time_series, [s.air_resistance_N for s in self.states], self.events, 'Time(s)', 'Air Resistance (N)'),
-        ])
+        # Imported here, as matplotlib is slow to import and not needed unless plotting.
+        from .graphics import time_series_plot_group
+        time_series_plot_group(title, self.plot_data())
+
+    def save_plots(self, path: str, title: Optional[str] = None):
+        """
+        Draws the plots shown by `display_plots` to a file, e.g. a .png, without needing a display.
+        """
+        from .graphics import time_series_plot_group
+        time_series_plot_group(title, self.plot_data(), path)
 
 
-def simulate(vehicle: Vehicle, dt: float) -> Simulation:
+def simulate(vehicle: Vehicle, dt: float, integrator: Optional['Integrator'] = None, in_place: bool = False,
+             stop: Optional[StopCondition] = None, tail: bool = False, profiler: Optional['Profiler'] = None,
+             kernel: bool = True) -> Simulation:
     """
     :param vehicle: vehicle to simulate.
     :param dt: time step, i.e. resolution.
+    :param integrator: method used to advance the vehicle. By default, the vehicle is stepped with a fixed `dt`.
+    :param in_place: step a copy of the vehicle in place rather than creating new objects each step. Gives the same
+           results, but is faster. The given vehicle is not modified.
+    :param stop: condition on which to stop before the vehicle returns to the ground. See `Simulation.valid` for the
+           properties which still describe the whole flight.
+    :param tail: if stopped while the rest of the flight is ballistic, estimate the touchdown time and impact
+           velocity in closed form, see `stop.ballistic_touchdown`.
+    :param profiler: measures where the time of the simulation goes, see rocket_sim.profiling. The results are in
+           `profiler.profile`. The simulation's results are the same.
+    :param kernel: run the simulation with the numeric kernel, see rocket_sim.kernel, when the vehicle is compatible
+           and neither a stop condition nor a profiler is given. Gives the same results, but is faster.
     :return: acceleration, velocity, and altitude of vehicle until it returns to ground.
     """
-    states: List[VehicleState] = []
+    if integrator is not None:
+        if stop is not None or profiler is not None:
+            raise ValueError('Stop conditions and profiling are only supported with a fixed time step')
+        return Simulation(integrator.integrate(vehicle, dt), atmosphere=vehicle.atmosphere)
+
+    if kernel and stop is None and profiler is None and compatible(vehicle):
+        return Simulation(simulate_kernel(vehicle, dt), atmosphere=vehicle.atmosphere)
+
+    trajectory = Trajectory()
+    run = _Run(vehicle, dt, in_place, stop, profiler)
+    if profiler is None:
+        for state in run:
+            trajectory.append(state)
+    else:
+        try:
+            for state in run:
+                profiler.record(trajectory, state)
+        finally:
+            profiler.stop()
+
+    touchdown = None
+    if tail and run.stopped_by is not None and is_ballistic(run.vehicle):
+        touchdown = ballistic_tail(run.vehicle)
+
+    return Simulation(trajectory, run.stopped_by, touchdown, vehicle.atmosphere)
 
-    def touched_down() -> bool:
-        if len(states) == 0:
-            return False
 
-        s = states[-1]
-        return s.velocity_ms < 0 and s.dist_m <= 0
+def has_landed(t: float, state: VehicleState) -> bool:
+    """
+    :param t: time since the start of the simulation.
+    :return: whether a simulation should stop at the state, as the vehicle has returned to the ground. The start of
+        the flight is ignored, as the vehicle is on the ground before it has lifted off.
+    """
+    return t >= 5.0 and state.velocity_ms < 0 and state.dist_m <= 0
+
+
+class _Run:
+    """
+    Iterator over the states of a vehicle as it is stepped. Keeps the vehicle, and the condition which stopped it.
+    """
+
+    def __init__(self, vehicle: Vehicle, dt: float, in_place: bool, stop: Optional[StopCondition],
+                 profiler: Optional['Profiler'] = None, elapsed_s: float = 0.0):
+        """
+        :param profiler: profiler to step the vehicle through, which must be stopped once the run is finished.
+        :param elapsed_s: time the vehicle has already been simulated for, when continuing a simulation.
+        """
+        if profiler is not None:
+            self.vehicle = profiler.start(vehicle)
+        else:
+            self.vehicle = vehicle.copy() if in_place else vehicle
+        self.dt = dt
+        self.in_place = in_place
+        self.stop = stop
+        self.profiler = profiler
+        self.stopped_by: Optional[StopCondition] = None
+        self.elapsed_s = elapsed_s
+        self._done = False
+
+    def __iter__(self) -> '_Run':
+        return self
+
+    def __next__(self) -> VehicleState:
+        if self._done:
+            raise StopIteration
+
+        prev = self.vehicle.state
+        if self.profiler is not None:
+            if self.in_place:
+                self.profiler.step_in_place(self.vehicle, self.dt)
+            else:
+                self.vehicle = self.profiler.step(self.vehicle, self.dt)
+        elif self.in_place:
+            self.vehicle.step_in_place(self.dt)
+        else:
+            self.vehicle = self.vehicle.step(self.dt)
+
+        s = self.vehicle.state
+        self.elapsed_s += self.dt
+        if has_landed(self.elapsed_s, s):
+            self._done = True
+        elif self.stop is not None and self.stop.should_stop(prev, self.vehicle):
+            self.stopped_by = self.stop
+            self._done = True
+
+        return s
+
+
+def simulate_iter(vehicle: Vehicle, dt: float, in_place: bool = False, stop: Optional[StopCondition] = None) \
+        -> Iterator[VehicleState]:
+    """
+    Steps the vehicle lazily, without storing any states.
+    :param vehicle: vehicle to simulate.
+    :param dt: time step, i.e. resolution.
+    :param in_place: step a copy of the vehicle in place. The yielded states are then reused, so are only valid until
+           the next state is requested.
+    :param stop: condition on which to stop before the vehicle returns to the ground.
+    :return: state of the vehicle after each step, until it returns to ground.
+    """
+    return _Run(vehicle, dt, in_place, stop)
+
+
+def simulate_chunks(vehicle: Vehicle, dt: float, chunk_size: int = 4096, in_place: bool = False) \
+        -> Iterator[Trajectory]:
+    """
+    :param chunk_size: maximum number of states in each chunk.
+    :return: consecutive parts of the trajectory of the vehicle, as they are simulated.
+    """
+    chunk = Trajectory(chunk_size)
+    for state in simulate_iter(vehicle, dt, in_place):
+        chunk.append(state)
 
-    t = 0.0
-    while not touched_down() or t < 5.0:
-        vehicle = vehicle.step(dt)
-        states.append(vehicle.state)
-        t += dt
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = Trajectory(chunk_size)
 
-    return Simulation(states)
+    if len(chunk) > 0:
+        yield chunk
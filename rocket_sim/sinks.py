@@ -0,0 +1,184 @@
+from typing import Iterable, List, Tuple, Optional, Dict
+import numpy as np
+from .state import VehicleState
+from .trajectory import Trajectory, FIELDS
+
+
+class Sink:
+    """
+    Receives states as they are simulated, e.g. from `simulate_iter`, and keeps as much of them as it needs.
+    States may be reused after they are passed to `append`, so sinks must copy anything they keep.
+    """
+    def append(self, state: VehicleState):
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Called after the last state has been appended.
+        """
+        pass
+
+
+def record(states: Iterable[VehicleState], *sinks: Sink):
+    """
+    Passes every state to each sink.
+    """
+    for state in states:
+        for sink in sinks:
+            sink.append(state)
+
+    for sink in sinks:
+        sink.close()
+
+
+class Decimate(Sink):
+    """
+    Keeps every nth state, as well as every state at which an event occurred and the final state.
+    """
+    every: int
+    trajectory: Trajectory
+
+    def __init__(self, every: int):
+        """
+        :param every: keep one state in this many.
+        """
+        if every < 1:
+            raise ValueError('Must keep at least every state')
+
+        self.every = every
+        self.trajectory = Trajectory()
+        self._count = 0
+        self._last: Optional[VehicleState] = None
+        self._last_kept = False
+
+    def append(self, state: VehicleState):
+        self._last_kept = self._count % self.every == 0 or state.event is not None
+        if self._last_kept:
+            self.trajectory.append(state)
+
+        self._last = state
+        self._count += 1
+
+    def close(self):
+        if self._last is not None and not self._last_kept:
+            self.trajectory.append(self._last)
+            self._last_kept = True
+
+
+class OnEvent(Sink):
+    """
+    Keeps only the states at which an event occurred.
+    """
+    trajectory: Trajectory
+
+    def __init__(self):
+        self.trajectory = Trajectory()
+
+    def append(self, state: VehicleState):
+        if state.event is not None:
+            self.trajectory.append(state)
+
+
+class Envelope(Sink):
+    """
+    Keeps the minimum and maximum of each field over consecutive buckets of states, e.g. for plotting a long flight
+    without losing peaks.
+    """
+    bucket_size: int
+    time_s: List[float]
+    mins: Dict[str, List[float]]
+    maxs: Dict[str, List[float]]
+
+    def __init__(self, bucket_size: int):
+        """
+        :param bucket_size: number of states in each bucket.
+        """
+        self.bucket_size = bucket_size
+        self.time_s = []
+        self.mins = {f: [] for f in FIELDS}
+        self.maxs = {f: [] for f in FIELDS}
+        self._bucket = Trajectory(bucket_size)
+
+    def _flush(self):
+        self.time_s.append(float(self._bucket.column('time_s')[0]))
+        for f in FIELDS:
+            values = self._bucket.column(f)
+            self.mins[f].append(float(values.min()))
+            self.maxs[f].append(float(values.max()))
+
+        self._bucket.clear()
+
+    def append(self, state: VehicleState):
+        self._bucket.append(state)
+        if len(self._bucket) == self.bucket_size:
+            self._flush()
+
+    def close(self):
+        if len(self._bucket) > 0:
+            self._flush()
+
+    def bounds(self, field: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: start time, minimum, and maximum of each bucket.
+        """
+        return np.array(self.time_s), np.array(self.mins[field]), np.array(self.maxs[field])
+
+
+class Summary(Sink):
+    """
+    Keeps only the values needed for the key results of a flight, so uses constant memory regardless of its length.
+    Gives the same results as the properties of Simulation.
+    """
+
+    def __init__(self):
+        self._max_dist = (-np.inf, 0.0)
+        self._max_velocity = (-np.inf, 0.0)
+        self._max_accel = (-np.inf, 0.0)
+        self._events: List[Tuple[float, str]] = []
+        self._last: Optional[Tuple[float, float]] = None
+
+    def append(self, state: VehicleState):
+        t = state.time_s
+
+        # Strictly greater, so the first occurrence of the maximum is kept, as in Simulation.
+        if state.dist_m > self._max_dist[0]:
+            self._max_dist = (state.dist_m, t)
+        if state.velocity_ms > self._max_velocity[0]:
+            self._max_velocity = (state.velocity_ms, t)
+        if state.accel_ms2 > self._max_accel[0]:
+            self._max_accel = (state.accel_ms2, t)
+        if state.event is not None:
+            self._events.append((t, state.event))
+
+        self._last = (t, state.velocity_ms)
+
+    @property
+    def apogee(self) -> Tuple[float, float]:
+        return self._max_dist
+
+    @property
+    def maximum_velocity(self) -> Tuple[float, float]:
+        return self._max_velocity
+
+    @property
+    def maximum_acceleration(self) -> Tuple[float, float]:
+        return self._max_accel
+
+    @property
+    def maximum_g_force(self) -> Tuple[float, float]:
+        g = 9.81
+        (a, t) = self._max_accel
+        return a/g, t
+
+    @property
+    def impact_velocity(self) -> float:
+        return self._last[1]
+
+    @property
+    def total_time(self) -> float:
+        return self._last[0]
+
+    @property
+    def events(self) -> List[Tuple[float, str]]:
+        _, t = self.apogee
+        return self._events + [(t, 'Apogee')]
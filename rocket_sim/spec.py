@@ -0,0 +1,439 @@
+"""
+Declarative vehicle specifications, which can be stored as JSON or TOML, e.g.
+
+    {
+      "version": 1,
+      "name": "Single Stage with Parachute",
+      "stages": [{"area_m2": 0.000979, "drag_coefficient": 0.75, "empty_mass_kg": 0.106,
+                  "engine_case_mass_kg": 0.0248, "propellant_mass_kg": 0.0215, "thrust_N": 6.38,
+                  "f_propellant_mass_kg": {"type": "linear", "dx_per_sec": -0.00342925},
+                  "f_thrust_N": {"type": "const"}}],
+      "parachute": {...},
+      "computer": {"initial": "Burn",
+                   "states": [{"name": "Burn", "transitions": [{"when": [{"field": "velocity_ms", "op": "<",
+                                                                          "value": -7.0}],
+                                                                "action": "PARACHUTE", "target": "Descent"}]},
+                              {"name": "Descent"}]}
+    }
+
+The first stage is fired first, followed by the others in order. Stage functions are `const`, `linear`, or curves;
+a curve may also be given as a drag coefficient over Mach number. Computer states are `id`, the default, or `timer`,
+and their transitions are conjunctions of field comparisons and `{"timer_expired": true}`. Optional values are
+omitted rather than null, as TOML has no null.
+
+A spec can be sent to worker processes instead of a vehicle, as
+`FactorySpec('rocket_sim.spec:vehicle_from_spec', {'spec': spec})`.
+"""
+from typing import Any, Dict, List, Optional
+import json
+from .flight_comp import Action, CompState, Id, Timer
+from .stage import Stage, Const, Linear
+from .curves import Curve, ThrustCurve
+from .state import VehicleState
+from .trajectory import FIELDS
+from .transitions import When, Compare, TimerExpired
+from .atmosphere import Atmosphere, ConstantAtmosphere, StandardAtmosphere
+from .vehicle import Vehicle
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+VERSION = 1
+
+_STAGE_NUMBERS = ('stage_time_s', 'area_m2', 'empty_mass_kg', 'engine_case_mass_kg', 'propellant_mass_kg',
+                  'thrust_N')
+_STAGE_FUNCTIONS = ('f_propellant_mass_kg', 'f_thrust_N')
+_OPS = ('<', '<=', '>', '>=')
+
+_CURVE_CACHE_SIZE = 256
+_curves: Dict[tuple, Curve] = {}
+
+
+class SpecError(ValueError):
+    """
+    Raised when a spec is invalid, or a vehicle cannot be described by one.
+    """
+    pass
+
+
+def _curve_to_spec(c: Curve) -> Dict[str, Any]:
+    spec = {'type': 'curve', 'times': c.times.tolist(), 'values': c.values.tolist()}
+    if isinstance(c, ThrustCurve) and c.name is not None:
+        spec['name'] = c.name
+    return spec
+
+
+def _function_to_spec(f, path: str) -> Dict[str, Any]:
+    if type(f) is Const:
+        return {'type': 'const'}
+    if type(f) is Linear:
+        return {'type': 'linear', 'dx_per_sec': f.dx_per_sec}
+    if isinstance(f, Curve):
+        return _curve_to_spec(f)
+    raise SpecError(f'{path}: stage function {type(f).__qualname__} is not declarative')
+
+
+def _stage_to_spec(s: Stage, path: str) -> Dict[str, Any]:
+    spec: Dict[str, Any] = {name: getattr(s, name) for name in _STAGE_NUMBERS}
+    cd = s.drag_coefficient
+    spec['drag_coefficient'] = _curve_to_spec(cd) if isinstance(cd, Curve) else cd
+    for name in _STAGE_FUNCTIONS:
+        spec[name] = _function_to_spec(getattr(s, name), f'{path}.{name}')
+    return spec
+
+
+def _computer_to_spec(initial: CompState) -> Dict[str, Any]:
+    states: List[Dict[str, Any]] = []
+    names: Dict[str, CompState] = {}
+    pending = [initial]
+
+    while pending:
+        comp = pending.pop(0)
+        if names.get(comp.name) is comp:
+            continue
+        if comp.name in names:
+            raise SpecError(f'computer: more than one state is named {comp.name!r}')
+        if type(comp) not in (Id, Timer):
+            raise SpecError(f'computer: state {comp.name!r} is a {type(comp).__qualname__}')
+        names[comp.name] = comp
+
+        spec: Dict[str, Any] = {'name': comp.name}
+        if type(comp) is Timer:
+            spec['type'] = 'timer'
+            spec['time_rem_s'] = comp.time_rem_s
+            if comp.expires_at_s is not None:
+                spec['expires_at_s'] = comp.expires_at_s
+
+        transitions = []
+        for i, t in enumerate(comp.ts):
+            if type(t) is not When:
+                raise SpecError(f'computer: transition {i} of state {comp.name!r} is not declarative')
+
+            when = []
+            for c in t.condition.conjuncts():
+                if type(c) is Compare:
+                    when.append({'field': c.field, 'op': c.op, 'value': c.threshold})
+                elif type(c) is TimerExpired:
+                    when.append({'timer_expired': True})
+                else:
+                    raise SpecError(f'computer: condition {c!r} of state {comp.name!r} is not declarative')
+
+            transition: Dict[str, Any] = {'when': when, 'target': t.target.name}
+            if t.action is not None:
+                transition['action'] = t.action.name
+            transitions.append(transition)
+            pending.append(t.target)
+
+        if transitions:
+            spec['transitions'] = transitions
+        states.append(spec)
+
+    return {'initial': initial.name, 'states': states}
+
+
+def _atmosphere_to_spec(a: Atmosphere) -> Dict[str, Any]:
+    if type(a) is ConstantAtmosphere:
+        spec = {'type': 'constant', 'density_kg_m3': a.density_kg_m3, 'gravity_ms2': a.gravity_ms2,
+                'speed_of_sound_ms': a.speed_of_sound_ms}
+    elif type(a) is StandardAtmosphere:
+        spec = {'type': 'standard', 'max_altitude_m': a.max_altitude_m, 'resolution_m': a.resolution_m}
+    else:
+        raise SpecError(f'atmosphere: {type(a).__qualname__} cannot be described')
+
+    if a.wind is not None:
+        spec['wind'] = _curve_to_spec(a.wind)
+    return spec
+
+
+def vehicle_to_spec(vehicle: Vehicle, name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    :param vehicle: vehicle built only from declarative parts.
+    :param name: name of the vehicle, stored in the spec.
+    :return: spec from which `vehicle_from_spec` builds an equivalent vehicle.
+    """
+    stages = [vehicle.stage] + vehicle.remaining_engine_stages[vehicle._next_engine:]
+    spec: Dict[str, Any] = {'version': VERSION}
+    if name is not None:
+        spec['name'] = name
+
+    spec['stages'] = [_stage_to_spec(s, f'stages[{i}]') for i, s in enumerate(stages)]
+    if vehicle.parachute_stage is not None:
+        spec['parachute'] = _stage_to_spec(vehicle.parachute_stage, 'parachute')
+    spec['computer'] = _computer_to_spec(vehicle.computer_state)
+
+    state = vehicle.state
+    if any(getattr(state, f) != 0.0 for f in FIELDS):
+        spec['state'] = {f: getattr(state, f) for f in FIELDS}
+    if vehicle.atmosphere is not None:
+        spec['atmosphere'] = _atmosphere_to_spec(vehicle.atmosphere)
+
+    return spec
+
+
+def _expect(condition: bool, path: str, message: str):
+    if not condition:
+        raise SpecError(f'{path}: {message}')
+
+
+def _check_number(value: Any, path: str):
+    _expect(isinstance(value, (int, float)) and not isinstance(value, bool), path, 'expected a number')
+
+
+def _check_keys(spec: Any, path: str, required: tuple, optional: tuple = ()):
+    _expect(isinstance(spec, dict), path, 'expected a table')
+    missing = [k for k in required if k not in spec]
+    _expect(not missing, path, f'missing {", ".join(missing)}')
+    unknown = [k for k in spec if k not in required and k not in optional]
+    _expect(not unknown, path, f'unknown {", ".join(unknown)}')
+
+
+def _check_curve(spec: Any, path: str):
+    _check_keys(spec, path, ('type', 'times', 'values'), ('name',))
+    _expect(spec['type'] == 'curve', f'{path}.type', 'expected curve')
+    for key in ('times', 'values'):
+        _expect(isinstance(spec[key], list) and len(spec[key]) > 0, f'{path}.{key}', 'expected a list of numbers')
+        if not all(type(v) is float or type(v) is int for v in spec[key]):
+            for i, v in enumerate(spec[key]):
+                _check_number(v, f'{path}.{key}[{i}]')
+    _expect(len(spec['times']) == len(spec['values']), path, 'expected as many times as values')
+    _expect(all(a < b for a, b in zip(spec['times'], spec['times'][1:])), f'{path}.times',
+            'expected strictly increasing times')
+
+
+def _check_function(spec: Any, path: str):
+    _expect(isinstance(spec, dict), path, 'expected a table')
+    kind = spec.get('type')
+    if kind == 'const':
+        _check_keys(spec, path, ('type',))
+    elif kind == 'linear':
+        _check_keys(spec, path, ('type', 'dx_per_sec'))
+        _check_number(spec['dx_per_sec'], f'{path}.dx_per_sec')
+    elif kind == 'curve':
+        _check_curve(spec, path)
+    else:
+        raise SpecError(f'{path}.type: expected const, linear, or curve')
+
+
+def _check_stage(spec: Any, path: str):
+    _check_keys(spec, path, _STAGE_NUMBERS[1:] + ('drag_coefficient',) + _STAGE_FUNCTIONS, ('stage_time_s',))
+    for name in _STAGE_NUMBERS:
+        if name in spec:
+            _check_number(spec[name], f'{path}.{name}')
+
+    if isinstance(spec['drag_coefficient'], dict):
+        _check_curve(spec['drag_coefficient'], f'{path}.drag_coefficient')
+    else:
+        _check_number(spec['drag_coefficient'], f'{path}.drag_coefficient')
+
+    for name in _STAGE_FUNCTIONS:
+        _check_function(spec[name], f'{path}.{name}')
+
+
+def _check_computer(spec: Any):
+    _check_keys(spec, 'computer', ('initial', 'states'))
+    states = spec['states']
+    _expect(isinstance(states, list) and len(states) > 0, 'computer.states', 'expected a list of states')
+
+    names = set()
+    for i, state in enumerate(states):
+        path = f'computer.states[{i}]'
+        _check_keys(state, path, ('name',), ('type', 'time_rem_s', 'expires_at_s', 'transitions'))
+        _expect(isinstance(state['name'], str), f'{path}.name', 'expected a string')
+        _expect(state['name'] not in names, f'{path}.name', f'{state["name"]!r} is already used')
+        names.add(state['name'])
+
+        kind = state.get('type', 'id')
+        _expect(kind in ('id', 'timer'), f'{path}.type', 'expected id or timer')
+        for key in ('time_rem_s', 'expires_at_s'):
+            if key in state:
+                _expect(kind == 'timer', f'{path}.{key}', 'only a timer has a time')
+                _check_number(state[key], f'{path}.{key}')
+
+        transitions = state.get('transitions', [])
+        _expect(isinstance(transitions, list), f'{path}.transitions', 'expected a list of transitions')
+        for j, t in enumerate(transitions):
+            t_path = f'{path}.transitions[{j}]'
+            _check_keys(t, t_path, ('when', 'target'), ('action',))
+            _expect('action' not in t or t['action'] in Action.__members__, f'{t_path}.action',
+                    f'expected one of {", ".join(Action.__members__)}')
+            _expect(isinstance(t['when'], list), f'{t_path}.when', 'expected a list of conditions')
+
+            for k, c in enumerate(t['when']):
+                c_path = f'{t_path}.when[{k}]'
+                if isinstance(c, dict) and 'timer_expired' in c:
+                    _check_keys(c, c_path, ('timer_expired',))
+                    _expect(c['timer_expired'] is True, c_path, 'expected timer_expired to be true')
+                    _expect(kind == 'timer', c_path, 'only a timer can expire')
+                else:
+                    _check_keys(c, c_path, ('field', 'op', 'value'))
+                    _expect(c['field'] in FIELDS, f'{c_path}.field', f'expected one of {", ".join(FIELDS)}')
+                    _expect(c['op'] in _OPS, f'{c_path}.op', f'expected one of {" ".join(_OPS)}')
+                    _check_number(c['value'], f'{c_path}.value')
+
+    _expect(spec['initial'] in names, 'computer.initial', f'no state named {spec["initial"]!r}')
+    for i, state in enumerate(states):
+        for j, t in enumerate(state.get('transitions', [])):
+            _expect(t['target'] in names, f'computer.states[{i}].transitions[{j}].target',
+                    f'no state named {t["target"]!r}')
+
+
+def _check_atmosphere(spec: Any):
+    _expect(isinstance(spec, dict), 'atmosphere', 'expected a table')
+    kind = spec.get('type')
+    if kind == 'constant':
+        _check_keys(spec, 'atmosphere', ('type',), ('density_kg_m3', 'gravity_ms2', 'speed_of_sound_ms', 'wind'))
+    elif kind == 'standard':
+        _check_keys(spec, 'atmosphere', ('type',), ('max_altitude_m', 'resolution_m', 'wind'))
+    else:
+        raise SpecError('atmosphere.type: expected constant or standard')
+
+    for key, value in spec.items():
+        if key == 'wind':
+            _check_curve(value, 'atmosphere.wind')
+        elif key != 'type':
+            _check_number(value, f'atmosphere.{key}')
+
+
+def validate_spec(spec: Any):
+    """
+    Checks a spec against the schema.
+    :raise SpecError: describing where the spec is invalid.
+    """
+    _check_keys(spec, 'spec', ('version', 'stages', 'computer'), ('name', 'parachute', 'state', 'atmosphere'))
+    _expect(spec['version'] == VERSION, 'version', f'expected {VERSION}')
+    if 'name' in spec:
+        _expect(isinstance(spec['name'], str), 'name', 'expected a string')
+
+    stages = spec['stages']
+    _expect(isinstance(stages, list) and len(stages) > 0, 'stages', 'expected a list of stages')
+    for i, s in enumerate(stages):
+        _check_stage(s, f'stages[{i}]')
+    if 'parachute' in spec:
+        _check_stage(spec['parachute'], 'parachute')
+
+    _check_computer(spec['computer'])
+
+    if 'state' in spec:
+        _check_keys(spec['state'], 'state', (), FIELDS)
+        for f, value in spec['state'].items():
+            _check_number(value, f'state.{f}')
+    if 'atmosphere' in spec:
+        _check_atmosphere(spec['atmosphere'])
+
+
+def _curve(spec: Dict[str, Any]) -> Curve:
+    # Variants of a spec in a sweep usually share their curves, and curves are not modified, so each is built once.
+    key = (tuple(spec['times']), tuple(spec['values']), spec.get('name'))
+    c = _curves.get(key)
+    if c is None:
+        if len(_curves) >= _CURVE_CACHE_SIZE:
+            _curves.clear()
+        if 'name' in spec:
+            c = ThrustCurve(spec['times'], spec['values'], spec['name'])
+        else:
+            c = Curve(spec['times'], spec['values'])
+        _curves[key] = c
+    return c
+
+
+def _function(spec: Dict[str, Any]):
+    kind = spec['type']
+    if kind == 'const':
+        return Const()
+    if kind == 'linear':
+        return Linear(spec['dx_per_sec'])
+    return _curve(spec)
+
+
+def _stage(spec: Dict[str, Any]) -> Stage:
+    cd = spec['drag_coefficient']
+    return Stage(float(spec.get('stage_time_s', 0.0)), float(spec['area_m2']),
+                 _curve(cd) if isinstance(cd, dict) else float(cd), float(spec['empty_mass_kg']),
+                 float(spec['engine_case_mass_kg']), float(spec['propellant_mass_kg']), float(spec['thrust_N']),
+                 _function(spec['f_propellant_mass_kg']), _function(spec['f_thrust_N']))
+
+
+def _computer(spec: Dict[str, Any]) -> CompState:
+    states: Dict[str, CompState] = {}
+    for s in spec['states']:
+        if s.get('type', 'id') == 'timer':
+            expires_at_s = s.get('expires_at_s')
+            states[s['name']] = Timer(s['name'], [], float(s.get('time_rem_s', 0.0)),
+                                      None if expires_at_s is None else float(expires_at_s))
+        else:
+            states[s['name']] = Id(s['name'], [])
+
+    # Transitions are added once every state exists, as they may refer to any state.
+    for s in spec['states']:
+        comp = states[s['name']]
+        for t in s.get('transitions', []):
+            conditions = [TimerExpired() if 'timer_expired' in c else Compare(c['field'], c['op'], c['value'])
+                          for c in t['when']]
+            condition = conditions[0]
+            for c in conditions[1:]:
+                condition = condition & c
+            action = Action[t['action']] if 'action' in t else None
+            comp.add_transition(When(condition, action, states[t['target']]))
+
+    return states[spec['initial']]
+
+
+def _atmosphere(spec: Dict[str, Any]) -> Atmosphere:
+    options = {k: v for k, v in spec.items() if k not in ('type', 'wind')}
+    wind = _curve(spec['wind']) if 'wind' in spec else None
+    if spec['type'] == 'constant':
+        return ConstantAtmosphere(wind=wind, **options)
+    return StandardAtmosphere(wind=wind, **options)
+
+
+def vehicle_from_spec(spec: Dict[str, Any], validate: bool = True) -> Vehicle:
+    """
+    :param spec: spec of a vehicle, e.g. as written by `vehicle_to_spec`.
+    :param validate: check the spec first, see `validate_spec`. Without checking, an invalid spec may raise any error.
+    :return: new vehicle.
+    """
+    if validate:
+        validate_spec(spec)
+
+    stages = [_stage(s) for s in spec['stages']]
+    parachute = _stage(spec['parachute']) if 'parachute' in spec else None
+
+    state = VehicleState.zero()
+    for f, value in spec.get('state', {}).items():
+        setattr(state, f, float(value))
+
+    atmosphere = _atmosphere(spec['atmosphere']) if 'atmosphere' in spec else None
+    return Vehicle(_computer(spec['computer']), stages[0], stages[1:], parachute, state, atmosphere)
+
+
+def loads_spec(text: str, format: str = 'json') -> Dict[str, Any]:
+    """
+    :param format: 'json' or 'toml'.
+    :return: spec parsed from text, without validating it.
+    """
+    if format == 'json':
+        return json.loads(text)
+    if format == 'toml':
+        if tomllib is None:
+            raise SpecError('Reading TOML needs Python 3.11 or later')
+        return tomllib.loads(text)
+    raise ValueError(f'Unknown spec format {format}')
+
+
+def load_vehicle(path: str) -> Vehicle:
+    """
+    :param path: spec file, read as TOML if its name ends in .toml, otherwise as JSON.
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return vehicle_from_spec(loads_spec(text, 'toml' if path.endswith('.toml') else 'json'))
+
+
+def save_vehicle(vehicle: Vehicle, path: str, name: Optional[str] = None):
+    """
+    Writes the spec of a vehicle as JSON.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(vehicle_to_spec(vehicle, name), f, indent=2)
@@ -1,19 +1,38 @@
-from typing import Callable, TypeVar, List
-import math
+from typing import Callable, TypeVar, List, Union
+from .curves import Curve
 
 T = TypeVar('T')
 total_time_s = float
 delta_time_s = float
 
 
-def _to(f, x, nearest):
+class Const:
     """
-    :param f: rounding function, e.g. ceiling, floor, round
-    :param x: number to round
-    :param nearest: number to round to
-    :return: x rounded to `nearest`
+    Parameter of stage which does not change over time from initial value.
+    """
+    __slots__ = ()
+
+    def __call__(self, _dt: delta_time_s, _t: total_time_s, prev_x: T) -> T:
+        return prev_x
+
+
+class Linear:
+    """
+    Increase/decrease amount linearly.
     """
-    return nearest * f(float(x) / nearest)
+    __slots__ = ('dx_per_sec',)
+
+    dx_per_sec: float
+
+    def __init__(self, dx_per_sec: float):
+        """
+        :param dx_per_sec: amount to modify by per second.
+        """
+        self.dx_per_sec = dx_per_sec
+
+    def __call__(self, dt: delta_time_s, _: total_time_s, prev_x: T) -> T:
+        dx = self.dx_per_sec * dt
+        return prev_x + dx
 
 
 def const() -> Callable[[delta_time_s, total_time_s, T], T]:
@@ -21,7 +40,7 @@ def const() -> Callable[[delta_time_s, total_time_s, T], T]:
     Parameter of stage which does not change over time from initial value.
     :return: function which returns previous value.
     """
-    return lambda _dt, _t, prev_x: prev_x
+    return Const()
 
 
 def linear(dx_per_sec: T) -> Callable[[delta_time_s, total_time_s, T], T]:
@@ -30,11 +49,7 @@ def linear(dx_per_sec: T) -> Callable[[delta_time_s, total_time_s, T], T]:
     :param dx_per_sec: amount to modify by per second.
     :return: function which decreases x by dx_per_sec per second.
     """
-    def f(dt: delta_time_s, _: total_time_s, prev_x: T) -> T:
-        dx = dx_per_sec * dt
-        return prev_x + dx
-
-    return f
+    return Linear(dx_per_sec)
 
 
 def lerp(timestep_s: float, time_series: List[T]) -> Callable[[delta_time_s, total_time_s, T], T]:
@@ -43,35 +58,21 @@ def lerp(timestep_s: float, time_series: List[T]) -> Callable[[delta_time_s, tot
     :param time_series: value at increments of `timestep_s` seconds.
     :return: function which linearly interpolates between closest points of time series.
     """
-    def f(_dt: delta_time_s, t: total_time_s, _prev_x: T) -> T:
-        low = int(max(_to(math.floor, t, timestep_s), 0))
-        high = int(min(_to(math.ceil, t, timestep_s), (len(time_series)-1)*timestep_s))
-
-        low_i = int(low / timestep_s)
-        high_i = int(high / timestep_s)
-
-        low_v = time_series[low_i]
-        high_v = time_series[high_i]
-
-        if low_i == high_i:
-            return low_v
-
-        m = (high_v - low_v) / (high - low)
-        # 'distance' t is from lower to upper bound.
-        x = t - low_i * timestep_s
-        return low_v + m * x
-
-    return f
+    return Curve.uniform(timestep_s, time_series)
 
 
 class Stage:
     """
     Defines how rocket changes over time.
     """
+    __slots__ = ('stage_time_s', 'area_m2', 'drag_coefficient', 'empty_mass_kg', 'engine_case_mass_kg',
+                 'propellant_mass_kg', 'thrust_N', 'f_propellant_mass_kg', 'f_thrust_N')
+
     stage_time_s: float
 
     area_m2: float
-    drag_coefficient: float
+    # Constant, or a Curve over Mach number.
+    drag_coefficient: Union[float, Curve]
     empty_mass_kg: float
     engine_case_mass_kg: float
 
@@ -85,7 +86,7 @@ class Stage:
     def __init__(self,
                  stage_time_s: float,
                  area_m2: float,
-                 drag_coefficient: float,
+                 drag_coefficient: Union[float, Curve],
                  empty_mass_kg: float,
                  engine_case_mass_kg: float,
                  propellant_mass_kg: float,
@@ -124,3 +125,23 @@ class Stage:
 
         return Stage(self.stage_time_s + dt, self.area_m2, self.drag_coefficient, self.empty_mass_kg,
                      self.engine_case_mass_kg, new_prop_mass, new_thrust_N, self.f_propellant_mass_kg, self.f_thrust_N)
+
+    def step_in_place(self, dt: delta_time_s):
+        """
+        Same as `step`, but updates this stage instead of creating a new one.
+        :param dt: delta time since last step.
+        """
+        if self.propellant_mass_kg > 0.0:
+            new_prop_mass = max(self.f_propellant_mass_kg(dt, self.stage_time_s, self.propellant_mass_kg), 0.0)
+            self.thrust_N = self.f_thrust_N(dt, self.stage_time_s, self.thrust_N)
+            self.propellant_mass_kg = new_prop_mass
+        else:
+            self.propellant_mass_kg = 0.0
+            self.thrust_N = 0.0
+
+        self.stage_time_s += dt
+
+    def copy(self) -> 'Stage':
+        return Stage(self.stage_time_s, self.area_m2, self.drag_coefficient, self.empty_mass_kg,
+                     self.engine_case_mass_kg, self.propellant_mass_kg, self.thrust_N, self.f_propellant_mass_kg,
+                     self.f_thrust_N)
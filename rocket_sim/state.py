@@ -1,17 +1,22 @@
 from .stage import Stage
+from .atmosphere import Atmosphere, drag_and_gravity
+from .curves import Curve
 from typing import Optional
 
 class VehicleState:
     """
     State of rocket at given point in time. Used to record data to plot.
     """
+    __slots__ = ('event', 'time_s', 'mass_kg', 'thrust_N', 'air_resistance_N', 'weight_N', 'net_force_N', 'accel_ms2',
+                 'velocity_ms', 'dist_m')
+
     event: Optional[str]
     time_s: float
     mass_kg: float
     thrust_N: float
     air_resistance_N: float
     weight_N: float
-    net_force: float
+    net_force_N: float
     accel_ms2: float
     velocity_ms: float
     dist_m: float
@@ -32,12 +37,20 @@ class VehicleState:
     def set_event_name(self, event: str):
         self.event = event
 
-    def step(self, dt: float, time_s: float, stage: Stage) -> 'VehicleState':
+    def step(self, dt: float, time_s: float, stage: Stage, atmosphere: Optional[Atmosphere] = None) \
+            -> 'VehicleState':
+        """
+        :param atmosphere: atmosphere the vehicle is flying through, or None for constant sea level conditions.
+        """
         mass_kg = stage.total_mass_kg()
 
-        # 0.5*rho*Cd*A*SIGN(V)*V^2
-        air_resistance_N = 0.5 * 1.2 * stage.drag_coefficient * stage.area_m2 * self.velocity_ms * abs(self.velocity_ms)
-        weight_N = mass_kg * 9.81
+        if atmosphere is None and not isinstance(stage.drag_coefficient, Curve):
+            # 0.5*rho*Cd*A*SIGN(V)*V^2
+            air_resistance_N = 0.5 * 1.2 * stage.drag_coefficient * stage.area_m2 * self.velocity_ms * abs(self.velocity_ms)
+            weight_N = mass_kg * 9.81
+        else:
+            air_resistance_N, gravity_ms2 = drag_and_gravity(stage, self.dist_m, self.velocity_ms, atmosphere)
+            weight_N = mass_kg * gravity_ms2
         thrust_N = stage.thrust_N
         net_force_N = thrust_N - weight_N - air_resistance_N
 
@@ -47,6 +60,40 @@ class VehicleState:
 
         return VehicleState(None, time_s, mass_kg, thrust_N, air_resistance_N, weight_N, net_force_N, accel_ms2, velocity_ms, dist_m)
 
+    def step_into(self, dt: float, time_s: float, stage: Stage, out: 'VehicleState',
+                  atmosphere: Optional[Atmosphere] = None):
+        """
+        Same as `step`, but writes the next state into `out` instead of creating a new state.
+        :param out: state to overwrite, must not be this state.
+        """
+        mass_kg = stage.total_mass_kg()
+
+        if atmosphere is None and not isinstance(stage.drag_coefficient, Curve):
+            # 0.5*rho*Cd*A*SIGN(V)*V^2
+            air_resistance_N = 0.5 * 1.2 * stage.drag_coefficient * stage.area_m2 * self.velocity_ms * abs(self.velocity_ms)
+            weight_N = mass_kg * 9.81
+        else:
+            air_resistance_N, gravity_ms2 = drag_and_gravity(stage, self.dist_m, self.velocity_ms, atmosphere)
+            weight_N = mass_kg * gravity_ms2
+        thrust_N = stage.thrust_N
+        net_force_N = thrust_N - weight_N - air_resistance_N
+        accel_ms2 = net_force_N / mass_kg
+
+        out.event = None
+        out.time_s = time_s
+        out.mass_kg = mass_kg
+        out.thrust_N = thrust_N
+        out.air_resistance_N = air_resistance_N
+        out.weight_N = weight_N
+        out.net_force_N = net_force_N
+        out.accel_ms2 = accel_ms2
+        out.velocity_ms = self.velocity_ms + accel_ms2 * dt
+        out.dist_m = self.dist_m + self.velocity_ms * dt + 0.5 * self.accel_ms2 * dt**2
+
+    def copy(self) -> 'VehicleState':
+        return VehicleState(self.event, self.time_s, self.mass_kg, self.thrust_N, self.air_resistance_N, self.weight_N,
+                            self.net_force_N, self.accel_ms2, self.velocity_ms, self.dist_m)
+
     @staticmethod
     def zero(time=0.0) -> 'VehicleState':
         return VehicleState(None, time, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
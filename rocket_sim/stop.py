@@ -0,0 +1,187 @@
+"""
+Conditions for stopping a simulation before the vehicle returns to the ground, e.g. when only the apogee is needed.
+"""
+from typing import Callable, Tuple, FrozenSet
+import math
+from .state import VehicleState
+from .vehicle import Vehicle
+from .curves import Curve
+from .flight_comp import Id
+from .atmosphere import ConstantAtmosphere, DEFAULT
+
+"""
+Properties of Simulation which are calculated from the whole flight.
+"""
+PROPERTIES = frozenset(['apogee', 'maximum_velocity', 'maximum_acceleration', 'maximum_g_force', 'impact_velocity',
+                        'total_time', 'events', 'burnout_time', 'maximum_dynamic_pressure', 'maximum_drag',
+                        'parachute_descent_rate'])
+
+_G = 9.81
+
+
+class StopCondition:
+    """
+    Decides whether to stop a simulation after a step.
+    """
+    __slots__ = ()
+
+    """
+    Properties of Simulation which are the same as for the whole flight when the simulation is stopped by this
+    condition.
+    """
+    valid: FrozenSet[str] = frozenset()
+
+    def should_stop(self, prev: VehicleState, vehicle: Vehicle) -> bool:
+        """
+        :param prev: state of the vehicle before the step.
+        :param vehicle: vehicle after the step.
+        """
+        raise NotImplementedError
+
+
+class AtApogee(StopCondition):
+    """
+    Stops once the vehicle starts to descend, and can no longer climb as it will produce no more thrust.
+    """
+    __slots__ = ()
+
+    # Afterwards the vehicle only descends, so reaches no higher altitude or upwards velocity.
+    valid = frozenset(['apogee', 'maximum_velocity'])
+
+    def should_stop(self, prev: VehicleState, vehicle: Vehicle) -> bool:
+        return prev.velocity_ms > 0.0 >= vehicle.state.velocity_ms and vehicle.coasting()
+
+
+class AtAltitude(StopCondition):
+    """
+    Stops when the vehicle passes an altitude.
+    """
+    __slots__ = ('altitude_m', 'ascending')
+
+    altitude_m: float
+    ascending: bool
+
+    def __init__(self, altitude_m: float, ascending: bool = True):
+        """
+        :param ascending: stop when passing the altitude while ascending, otherwise while descending.
+        """
+        self.altitude_m = altitude_m
+        self.ascending = ascending
+
+    def should_stop(self, prev: VehicleState, vehicle: Vehicle) -> bool:
+        d = vehicle.state.dist_m
+        if self.ascending:
+            return prev.dist_m < self.altitude_m <= d
+        return prev.dist_m > self.altitude_m >= d
+
+
+class AtTime(StopCondition):
+    """
+    Stops once a total time has been simulated.
+    """
+    __slots__ = ('time_s',)
+
+    time_s: float
+
+    def __init__(self, time_s: float):
+        self.time_s = time_s
+
+    def should_stop(self, prev: VehicleState, vehicle: Vehicle) -> bool:
+        return vehicle.state.time_s >= self.time_s
+
+
+class AtEvent(StopCondition):
+    """
+    Stops at the first occurrence of an event, e.g. 'Parachute'.
+    """
+    __slots__ = ('name',)
+
+    name: str
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def should_stop(self, prev: VehicleState, vehicle: Vehicle) -> bool:
+        return vehicle.state.event == self.name
+
+
+class Predicate(StopCondition):
+    """
+    Stops when a function of the previous and current state returns True.
+    """
+    __slots__ = ('f',)
+
+    f: Callable[[VehicleState, VehicleState], bool]
+
+    def __init__(self, f: Callable[[VehicleState, VehicleState], bool]):
+        self.f = f
+
+    def should_stop(self, prev: VehicleState, vehicle: Vehicle) -> bool:
+        return self.f(prev, vehicle.state)
+
+
+def is_ballistic(vehicle: Vehicle) -> bool:
+    """
+    :return: whether the rest of the flight is determined by gravity and drag alone, i.e. the vehicle produces no more
+        thrust and its flight computer can take no more actions, and gravity and drag are simple enough to solve, i.e.
+        constant air density and gravity, still air, and a constant drag coefficient.
+    """
+    comp = vehicle.computer_state
+    atmosphere = vehicle.atmosphere
+    constant_air = atmosphere is None or (type(atmosphere) is ConstantAtmosphere and atmosphere.wind is None)
+    return (vehicle.coasting() and type(comp) is Id and len(comp.ts) == 0 and constant_air and
+            not isinstance(vehicle.stage.drag_coefficient, Curve))
+
+
+def ballistic_touchdown(state: VehicleState, mass_kg: float, drag_factor: float, gravity_ms2: float = _G) \
+        -> Tuple[float, float]:
+    """
+    Solves the motion of a body under gravity and quadratic drag in closed form. Approximates what stepping would
+    give, to within the error of the time step.
+    :param state: current state of the vehicle.
+    :param mass_kg: mass of the vehicle, which must not change.
+    :param drag_factor: 0.5*rho*Cd*A, so drag is drag_factor*v^2.
+    :param gravity_ms2: acceleration due to gravity.
+    :return: time, and velocity, at which the vehicle reaches the ground.
+    """
+    g = gravity_ms2
+    h = max(state.dist_m, 0.0)
+    v0 = state.velocity_ms
+    t0 = state.time_s
+
+    if drag_factor <= 0.0:
+        t = (v0 + math.sqrt(v0*v0 + 2*g*h)) / g
+        return t0 + t, -math.sqrt(v0*v0 + 2*g*h)
+
+    # Terminal velocity, and the time and distance scales of the motion.
+    vt = math.sqrt(mass_kg * g / drag_factor)
+    tau = vt / g
+    length = vt * vt / g
+
+    if v0 > 0.0:
+        # Climb to the top, then fall from rest.
+        t_up = tau * math.atan(v0 / vt)
+        h += 0.5 * length * math.log1p((v0 / vt)**2)
+    else:
+        # Falling already: equivalent to having fallen from rest for some time from a greater height.
+        speed = min(-v0, vt * (1 - 1e-12))
+        t_up = -tau * math.atanh(speed / vt)
+        h += length * math.log(math.cosh(-t_up / tau))
+
+    # Fallen from rest: y = length*ln(cosh(t/tau)), v = -vt*tanh(t/tau). Solved for y = h in a form which does not
+    # overflow for falls of many times the length scale.
+    x = h / length
+    fraction = math.sqrt(-math.expm1(-2*x))
+    t_fall = tau * (x + math.log1p(fraction))
+    return t0 + t_up + t_fall, -vt * fraction
+
+
+def ballistic_tail(vehicle: Vehicle) -> Tuple[float, float]:
+    """
+    :param vehicle: vehicle for which `is_ballistic` holds.
+    :return: time, and velocity, at which the vehicle reaches the ground.
+    """
+    stage = vehicle.stage
+    density, gravity, _, _ = (vehicle.atmosphere or DEFAULT).at(0.0)
+    return ballistic_touchdown(vehicle.state, stage.total_mass_kg(), 0.5 * density * stage.drag_coefficient * stage.area_m2,
+                               gravity)
@@ -0,0 +1,226 @@
+"""
+Binary trajectory files. A file consists of:
+
+- A fixed size header: magic bytes, then the length of a JSON description of the file, then the JSON. The JSON
+  contains the field names, dt, vehicle name, capacity and length of the columns, and location of the event table.
+- One contiguous little-endian float64 column per field, each with space for `capacity` samples, of which the first
+  `length` are valid.
+- The event table: number of events, the sample index of each event, then the newline separated event names.
+
+Columns can therefore be memory-mapped and read without copying, and the file can be appended to while a simulation
+is running.
+"""
+from typing import Optional, Tuple, List, Dict, Any
+import json
+import struct
+import numpy as np
+from .state import VehicleState
+from .trajectory import Trajectory, FIELDS
+
+MAGIC = b'RKTTRAJ1'
+HEADER_SIZE = 4096
+_DTYPE = np.dtype('<f8')
+
+
+def _column_offset(capacity: int, j: int) -> int:
+    return HEADER_SIZE + j * capacity * _DTYPE.itemsize
+
+
+def _write_header(f, header: Dict[str, Any]):
+    data = json.dumps(header).encode('utf-8')
+    if len(MAGIC) + 4 + len(data) > HEADER_SIZE:
+        raise ValueError('Trajectory header is too large')
+
+    f.seek(0)
+    f.write(MAGIC + struct.pack('<I', len(data)) + data)
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """
+    :return: description of the trajectory file, without reading its columns.
+    """
+    with open(path, 'rb') as f:
+        prefix = f.read(len(MAGIC) + 4)
+        if len(prefix) < len(MAGIC) + 4 or prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a trajectory file')
+
+        (n,) = struct.unpack('<I', prefix[len(MAGIC):])
+        header = json.loads(f.read(n).decode('utf-8'))
+
+    if tuple(header['fields']) != FIELDS:
+        raise ValueError(f'{path} has fields {header["fields"]}, expected {list(FIELDS)}')
+
+    return header
+
+
+def _write_events(f, offset: int, indices: List[int], names: List[str]) -> int:
+    """
+    :return: size of the event table in bytes.
+    """
+    names_data = '\n'.join(names).encode('utf-8')
+    data = struct.pack('<Q', len(indices)) + np.array(indices, dtype='<i8').tobytes() + names_data
+    f.seek(offset)
+    f.write(data)
+    return len(data)
+
+
+def _read_events(f, offset: int, size: int) -> Tuple[List[int], List[str]]:
+    f.seek(offset)
+    data = f.read(size)
+    (n,) = struct.unpack('<Q', data[:8])
+    indices = np.frombuffer(data[8:8 + 8*n], dtype='<i8').tolist()
+    names = data[8 + 8*n:].decode('utf-8').split('\n') if n > 0 else []
+    return indices, names
+
+
+def load_trajectory(path: str, mmap: bool = True) -> Tuple[Trajectory, Dict[str, Any]]:
+    """
+    :param mmap: map the columns of the file into memory, so they are only read when accessed. Otherwise, the columns
+           are read into memory.
+    :return: trajectory stored in the file, and the file's header.
+    """
+    header = read_header(path)
+    capacity = header['capacity']
+    length = header['length']
+
+    with open(path, 'rb') as f:
+        indices, names = _read_events(f, header['events_offset'], header['events_size'])
+
+    if mmap:
+        columns = np.memmap(path, dtype=_DTYPE, mode='r', offset=HEADER_SIZE, shape=(len(FIELDS), capacity))
+    else:
+        columns = np.fromfile(path, dtype=_DTYPE, count=len(FIELDS) * capacity, offset=HEADER_SIZE)
+        columns = columns.reshape(len(FIELDS), capacity)
+
+    trajectory = Trajectory.from_columns(columns[:, :length], list(zip(indices, names)))
+    return trajectory, header
+
+
+class TrajectoryWriter:
+    """
+    Writes a trajectory file in chunks. Can be used as a sink, e.g. `record(simulate_iter(vehicle, dt), writer)`, to
+    write a trajectory while it is being simulated.
+    """
+    path: str
+    dt: Optional[float]
+    name: Optional[str]
+
+    def __init__(self, path: str, dt: Optional[float] = None, name: Optional[str] = None, capacity: int = 65536,
+                 chunk_size: int = 4096):
+        """
+        :param dt: time step the trajectory was simulated with, if any.
+        :param name: name of the vehicle.
+        :param capacity: number of samples to initially reserve space for in the file. Grows as needed.
+        :param chunk_size: number of samples to buffer in memory before writing to the file.
+        """
+        self.path = path
+        self.dt = dt
+        self.name = name
+        self._capacity = max(capacity, 1)
+        self._length = 0
+        self._event_indices: List[int] = []
+        self._event_names: List[str] = []
+        self._buffer = Trajectory(chunk_size)
+        self._chunk_size = chunk_size
+        self._file = open(path, 'w+b')
+        self._write_metadata()
+
+    def __enter__(self) -> 'TrajectoryWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._length + len(self._buffer)
+
+    def _events_offset(self) -> int:
+        return _column_offset(self._capacity, len(FIELDS))
+
+    def _write_metadata(self):
+        events_offset = self._events_offset()
+        events_size = _write_events(self._file, events_offset, self._event_indices, self._event_names)
+        self._file.truncate(events_offset + events_size)
+
+        _write_header(self._file, {
+            'fields': list(FIELDS),
+            'dtype': _DTYPE.str,
+            'dt': self.dt,
+            'name': self.name,
+            'capacity': self._capacity,
+            'length': self._length,
+            'events_offset': events_offset,
+            'events_size': events_size,
+        })
+        self._file.flush()
+
+    def _move_columns(self, new_capacity: int):
+        """
+        Moves the columns in the file so each has space for `new_capacity` samples.
+        """
+        n = self._length * _DTYPE.itemsize
+        # Move in the order which never overwrites a column that has not been moved yet.
+        order = range(len(FIELDS) - 1, -1, -1) if new_capacity > self._capacity else range(len(FIELDS))
+        for j in order:
+            self._file.seek(_column_offset(self._capacity, j))
+            data = self._file.read(n)
+            self._file.seek(_column_offset(new_capacity, j))
+            self._file.write(data)
+
+        self._capacity = new_capacity
+
+    def extend(self, trajectory: Trajectory):
+        """
+        Writes all the samples of `trajectory` to the end of the file.
+        """
+        n = len(trajectory)
+        if n == 0:
+            return
+
+        if self._length + n > self._capacity:
+            self._move_columns(max(self._length + n, self._capacity * 2))
+
+        for j, field in enumerate(FIELDS):
+            self._file.seek(_column_offset(self._capacity, j) + self._length * _DTYPE.itemsize)
+            self._file.write(trajectory.column(field).astype(_DTYPE, copy=False).tobytes())
+
+        for i, name in trajectory.events:
+            self._event_indices.append(self._length + i)
+            self._event_names.append(name)
+
+        self._length += n
+        self._write_metadata()
+
+    def append(self, state: VehicleState):
+        self._buffer.append(state)
+        if len(self._buffer) == self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes buffered samples to the file.
+        """
+        self.extend(self._buffer)
+        self._buffer.clear()
+
+    def close(self):
+        """
+        Writes remaining samples and shrinks the columns to fit the samples written.
+        """
+        if self._file.closed:
+            return
+
+        self.flush()
+        if self._capacity > self._length:
+            self._move_columns(max(self._length, 1))
+            self._write_metadata()
+
+        self._file.close()
+
+
+def save_trajectory(trajectory: Trajectory, path: str, dt: Optional[float] = None, name: Optional[str] = None):
+    """
+    Writes the trajectory to a new file, replacing any existing file.
+    """
+    with TrajectoryWriter(path, dt, name, capacity=len(trajectory)) as writer:
+        writer.extend(trajectory)
@@ -0,0 +1,265 @@
+"""
+Surrogate models of the flight metrics of a family of vehicles, which answer queries over a design space without
+simulating, e.g.:
+
+    model = fit_surrogate(single_stage_parachute, {'thrust_N': (4.0, 9.0), 'parachute_area_m2': (0.005, 0.05)},
+                          dt=0.001, samples=48)
+    model.refine(16)
+    model.predict({'thrust_N': [5.0, 6.5], 'parachute_area_m2': [0.01, 0.02]})['apogee_m']
+    model.save('parachute.npz')
+
+Metrics are interpolated between the sampled vehicles by cubic radial basis functions with a linear trend. The error
+of each sample's metrics when it is left out of the fit is the estimate of the error near that sample, and `refine`
+adds samples where it is largest. Vehicles outside the sampled bounds are simulated.
+"""
+from typing import Dict, List, Optional, Sequence, Union
+import json
+import numpy as np
+from .monte_carlo import vehicle_factory, FlightSummary
+from .optimize import param_bounds, latin_hypercube
+from .scheduler import FactorySpec, simulate_parallel
+
+"""
+Metrics of FlightSummary which are modelled.
+"""
+METRICS = tuple(name for name in FlightSummary.__annotations__ if name != 'events')
+
+_VERSION = 1
+
+
+def _simulate(factory: Union[str, vehicle_factory], params: List[Dict[str, float]], dt: float,
+              metrics: Sequence[str], workers: Optional[int]) -> np.ndarray:
+    """
+    :return: value of each metric, a column, for each parameter set, a row.
+    """
+    specs = [FactorySpec(factory, p) for p in params]
+    summaries = [FlightSummary(sim) for sim in simulate_parallel(specs, dt, workers=workers, chunk_size=16)]
+    return np.array([[getattr(s, m) for m in metrics] for s in summaries], dtype=np.float64).reshape(-1, len(metrics))
+
+
+class Surrogate:
+    """
+    Interpolant of the metrics of vehicles sampled from a factory, within bounds on its parameters.
+    """
+    factory: Optional[Union[str, vehicle_factory]]
+    bounds: param_bounds
+    dt: float
+    names: List[str]
+    metrics: List[str]
+    samples: np.ndarray
+    values: np.ndarray
+    workers: Optional[int]
+
+    def __init__(self, factory: Optional[Union[str, vehicle_factory]], bounds: param_bounds, dt: float,
+                 samples: np.ndarray, values: np.ndarray, metrics: Sequence[str] = METRICS,
+                 workers: Optional[int] = None):
+        """
+        :param factory: creates a vehicle from keyword parameters, defined at the top level of a module, or its path
+               as 'module:name', see FactorySpec. Used to simulate vehicles outside the bounds, and when refining. If
+               None, vehicles can only be interpolated.
+        :param bounds: lower and upper bound of each parameter of the factory.
+        :param dt: time step the samples were simulated with.
+        :param samples: parameters of each sampled vehicle, a row, in the order of the sorted parameter names.
+        :param values: metrics of each sampled vehicle, a row, in the order of `metrics`.
+        :param metrics: attributes of FlightSummary.
+        :param workers: number of processes to simulate with. If 1, vehicles are simulated in this process. If None,
+               uses a process per CPU.
+        """
+        for name in metrics:
+            if name not in METRICS:
+                raise ValueError(f'Unknown metric {name}, expected one of {list(METRICS)}')
+        for name, (low, high) in bounds.items():
+            if not high > low:
+                raise ValueError(f'Bounds of {name} are empty: {low} to {high}')
+
+        self.factory = factory
+        self.dt = dt
+        self.metrics = list(metrics)
+        self.workers = workers
+        self._set_bounds(bounds)
+        self._fit(np.asarray(samples, dtype=np.float64), np.asarray(values, dtype=np.float64))
+
+    def _set_bounds(self, bounds: param_bounds):
+        self.bounds = dict(bounds)
+        self.names = sorted(bounds)
+        self._low = np.array([bounds[n][0] for n in self.names], dtype=np.float64)
+        self._span = np.array([bounds[n][1] for n in self.names], dtype=np.float64) - self._low
+
+    def _fit(self, samples: np.ndarray, values: np.ndarray):
+        """
+        Solves for the weights of the basis functions and the linear trend, and the error of each sample when it is
+        left out, which for an interpolant is its weight over the diagonal of the inverse of the system (Rippa, 1999).
+        """
+        n, d = samples.shape
+        if n < d + 2:
+            raise ValueError(f'At least {d + 2} samples are needed to fit {d} parameters, got {n}')
+
+        self.samples = samples
+        self.values = values
+        self._u = (samples - self._low) / self._span
+
+        r = np.sqrt(((self._u[:, None, :] - self._u[None, :, :]) ** 2).sum(axis=-1))
+        trend = np.hstack([np.ones((n, 1)), self._u])
+        system = np.block([[r ** 3, trend], [trend.T, np.zeros((d + 1, d + 1))]])
+        inverse = np.linalg.pinv(system)
+
+        rhs = np.vstack([values, np.zeros((d + 1, values.shape[1]))])
+        self._weights = inverse @ rhs
+        self._loo = np.abs(self._weights[:n] / np.diag(inverse)[:n, None])
+
+    def _unit(self, params: Dict[str, Union[float, Sequence[float]]]) -> np.ndarray:
+        missing = [n for n in self.names if n not in params]
+        if missing:
+            raise ValueError(f'Missing parameters {missing}')
+        columns = [np.atleast_1d(np.asarray(params[n], dtype=np.float64)) for n in self.names]
+        return (np.stack(np.broadcast_arrays(*columns), axis=1) - self._low) / self._span
+
+    def _interpolate(self, u: np.ndarray) -> np.ndarray:
+        r = np.sqrt(((u[:, None, :] - self._u[None, :, :]) ** 2).sum(axis=-1))
+        return np.hstack([r ** 3, np.ones((len(u), 1)), u]) @ self._weights
+
+    def _nearest(self, u: np.ndarray) -> np.ndarray:
+        return ((u[:, None, :] - self._u[None, :, :]) ** 2).sum(axis=-1).argmin(axis=1)
+
+    def inside(self, params: Dict[str, Union[float, Sequence[float]]]) -> np.ndarray:
+        """
+        :return: whether each vehicle is within the bounds.
+        """
+        u = self._unit(params)
+        return ((u >= 0.0) & (u <= 1.0)).all(axis=1)
+
+    def predict(self, params: Dict[str, Union[float, Sequence[float]]], fallback: bool = True) \
+            -> Dict[str, np.ndarray]:
+        """
+        :param params: value, or values, of each parameter of the factory.
+        :param fallback: simulate the vehicles outside the bounds, rather than extrapolating.
+        :return: estimate of each metric for each vehicle.
+        """
+        u = self._unit(params)
+        values = self._interpolate(u)
+
+        outside = np.flatnonzero(~((u >= 0.0) & (u <= 1.0)).all(axis=1))
+        if fallback and len(outside):
+            if self.factory is None:
+                raise ValueError('Vehicles outside the bounds cannot be simulated without a factory')
+            x = self._low + u[outside] * self._span
+            values[outside] = _simulate(self.factory, [dict(zip(self.names, row.tolist())) for row in x], self.dt,
+                                        self.metrics, self.workers)
+
+        return {m: values[:, k] for k, m in enumerate(self.metrics)}
+
+    def query(self, **params: float) -> Dict[str, float]:
+        """
+        :return: estimate of each metric for a single vehicle, see `predict`.
+        """
+        return {m: float(v[0]) for m, v in self.predict(params).items()}
+
+    def error(self, params: Dict[str, Union[float, Sequence[float]]]) -> Dict[str, np.ndarray]:
+        """
+        :return: estimated absolute error of each metric for each vehicle: the error of the nearest sample when left
+                 out of the fit.
+        """
+        loo = self._loo[self._nearest(self._unit(params))]
+        return {m: loo[:, k] for k, m in enumerate(self.metrics)}
+
+    def cross_validation_error(self) -> Dict[str, float]:
+        """
+        :return: root mean square error of each metric over the samples, each left out of the fit in turn.
+        """
+        return {m: float(np.sqrt(np.mean(self._loo[:, k] ** 2))) for k, m in enumerate(self.metrics)}
+
+    def refine(self, n: int, candidates: int = 1024, seed: int = 0) -> List[Dict[str, float]]:
+        """
+        Simulates `n` more vehicles and refits. Each is the candidate which most reduces the distance to a sample,
+        weighted by the estimated error there, relative to the range of each metric.
+        :param candidates: number of candidate vehicles to choose from, spread over the bounds.
+        :param seed: seed of the candidates.
+        :return: parameters of the new samples.
+        """
+        if self.factory is None:
+            raise ValueError('A surrogate cannot be refined without a factory')
+
+        spread = latin_hypercube(self.bounds, candidates, seed)
+        u = self._unit({name: [c[name] for c in spread] for name in self.names})
+        scale = np.ptp(self.values, axis=0)
+        scale[scale == 0.0] = 1.0
+        error = (self._loo[self._nearest(u)] / scale).max(axis=1)
+        distance = np.sqrt(((u[:, None, :] - self._u[None, :, :]) ** 2).sum(axis=-1)).min(axis=1)
+
+        chosen = []
+        for _ in range(min(n, candidates)):
+            i = int(np.argmax(error * distance))
+            chosen.append(i)
+            distance = np.minimum(distance, np.sqrt(((u - u[i]) ** 2).sum(axis=1)))
+
+        x = self._low + u[chosen] * self._span
+        params = [dict(zip(self.names, row.tolist())) for row in x]
+        values = _simulate(self.factory, params, self.dt, self.metrics, self.workers)
+        self._fit(np.vstack([self.samples, x]), np.vstack([self.values, values]))
+        return params
+
+    def save(self, path: str):
+        """
+        Writes the samples and fit to a NumPy .npz file. The factory is saved only if it can be imported, see
+        FactorySpec.
+        """
+        factory = self.factory
+        if factory is not None and not isinstance(factory, str):
+            try:
+                factory = FactorySpec(factory).factory
+            except ValueError:
+                factory = None
+
+        header = {'version': _VERSION, 'factory': factory, 'bounds': self.bounds, 'dt': self.dt,
+                  'metrics': self.metrics}
+        with open(path, 'wb') as f:
+            np.savez(f, header=np.array(json.dumps(header)), samples=self.samples, values=self.values,
+                     weights=self._weights, loo=self._loo)
+
+
+def load_surrogate(path: str, factory: Optional[Union[str, vehicle_factory]] = None,
+                   workers: Optional[int] = None) -> Surrogate:
+    """
+    :param path: file written by `Surrogate.save`.
+    :param factory: factory to use instead of the one saved, e.g. if it could not be saved.
+    :param workers: see Surrogate.
+    :return: surrogate, without refitting.
+    """
+    with np.load(path) as data:
+        header = json.loads(str(data['header']))
+        if header['version'] != _VERSION:
+            raise ValueError(f'Unsupported surrogate version {header["version"]}')
+
+        model = Surrogate.__new__(Surrogate)
+        model.factory = factory if factory is not None else header['factory']
+        model.dt = header['dt']
+        model.metrics = header['metrics']
+        model.workers = workers
+        model._set_bounds({name: tuple(b) for name, b in header['bounds'].items()})
+        model.samples = data['samples']
+        model.values = data['values']
+        model._u = (model.samples - model._low) / model._span
+        model._weights = data['weights']
+        model._loo = data['loo']
+    return model
+
+
+def fit_surrogate(factory: Union[str, vehicle_factory], bounds: param_bounds, dt: float, samples: int = 64,
+                  metrics: Sequence[str] = METRICS, seed: int = 0, workers: Optional[int] = None) -> Surrogate:
+    """
+    :param factory: creates a vehicle from keyword parameters, e.g. the examples in vehicle_examples.py, see
+           FactorySpec.
+    :param bounds: lower and upper bound of each parameter to vary.
+    :param dt: time step, i.e. resolution.
+    :param samples: number of vehicles to simulate, spread over the bounds by `latin_hypercube`.
+    :param metrics: attributes of FlightSummary to model.
+    :param seed: seed of the samples.
+    :param workers: number of processes to use. If 1, vehicles are simulated in this process. If None, uses a process
+           per CPU.
+    :return: surrogate fitted to the samples.
+    """
+    names = sorted(bounds)
+    params = latin_hypercube(bounds, samples, seed)
+    values = _simulate(factory, params, dt, list(metrics), workers)
+    x = np.array([[p[n] for n in names] for p in params], dtype=np.float64)
+    return Surrogate(factory, bounds, dt, x, values, metrics, workers)
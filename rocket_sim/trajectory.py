@@ -0,0 +1,243 @@
+from .state import VehicleState
+from typing import List, Tuple, Optional, Dict
+import numpy as np
+
+
+"""
+Names of the recorded fields of a VehicleState, in the order they are stored.
+"""
+FIELDS = ('time_s', 'mass_kg', 'thrust_N', 'air_resistance_N', 'weight_N', 'net_force_N', 'accel_ms2',
+          'velocity_ms', 'dist_m')
+
+
+class Trajectory:
+    """
+    Columnar store of vehicle states. Each field is held in its own growable float64 array, and events are held in a
+    separate table of (sample index, event name) pairs.
+    """
+    _columns: np.ndarray
+    _length: int
+    event_indices: List[int]
+    event_names: List[str]
+    # Incremented whenever samples are added or removed, so results computed from the trajectory can be cached.
+    version: int
+
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: number of samples to preallocate space for.
+        """
+        self._columns = np.empty((len(FIELDS), max(capacity, 1)), dtype=np.float64)
+        self._length = 0
+        self.event_indices = []
+        self.event_names = []
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        return self._columns.shape[1]
+
+    def _reserve(self, n: int):
+        """
+        :param n: number of samples which must fit in the store.
+        """
+        if n <= self.capacity:
+            return
+
+        new_capacity = max(n, self.capacity * 2)
+        columns = np.empty((len(FIELDS), new_capacity), dtype=np.float64)
+        columns[:, :self._length] = self._columns[:, :self._length]
+        self._columns = columns
+
+    def append(self, state: VehicleState):
+        """
+        :param state: state to record at the end of the trajectory.
+        """
+        self.append_values(state.event, state.time_s, state.mass_kg, state.thrust_N, state.air_resistance_N,
+                           state.weight_N, state.net_force_N, state.accel_ms2, state.velocity_ms, state.dist_m)
+
+    def append_values(self, event: Optional[str], *values: float):
+        """
+        :param event: name of event which occurred at this sample, if any.
+        :param values: value of each field, in the order of FIELDS.
+        """
+        if self._length == self.capacity:
+            self._reserve(self._length + 1)
+
+        self._columns[:, self._length] = values
+        if event is not None:
+            self.event_indices.append(self._length)
+            self.event_names.append(event)
+
+        self._length += 1
+        self.version += 1
+
+    def extend(self, columns: np.ndarray, events: List[Tuple[int, str]] = ()):
+        """
+        :param columns: array of shape (len(FIELDS), n) containing samples to append.
+        :param events: (index within `columns`, name) of events which occurred in the appended samples.
+        """
+        n = columns.shape[1]
+        self._reserve(self._length + n)
+        self._columns[:, self._length:self._length + n] = columns
+
+        for i, name in events:
+            self.event_indices.append(self._length + i)
+            self.event_names.append(name)
+
+        self._length += n
+        self.version += 1
+
+    def clear(self):
+        """
+        Removes all samples, keeping the allocated space.
+        """
+        self._length = 0
+        self.event_indices = []
+        self.event_names = []
+        self.version += 1
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        :param field: name of field, one of FIELDS.
+        :return: view of the recorded values of the field.
+        """
+        return self._columns[FIELDS.index(field), :self._length]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {f: self.column(f) for f in FIELDS}
+
+    def segments(self, field: str) -> List[np.ndarray]:
+        """
+        :return: views of the recorded values of the field which, in order, make up its column. Reductions over the
+                 segments avoid joining the column where it is stored in parts, see ForkedTrajectory.
+        """
+        return [self.column(field)]
+
+    def value(self, field: str, i: int) -> float:
+        """
+        :return: value of the field at sample `i`, which may be negative to count from the end.
+        """
+        # The samples stored here, whichever column subclasses join them into.
+        return float(Trajectory.column(self, field)[i])
+
+    @property
+    def events(self) -> List[Tuple[int, str]]:
+        return list(zip(self.event_indices, self.event_names))
+
+    def state(self, i: int) -> VehicleState:
+        """
+        :param i: index of sample.
+        :return: sample converted back to a VehicleState.
+        """
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError('Trajectory index out of range')
+
+        event = None
+        if i in self.event_indices:
+            event = self.event_names[self.event_indices.index(i)]
+
+        return VehicleState(event, *(float(v) for v in self._columns[:, i]))
+
+    def states(self) -> List[VehicleState]:
+        """
+        :return: all samples converted back to VehicleState objects.
+        """
+        events = dict(zip(self.event_indices, self.event_names))
+        rows = self._columns[:, :self._length].T.tolist()
+        return [VehicleState(events.get(i), *row) for i, row in enumerate(rows)]
+
+    @staticmethod
+    def from_columns(columns: np.ndarray, events: List[Tuple[int, str]] = ()) -> 'Trajectory':
+        """
+        :param columns: array of shape (len(FIELDS), n), used without copying, e.g. a memory-mapped file.
+        :param events: (index, name) of events which occurred.
+        """
+        if columns.shape[0] != len(FIELDS):
+            raise ValueError(f'Expected {len(FIELDS)} columns, got {columns.shape[0]}')
+
+        trajectory = Trajectory.__new__(Trajectory)
+        trajectory._columns = columns
+        trajectory._length = columns.shape[1]
+        trajectory.event_indices = [i for i, _ in events]
+        trajectory.event_names = [name for _, name in events]
+        trajectory.version = 0
+        return trajectory
+
+    @staticmethod
+    def from_states(states: List[VehicleState]) -> 'Trajectory':
+        trajectory = Trajectory(len(states))
+        for s in states:
+            trajectory.append(s)
+
+        return trajectory
+
+
+class ForkedTrajectory(Trajectory):
+    """
+    Trajectory which continues from the samples of another, which are shared rather than copied, e.g. the common start
+    of the flights of several variants of a vehicle. Samples are added after those of the prefix. Whole columns are
+    joined, i.e. copied, each time they are requested, so metrics reduce over `segments` instead.
+    """
+    prefix: Trajectory
+    _prefix_length: int
+
+    def __init__(self, prefix: Trajectory, capacity: int = 1024):
+        """
+        :param prefix: samples before those of this trajectory. Only the samples it has now are used.
+        """
+        super().__init__(capacity)
+        self.prefix = prefix
+        self._prefix_length = len(prefix)
+
+    def __len__(self) -> int:
+        return self._prefix_length + self._length
+
+    def clear(self):
+        """
+        Removes all samples, including those of the prefix, which is no longer used.
+        """
+        super().clear()
+        self._prefix_length = 0
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        :return: recorded values of the field, joined with those of the prefix into a new array.
+        """
+        return np.concatenate(self.segments(field))
+
+    def segments(self, field: str) -> List[np.ndarray]:
+        return [self.prefix.column(field)[:self._prefix_length], super().column(field)]
+
+    def value(self, field: str, i: int) -> float:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('Trajectory index out of range')
+
+        if i < self._prefix_length:
+            return self.prefix.value(field, i)
+        return super().value(field, i - self._prefix_length)
+
+    @property
+    def events(self) -> List[Tuple[int, str]]:
+        n = self._prefix_length
+        return [(i, name) for i, name in self.prefix.events if i < n] + \
+            [(n + i, name) for i, name in zip(self.event_indices, self.event_names)]
+
+    def state(self, i: int) -> VehicleState:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('Trajectory index out of range')
+
+        if i < self._prefix_length:
+            return self.prefix.state(i)
+        return super().state(i - self._prefix_length)
+
+    def states(self) -> List[VehicleState]:
+        return self.prefix.states()[:self._prefix_length] + super().states()
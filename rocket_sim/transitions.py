@@ -0,0 +1,323 @@
+"""
+Declarative flight computer transitions, e.g.
+
+    comp_burn1.add_transition(When((Field('dist_m') > 10.0) & (Field('accel_ms2') <= 0.5), Action.NEXT_STAGE, comp_burn2))
+
+Unlike arbitrary functions, these can be compiled into a table and evaluated for many vehicles at once.
+"""
+from typing import List, Optional, Tuple, Dict
+import operator
+import numpy as np
+from .flight_comp import Action, CompState, Id, Timer
+from .state import VehicleState
+from .trajectory import FIELDS
+
+_OPS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+# Codes of comparisons in a transition table.
+_LT = 0
+_LE = 1
+_GT = 2
+_GE = 3
+_TRUE = 4
+_OP_CODES = {'<': _LT, '<=': _LE, '>': _GT, '>=': _GE}
+
+# Pseudo-field of a transition table: time remaining on a counting down timer after the step.
+_TIMER = len(FIELDS)
+
+# Actions of a transition table, indexed by code.
+_ACTIONS = [None] + list(Action)
+
+
+class Condition:
+    """
+    Predicate over the state of the vehicle and flight computer.
+    """
+    __slots__ = ()
+
+    def holds(self, prev: VehicleState, now: VehicleState, comp: CompState) -> bool:
+        raise NotImplementedError
+
+    def conjuncts(self) -> List['Condition']:
+        """
+        :return: conditions which must all hold for this condition to hold.
+        """
+        return [self]
+
+    def __and__(self, other: 'Condition') -> 'All':
+        return All(self.conjuncts() + other.conjuncts())
+
+
+class Compare(Condition):
+    """
+    Compares a field of the current vehicle state with a threshold.
+    """
+    __slots__ = ('field', 'op', 'threshold', '_compare')
+
+    field: str
+    op: str
+    threshold: float
+
+    def __init__(self, field: str, op: str, threshold: float):
+        """
+        :param field: name of field of VehicleState, one of FIELDS.
+        :param op: one of '<', '<=', '>', '>='.
+        """
+        if field not in FIELDS:
+            raise ValueError(f'Unknown field {field}')
+        if op not in _OPS:
+            raise ValueError(f'Unknown comparison {op}')
+
+        self.field = field
+        self.op = op
+        self.threshold = float(threshold)
+        self._compare = _OPS[op]
+
+    def holds(self, prev: VehicleState, now: VehicleState, comp: CompState) -> bool:
+        return self._compare(getattr(now, self.field), self.threshold)
+
+    def __repr__(self) -> str:
+        return f'{self.field} {self.op} {self.threshold}'
+
+
+class Field:
+    """
+    Field of the current vehicle state, which can be compared with a threshold to create a condition, e.g.
+    `Field('dist_m') > 10.0`.
+    """
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __lt__(self, threshold: float) -> Compare:
+        return Compare(self.name, '<', threshold)
+
+    def __le__(self, threshold: float) -> Compare:
+        return Compare(self.name, '<=', threshold)
+
+    def __gt__(self, threshold: float) -> Compare:
+        return Compare(self.name, '>', threshold)
+
+    def __ge__(self, threshold: float) -> Compare:
+        return Compare(self.name, '>=', threshold)
+
+
+class TimerExpired(Condition):
+    """
+    Holds when the Timer the transition belongs to has no time remaining.
+    """
+    __slots__ = ()
+
+    def holds(self, prev: VehicleState, now: VehicleState, comp: Timer) -> bool:
+        return comp.expired(prev, now)
+
+    def __repr__(self) -> str:
+        return 'timer expired'
+
+
+class All(Condition):
+    """
+    Holds when all of its conditions hold.
+    """
+    __slots__ = ('conditions',)
+
+    conditions: List[Condition]
+
+    def __init__(self, conditions: List[Condition]):
+        self.conditions = conditions
+
+    def holds(self, prev: VehicleState, now: VehicleState, comp: CompState) -> bool:
+        for c in self.conditions:
+            if not c.holds(prev, now, comp):
+                return False
+        return True
+
+    def conjuncts(self) -> List[Condition]:
+        return list(self.conditions)
+
+    def __repr__(self) -> str:
+        return ' and '.join(repr(c) for c in self.conditions)
+
+
+class When:
+    """
+    Transition which performs an action and moves to a new computer state when a condition holds. Can be added to a
+    CompState like any other transition.
+    """
+    __slots__ = ('condition', 'action', 'target')
+
+    condition: Condition
+    action: Optional[Action]
+    target: CompState
+
+    def __init__(self, condition: Condition, action: Optional[Action], target: CompState):
+        """
+        :param condition: condition under which the transition is performed.
+        :param action: action for the vehicle to perform, if any.
+        :param target: computer state to move to.
+        """
+        self.condition = condition
+        self.action = action
+        self.target = target
+
+    def __call__(self, prev: VehicleState, now: VehicleState, comp: CompState) \
+            -> Optional[Tuple[Optional[Action], CompState]]:
+        if self.condition.holds(prev, now, comp):
+            return self.action, self.target
+        return None
+
+
+def _compile_condition(c: Condition, comp: CompState) -> Optional[Tuple[int, int, float]]:
+    """
+    :return: (field, comparison, threshold) of the condition in a transition table, or None if it cannot be compiled.
+    """
+    if type(c) is Compare:
+        return FIELDS.index(c.field), _OP_CODES[c.op], c.threshold
+
+    if type(c) is TimerExpired and type(comp) is Timer:
+        if comp.expires_at_s is not None:
+            return FIELDS.index('time_s'), _GE, comp.expires_at_s
+        return _TIMER, _LE, 0.0
+
+    return None
+
+
+def _compile_state(comp: CompState) -> Optional[List[Tuple[List[Tuple[int, int, float]], int, CompState]]]:
+    """
+    :return: (conditions, action code, target) of each transition of the state, or None if any transition is not
+        declarative, in which case the state can only be evaluated by calling its transitions.
+    """
+    if type(comp) not in (Id, Timer):
+        return None
+
+    rows = []
+    for t in comp.ts:
+        if type(t) is not When:
+            return None
+
+        conditions = [_compile_condition(c, comp) for c in t.condition.conjuncts()]
+        if any(c is None for c in conditions):
+            return None
+
+        rows.append((conditions, _ACTIONS.index(t.action), t.target))
+
+    return rows
+
+
+class TransitionTable:
+    """
+    Flight computer states compiled to arrays of conditions, so the transitions of many vehicles, each in any state,
+    can be evaluated at once with array comparisons. Each state has rows, one per transition, checked in order. Each
+    row has conditions, which must all hold for the row to be taken.
+
+    States with transitions which are not declarative are included but marked opaque, so must be evaluated by calling
+    their transitions.
+    """
+    states: List[CompState]
+    opaque: List[bool]
+
+    def __init__(self):
+        self.states = []
+        self.opaque = []
+        self._index: Dict[int, int] = {}
+        self._rows: List[List[Tuple[List[Tuple[int, int, float]], int, int]]] = []
+        self._arrays = None
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    @staticmethod
+    def compilable(comp: CompState) -> bool:
+        return _compile_state(comp) is not None
+
+    def index(self, comp: CompState) -> int:
+        """
+        Adds the state, and every state reachable from it through declarative transitions, to the table.
+        :return: index of the state in the table.
+        """
+        i = self._index.get(id(comp))
+        if i is not None:
+            return i
+
+        i = len(self.states)
+        self._index[id(comp)] = i
+        self.states.append(comp)
+        self._rows.append([])
+        self._arrays = None
+
+        rows = _compile_state(comp)
+        self.opaque.append(rows is None)
+        if rows is not None:
+            # Added after the state itself, as states may transition to themselves.
+            self._rows[i] = [(conditions, action, self.index(target)) for conditions, action, target in rows]
+
+        return i
+
+    def _build(self):
+        s = len(self.states)
+        r = max([len(rows) for rows in self._rows] + [1])
+        c = max([len(conditions) for rows in self._rows for conditions, _, _ in rows] + [1])
+
+        self.field = np.zeros((s, r, c), dtype=np.int64)
+        self.op = np.full((s, r, c), _TRUE, dtype=np.int8)
+        self.threshold = np.zeros((s, r, c))
+        self.valid = np.zeros((s, r), dtype=bool)
+        self.action = np.zeros((s, r), dtype=np.int64)
+        self.target = np.zeros((s, r), dtype=np.int64)
+
+        for i, rows in enumerate(self._rows):
+            for j, (conditions, action, target) in enumerate(rows):
+                self.valid[i, j] = True
+                self.action[i, j] = action
+                self.target[i, j] = target
+                for k, (field, op, threshold) in enumerate(conditions):
+                    self.field[i, j, k] = field
+                    self.op[i, j, k] = op
+                    self.threshold[i, j, k] = threshold
+
+        self.counting_down = np.array([type(comp) is Timer and comp.expires_at_s is None for comp in self.states])
+        # States which need evaluating each step: those with transitions or a timer to count down.
+        self.active = self.valid.any(axis=1) | self.counting_down | np.array(self.opaque, dtype=bool)
+        self._arrays = True
+
+    def arrays(self) -> 'TransitionTable':
+        """
+        :return: the table, with its arrays built for the current states.
+        """
+        if self._arrays is None:
+            self._build()
+        return self
+
+    def evaluate(self, states: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        :param states: index of the (non-opaque) state of each vehicle.
+        :param values: array of shape (len(FIELDS) + 1, n), the fields of each vehicle's current state followed by
+               the time which would remain on its timer after the step.
+        :return: row taken by each vehicle, or -1 if none.
+        """
+        t = self.arrays()
+        v = values[t.field[states], np.arange(len(states))[:, None, None]]
+        threshold = t.threshold[states]
+        op = t.op[states]
+
+        holds = np.select([op == _LT, op == _LE, op == _GT, op == _GE],
+                          [v < threshold, v <= threshold, v > threshold, v >= threshold], default=True)
+        taken = holds.all(axis=2) & t.valid[states]
+        return np.where(taken.any(axis=1), np.argmax(taken, axis=1), -1)
+
+    def row_action(self, state: int, row: int) -> Optional[Action]:
+        return _ACTIONS[self.arrays().action[state, row]]
+
+    def row_target(self, state: int, row: int) -> int:
+        return int(self.arrays().target[state, row])
+
+
+def compile_computer(comp: CompState) -> TransitionTable:
+    """
+    :param comp: initial state of a flight computer.
+    :return: table of every state reachable from the initial state through declarative transitions.
+    """
+    table = TransitionTable()
+    table.index(comp)
+    return table
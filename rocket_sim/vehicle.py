@@ -1,6 +1,7 @@
 from .flight_comp import CompState, Action
 from .stage import Stage
 from .state import VehicleState
+from .atmosphere import Atmosphere
 from typing import Optional, List, Tuple
 
 
@@ -8,6 +9,9 @@ class Vehicle:
     """
     Stores data about vehicle and interprets actions from flight computer.
     """
+    __slots__ = ('computer_state', 'stage', 'remaining_engine_stages', 'parachute_stage', 'state', 'atmosphere',
+                 '_next_engine', '_scratch')
+
     computer_state: CompState
 
     stage: Optional[Stage]
@@ -15,13 +19,15 @@ class Vehicle:
     parachute_stage: Optional[Stage]
 
     state: VehicleState
+    atmosphere: Optional[Atmosphere]
 
     def __init__(self,
                  computer_state: CompState,
                  stage: Optional[Stage],
                  remaining_engine_stages: List[Stage],
                  parachute_stage: Optional[Stage],
-                 state: VehicleState):
+                 state: VehicleState,
+                 atmosphere: Optional[Atmosphere] = None):
         """
         :param computer_state: initial state of the computer.
         :param stage: current stage, e.g. engine being fired.
@@ -29,45 +35,155 @@ class Vehicle:
                should be fired.
         :param parachute_stage: stage to transition to to release parachute.
         :param state: current state of the vehicle.
+        :param atmosphere: atmosphere to fly through, or None for constant sea level air density and gravity.
         """
         self.computer_state = computer_state
         self.stage = stage
         self.remaining_engine_stages = remaining_engine_stages
         self.parachute_stage = parachute_stage
         self.state = state
+        self.atmosphere = atmosphere
+
+        # Used when stepping in place: index of the next engine stage to fire, and storage for the next state.
+        self._next_engine = 0
+        self._scratch: Optional[VehicleState] = None
 
     def step(self, dt: float) -> 'Vehicle':
         """
         :param dt: delta time, i.e. resolution.
         :return: next state of the vehicle.
         """
-        new_total_time = self.state.time_s + dt
-        next_state = self.state.step(dt, new_total_time, self.stage)
+        vehicle = self.step_computer(self.step_physics(dt))
+        vehicle.stage = vehicle.stage.step(dt)
+        return vehicle
+
+    def step_physics(self, dt: float) -> VehicleState:
+        """
+        First phase of `step`.
+        :return: next state of the vehicle, under the current stage.
+        """
+        return self.state.step(dt, self.state.time_s + dt, self.stage, self.atmosphere)
+
+    def step_computer(self, next_state: VehicleState) -> 'Vehicle':
+        """
+        Second phase of `step`: makes the transition of the flight computer, and performs its action.
+        :param next_state: from `step_physics`, whose event is set to that of the action.
+        :return: next vehicle, whose stage is yet to be stepped.
+        """
         action, next_comp_state = self.computer_state.transition(self.state, next_state)
         next_stage, next_engine_stages = self._interpret(action)
         next_state.set_event_name(Vehicle._interpret_event_name(action))
 
-        return Vehicle(next_comp_state, next_stage.step(dt), next_engine_stages, self.parachute_stage, next_state)
+        return Vehicle(next_comp_state, next_stage, next_engine_stages, self.parachute_stage, next_state,
+                       self.atmosphere)
 
     def _interpret(self, action: Optional[Action]) -> Tuple[Stage, List[Stage]]:
         """
         :param action: from flight computer to perform.
         :return: next stage to perform, as well as any remaining engine stages.
         """
+        remaining = self.remaining_engine_stages
+        if self._next_engine:
+            # Only after stepping in place, which leaves fired stages in the list.
+            remaining = remaining[self._next_engine:]
+
         if action is None:
-            return self.stage, self.remaining_engine_stages
+            return self.stage, remaining
 
         elif action == Action.NEXT_STAGE:
-            return self.remaining_engine_stages[0], self.remaining_engine_stages[1:]
+            if not remaining:
+                raise RuntimeError('No engine stage left to fire')
+            return remaining[0], remaining[1:]
 
         elif action == Action.PARACHUTE:
             if self.parachute_stage is None:
                 raise RuntimeError('No parachute to eject')
 
-            return self.parachute_stage, self.remaining_engine_stages
+            return self.parachute_stage, remaining
 
         raise RuntimeError('Unknown action')
 
+    def copy(self) -> 'Vehicle':
+        """
+        :return: copy of the vehicle which can be stepped in place without modifying this vehicle.
+        """
+        remaining = [s.copy() for s in self.remaining_engine_stages[self._next_engine:]]
+        parachute = None if self.parachute_stage is None else self.parachute_stage.copy()
+        stage = None if self.stage is None else self.stage.copy()
+
+        return Vehicle(self.computer_state.entered(), stage, remaining, parachute, self.state.copy(), self.atmosphere)
+
+    def step_in_place(self, dt: float):
+        """
+        Same as `step`, but updates this vehicle, its current stage, and its computer state rather than creating new
+        ones. Stages and states may be shared with other vehicles, so only use on a vehicle returned by `copy`.
+        :param dt: delta time, i.e. resolution.
+        """
+        self.step_physics_in_place(dt)
+        self.step_computer_in_place()
+        self.stage.step_in_place(dt)
+
+    def step_physics_in_place(self, dt: float):
+        """
+        First phase of `step_in_place`: writes the next state of the vehicle, under the current stage, into storage
+        for it. The state of the vehicle is unchanged until `step_computer_in_place`.
+        """
+        if self._scratch is None:
+            self._scratch = VehicleState.zero()
+        self.state.step_into(dt, self.state.time_s + dt, self.stage, self._scratch, self.atmosphere)
+
+    def step_computer_in_place(self):
+        """
+        Second phase of `step_in_place`: makes the transition of the flight computer, performs its action, and moves
+        the vehicle to the next state. The last phase is stepping the stage in place.
+        """
+        prev = self.state
+        now = self._scratch
+        action, next_comp_state = self.computer_state.transition_in_place(prev, now)
+        if next_comp_state is not self.computer_state:
+            next_comp_state = next_comp_state.entered()
+        self.computer_state = next_comp_state
+
+        if action is not None:
+            self._switch_stage(action)
+            now.event = Vehicle._interpret_event_name(action)
+
+        self.state = now
+        self._scratch = prev
+
+    def _switch_stage(self, action: Action):
+        if action == Action.NEXT_STAGE:
+            if self._next_engine >= len(self.remaining_engine_stages):
+                raise RuntimeError('No engine stage left to fire')
+            self.stage = self.remaining_engine_stages[self._next_engine]
+            self._next_engine += 1
+
+        elif action == Action.PARACHUTE:
+            if self.parachute_stage is None:
+                raise RuntimeError('No parachute to eject')
+            self.stage = self.parachute_stage
+
+        else:
+            raise RuntimeError('Unknown action')
+
+    def perform(self, action: Action, dt: float):
+        """
+        Performs an action commanded from outside the flight computer, e.g. by a controller in another process, as if
+        the computer had taken it at the end of the last step. Only use on a vehicle returned by `copy`.
+        :param dt: delta time the vehicle is stepped in place with.
+        """
+        self._switch_stage(action)
+        self.state.event = Vehicle._interpret_event_name(action)
+        self.stage.step_in_place(dt)
+
+    def coasting(self) -> bool:
+        """
+        :return: whether the vehicle will produce no more thrust, i.e. its current stage has burnt out and there are
+            no engine stages left to fire.
+        """
+        return (self.stage.propellant_mass_kg <= 0.0 and self.stage.thrust_N == 0.0 and
+                self._next_engine >= len(self.remaining_engine_stages))
+
     @staticmethod
     def _interpret_event_name(action: Optional[Action]) -> Optional[str]:
         if action is None:
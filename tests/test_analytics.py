@@ -0,0 +1,65 @@
+import pytest
+import numpy as np
+from rocket_sim.analytics import Analysis, metric, METRICS
+from rocket_sim.simulations import simulate
+from rocket_sim.trajectory import Trajectory
+from vehicle_examples import single_stage_parachute, three_stage
+
+
+def test_metrics_are_cached_until_trajectory_changes():
+    sim = simulate(three_stage()[0], dt=0.05)
+    calls = []
+
+    @metric('test_final_altitude')
+    def final_altitude(a: Analysis) -> float:
+        calls.append(1)
+        return float(a.column('dist_m')[-1])
+
+    try:
+        first = sim.metric('test_final_altitude')
+        assert sim.metric('test_final_altitude') == first
+        assert len(calls) == 1
+
+        sim.trajectory.append_values(None, *([0.0] * 8), 123.0)
+        assert sim.metric('test_final_altitude') == 123.0
+        assert len(calls) == 2
+    finally:
+        del METRICS['test_final_altitude']
+
+    with pytest.raises(KeyError):
+        Analysis(sim.trajectory).get('test_final_altitude')
+
+
+def test_builtin_metrics():
+    sim = simulate(three_stage()[0], dt=0.01)
+    ts = sim.time_series
+
+    assert sim.apogee[0] == np.max(sim.trajectory.column('dist_m'))
+    assert sim.events[-1] == (sim.apogee[1], 'Apogee')
+
+    thrust = sim.trajectory.column('thrust_N')
+    burnout = sim.burnout_time
+    assert thrust[ts < burnout].max() > 0.0
+    assert np.all(thrust[ts >= burnout] == 0.0)
+
+    drag, t = sim.maximum_drag
+    assert drag == np.max(np.abs(sim.trajectory.column('air_resistance_N')))
+    q, tq = sim.maximum_dynamic_pressure
+    assert tq == sim.maximum_velocity[1]
+    assert q == pytest.approx(0.5 * 1.2 * sim.maximum_velocity[0]**2)
+
+    assert sim.parachute_descent_rate is None
+
+
+def test_parachute_descent_rate():
+    sim = simulate(single_stage_parachute()[0], dt=0.01)
+    rate = sim.parachute_descent_rate
+
+    assert 0.0 < rate < -simulate(three_stage()[0], dt=0.01).impact_velocity
+    assert rate == pytest.approx(-sim.impact_velocity, rel=0.2)
+
+
+def test_empty_trajectory_has_no_burnout():
+    trajectory = Trajectory()
+    trajectory.append_values(None, *([0.0] * 9))
+    assert Analysis(trajectory).get('burnout_time') is None
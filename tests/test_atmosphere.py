@@ -0,0 +1,77 @@
+import pytest
+import numpy as np
+from rocket_sim.atmosphere import ConstantAtmosphere, StandardAtmosphere, power_law_wind, isa_1976
+from rocket_sim.batch import simulate_batch
+from rocket_sim.curves import Curve
+from rocket_sim.simulations import simulate
+from vehicle_examples import single_stage_parachute, three_stage
+
+
+def test_isa_1976():
+    temperature, pressure, density = isa_1976(np.array([0.0, 11019.0, 20063.0]))
+
+    assert temperature[0] == pytest.approx(288.15)
+    assert pressure[0] == pytest.approx(101325.0)
+    assert density[0] == pytest.approx(1.225, abs=1e-4)
+    assert temperature[1] == pytest.approx(216.65, abs=0.01)
+    assert pressure[1] == pytest.approx(22632.0, rel=1e-3)
+    assert pressure[2] == pytest.approx(5474.9, rel=1e-3)
+
+
+def test_standard_atmosphere_table():
+    atmosphere = StandardAtmosphere(max_altitude_m=20000.0)
+    altitudes = np.array([-10.0, 0.0, 1234.5, 9999.0, 25000.0])
+    density, gravity, speed_of_sound, wind = atmosphere.evaluate(altitudes)
+
+    for i, h in enumerate(altitudes):
+        assert atmosphere.at(h) == (density[i], gravity[i], speed_of_sound[i], wind[i])
+
+    assert speed_of_sound[1] == pytest.approx(340.29, abs=0.01)
+    assert gravity[1] == pytest.approx(9.80665)
+    assert density[2] == pytest.approx(isa_1976(np.array([1234.5]))[2][0], rel=1e-6)
+    assert atmosphere.minimum_gravity_ms2 == gravity[-1]
+
+
+def test_default_constant_atmosphere_matches_no_atmosphere(assert_same_flight):
+    expected = simulate(three_stage()[0], dt=0.01)
+
+    vehicle = three_stage()[0]
+    vehicle.atmosphere = ConstantAtmosphere()
+    assert_same_flight(simulate(vehicle, dt=0.01), expected)
+
+
+def test_thinner_air_and_wind():
+    still = simulate(three_stage()[0], dt=0.01)
+
+    vehicle = three_stage()[0]
+    vehicle.atmosphere = StandardAtmosphere()
+    assert simulate(vehicle, dt=0.01).apogee[0] > still.apogee[0]
+
+    vehicle = three_stage()[0]
+    vehicle.atmosphere = ConstantAtmosphere(wind=power_law_wind(10.0))
+    assert simulate(vehicle, dt=0.01).apogee[0] < still.apogee[0]
+
+
+def test_batch_matches_simulate(assert_same_flight):
+    def make(i: int):
+        vehicle = single_stage_parachute()[0] if i % 2 else three_stage()[0]
+        if i == 1:
+            vehicle.atmosphere = StandardAtmosphere(max_altitude_m=5000.0)
+        elif i == 2:
+            vehicle.atmosphere = ConstantAtmosphere(wind=power_law_wind(5.0))
+        elif i == 3:
+            vehicle.stage.drag_coefficient = Curve([0.0, 0.5, 1.0], [0.6, 0.65, 0.9])
+            vehicle.atmosphere = StandardAtmosphere(max_altitude_m=5000.0)
+        return vehicle
+
+    batch = simulate_batch([make(i) for i in range(4)], dt=0.05)
+    for i, sim in enumerate(batch):
+        assert_same_flight(sim, simulate(make(i), dt=0.05))
+
+
+def test_mach_drag_coefficient():
+    vehicle = three_stage()[0]
+    vehicle.stage.drag_coefficient = Curve([0.0, 1.0], [0.75, 0.75])
+    expected = simulate(three_stage()[0], dt=0.01)
+
+    assert simulate(vehicle, dt=0.01, in_place=True).apogee == pytest.approx(expected.apogee)
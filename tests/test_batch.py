@@ -0,0 +1,16 @@
+import pytest
+from rocket_sim.batch import simulate_batch
+from rocket_sim.simulations import simulate
+from vehicle_examples import single_stage_const_thrust, single_stage_var_thrust, single_stage_parachute, three_stage
+
+
+def test_matches_simulate(assert_same_flight):
+    examples = [single_stage_const_thrust, single_stage_var_thrust, single_stage_parachute, three_stage]
+    batch = simulate_batch([f()[0] for f in examples], dt=0.1, chunk_size=32)
+
+    for f, sim in zip(examples, batch):
+        assert_same_flight(sim, simulate(f()[0], dt=0.1))
+
+
+def test_empty_batch():
+    assert simulate_batch([], dt=0.1) == []
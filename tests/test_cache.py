@@ -0,0 +1,63 @@
+from rocket_sim.cache import SimulationCache, fingerprint, Unfingerprintable
+from vehicle_examples import three_stage, single_stage_parachute
+import pytest
+
+
+def test_same_vehicle_same_fingerprint():
+    assert fingerprint(three_stage()[0]) == fingerprint(three_stage()[0])
+    assert fingerprint(single_stage_parachute()[0]) != fingerprint(three_stage()[0])
+    assert fingerprint(single_stage_parachute()[0]) != fingerprint(single_stage_parachute(deploy_velocity_ms=-5.0)[0])
+
+
+def test_opaque_callable_not_fingerprinted():
+    class Thrust:
+        def __call__(self, dt, t, prev):
+            return 5.0
+
+    vehicle, _ = three_stage()
+    vehicle.stage.f_thrust_N = Thrust()
+    with pytest.raises(Unfingerprintable):
+        fingerprint(vehicle)
+
+    cache = SimulationCache()
+    cache.simulate(vehicle, 0.05)
+    cache.simulate(vehicle, 0.05)
+    assert (cache.hits, cache.misses, cache.uncacheable) == (0, 0, 2)
+
+
+def test_unassigned_closure_not_fingerprinted():
+    def thrust(dt, t, prev):
+        return 5.0 if t < 1e9 else late
+
+    vehicle, _ = three_stage()
+    vehicle.stage.f_thrust_N = thrust
+    with pytest.raises(Unfingerprintable):
+        fingerprint(vehicle)
+
+    cache = SimulationCache()
+    cache.simulate(vehicle, 0.05)
+    assert cache.uncacheable == 1
+    if False:
+        # Makes `late` a captured variable of `thrust`, which is never assigned.
+        late = 0.0
+
+
+def test_hits_and_misses(tmp_path, assert_same_flight):
+    cache = SimulationCache(directory=str(tmp_path))
+    sim = cache.simulate(three_stage()[0], 0.05)
+    cache.simulate(three_stage()[0], 0.05)
+    cache.simulate(three_stage()[0], 0.1)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # Read back from disk by a new cache.
+    cache = SimulationCache(directory=str(tmp_path))
+    loaded = cache.simulate(three_stage()[0], 0.05)
+    assert cache.hits == 1
+    assert_same_flight(loaded, sim)
+
+
+def test_disk_eviction(tmp_path):
+    cache = SimulationCache(max_entries=1, directory=str(tmp_path), max_disk_bytes=1)
+    cache.simulate(three_stage()[0], 0.05)
+    cache.simulate(three_stage()[0], 0.1)
+    assert len(list(tmp_path.iterdir())) == 0
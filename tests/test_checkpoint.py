@@ -0,0 +1,57 @@
+import tracemalloc
+import pytest
+from rocket_sim.checkpoint import checkpoint
+from rocket_sim.simulations import simulate
+from rocket_sim.stop import AtApogee, AtEvent, AtTime
+from rocket_sim.transitions import Field
+from vehicle_examples import single_stage_parachute, three_stage, single_stage_const_thrust
+
+
+@pytest.mark.parametrize('kernel', [False, True])
+def test_variants_match_full_simulations(kernel, assert_same_flight):
+    start = checkpoint(single_stage_parachute()[0], dt=0.01, at=AtApogee())
+    areas = [0.01, 0.02, 0.05]
+
+    def deploy_at(v):
+        v.computer_state.ts[0].condition = Field('velocity_ms') < -3.0
+
+    sims = start.simulate_variants([lambda v, a=a: setattr(v.parachute_stage, 'area_m2', a) for a in areas] +
+                                   [deploy_at], kernel=kernel)
+
+    for a, sim in zip(areas, sims):
+        assert sim.trajectory.prefix is start.trajectory
+        assert_same_flight(sim, simulate(single_stage_parachute(parachute_area_m2=a)[0], dt=0.01))
+    assert_same_flight(sims[-1], simulate(single_stage_parachute(deploy_velocity_ms=-3.0)[0], dt=0.01))
+
+    # Variants do not change the checkpoint.
+    assert start.vehicle.parachute_stage.area_m2 == 0.02
+    assert_same_flight(start.simulate(), simulate(single_stage_parachute()[0], dt=0.01))
+
+
+def test_variants_do_not_copy_prefix():
+    start = checkpoint(single_stage_parachute()[0], dt=0.001, at=AtApogee())
+    sim = start.simulate()
+    prefix_bytes = len(start.trajectory) * 8
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        metrics = sim.apogee, sim.maximum_velocity, sim.maximum_g_force, sim.total_time, sim.events, \
+            sim.maximum_drag, sim.maximum_dynamic_pressure
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert retained - before < prefix_bytes
+    assert sim.apogee == simulate(single_stage_parachute()[0], dt=0.001).apogee
+
+
+def test_checkpoint_at_event(assert_same_flight):
+    start = checkpoint(three_stage()[0], dt=0.01, at=AtEvent('Stage'))
+    assert start.trajectory.events[-1] == (len(start.trajectory) - 1, 'Stage')
+    assert_same_flight(start.simulate(), simulate(three_stage()[0], dt=0.01))
+
+
+def test_landed_before_checkpoint():
+    with pytest.raises(ValueError):
+        checkpoint(single_stage_const_thrust()[0], dt=0.01, at=AtTime(1000.0))
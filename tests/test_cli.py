@@ -0,0 +1,60 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+from rocket_sim.cli import main, COLUMNS
+from rocket_sim.simulations import simulate
+from rocket_sim.spec import save_vehicle
+from vehicle_examples import single_stage_parachute, three_stage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_json_summaries(capsys):
+    assert main(['three_stage', 'vehicle_examples:single_stage_parachute', '--dt', '0.1', '0.05',
+                 '--format', 'json']) == 0
+    rows = json.loads(capsys.readouterr().out)
+    assert [(r['vehicle'], r['dt']) for r in rows] == [('three_stage', 0.1),
+                                                       ('vehicle_examples:single_stage_parachute', 0.1),
+                                                       ('three_stage', 0.05),
+                                                       ('vehicle_examples:single_stage_parachute', 0.05)]
+    sim = simulate(three_stage()[0], 0.1)
+    assert rows[0]['apogee_m'] == sim.apogee[0]
+    assert rows[0]['impact_velocity_ms'] == sim.impact_velocity
+    assert [tuple(e) for e in rows[0]['events']] == sim.events
+
+
+def test_csv_from_spec_file(tmp_path):
+    path = str(tmp_path / 'parachute.json')
+    save_vehicle(single_stage_parachute()[0], path)
+    output = str(tmp_path / 'summary.csv')
+    assert main([path, '--dt', '0.1', '--format', 'csv', '-o', output]) == 0
+
+    with open(output) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == COLUMNS
+    assert float(rows[1][COLUMNS.index('apogee_m')]) == simulate(single_stage_parachute()[0], 0.1).apogee[0]
+    assert 'Parachute' in rows[1][-1]
+
+
+def test_saves_plots(tmp_path, capsys):
+    assert main(['three_stage', '--dt', '0.1', '--plot-dir', str(tmp_path)]) == 0
+    assert os.listdir(tmp_path) == ['three_stage_dt0.1.png']
+    assert 'apogee_m' in capsys.readouterr().out
+
+
+def test_unknown_vehicle(capsys):
+    assert main(['not_a_vehicle']) == 1
+    assert main(['missing.toml']) == 1
+    assert 'missing.toml' in capsys.readouterr().err
+
+
+def test_summaries_do_not_import_plotting():
+    code = ('import sys, io, contextlib\n'
+            'from rocket_sim.cli import main\n'
+            'with contextlib.redirect_stdout(io.StringIO()):\n'
+            '    main(["single_stage_const_thrust", "--dt", "0.1"])\n'
+            'print(sorted(m for m in ("matplotlib", "multiprocessing") if m in sys.modules))\n')
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
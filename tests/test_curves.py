@@ -0,0 +1,63 @@
+import pytest
+import numpy as np
+from rocket_sim.curves import Curve, ThrustCurve
+from rocket_sim.stage import Stage
+
+ENG = """
+; Estes C6
+C6 18 70 0-3-5-7 0.0108 0.0231 Estes
+0.031 0.946
+0.092 4.826
+0.139 9.936
+0.192 14.090
+0.209 11.446
+0.300 7.381
+1.800 5.000
+1.850 0.000
+"""
+
+
+def test_irregular_lookup():
+    curve = Curve([0.0, 0.1, 0.5], [0.0, 10.0, 2.0])
+
+    assert curve.step_s is None
+    assert curve.value(0.05) == pytest.approx(5.0)
+    assert curve.value(0.3) == pytest.approx(6.0)
+    assert curve.value(-1.0) == 0.0
+    assert curve.value(1.0) == 2.0
+
+
+def test_evaluate_matches_value():
+    curve = Curve.uniform(0.5, [1.0, 3.0, 2.0, 0.0])
+    ts = np.linspace(-0.5, 2.5, 61)
+
+    assert curve.step_s == 0.5
+    assert np.array_equal(curve.evaluate(ts), [curve.value(t) for t in ts])
+
+
+def test_rejects_unordered_times():
+    with pytest.raises(ValueError):
+        Curve([0.0, 1.0, 1.0], [0.0, 1.0, 2.0])
+
+
+def test_propellant_mass_curve():
+    thrust = ThrustCurve.from_eng(ENG)
+    mass = thrust.propellant_mass_curve(0.0108)
+
+    assert thrust.name == 'C6'
+    assert thrust.value(0.0) == 0.0
+    assert mass.value(0.0) == pytest.approx(0.0108)
+    assert mass.value(thrust.burn_time_s) == pytest.approx(0.0)
+    assert np.all(np.diff(mass.values) <= 0)
+
+
+def test_stage_function():
+    thrust = ThrustCurve.from_eng(ENG)
+    stage = Stage(stage_time_s=0.0, area_m2=0.000979, drag_coefficient=0.75, empty_mass_kg=0.106,
+                  engine_case_mass_kg=0.0123, propellant_mass_kg=0.0108, thrust_N=0.0,
+                  f_propellant_mass_kg=thrust.propellant_mass_curve(0.0108), f_thrust_N=thrust)
+
+    for _ in range(20):
+        stage = stage.step(0.01)
+
+    assert stage.thrust_N == pytest.approx(thrust.value(0.19))
@@ -0,0 +1,47 @@
+import numpy as np
+from rocket_sim.downsample import m4, band
+from rocket_sim.simulations import simulate
+from vehicle_examples import three_stage
+
+
+def test_m4_keeps_extremes_of_each_column():
+    rng = np.random.RandomState(0)
+    time = np.cumsum(rng.uniform(0.5, 1.5, 100000))
+    values = rng.normal(size=len(time))
+    t, v = m4(time, values, 200)
+
+    assert len(t) <= 4 * 200
+    assert np.all(np.diff(t) > 0)
+    assert (t[0], t[-1]) == (time[0], time[-1])
+
+    columns = np.minimum(((time - time[0]) * (200 / (time[-1] - time[0]))).astype(int), 199)
+    kept = np.minimum(((t - time[0]) * (200 / (time[-1] - time[0]))).astype(int), 199)
+    for c in (0, 57, 199):
+        assert v[kept == c].max() == values[columns == c].max()
+        assert v[kept == c].min() == values[columns == c].min()
+
+
+def test_m4_short_series_unchanged():
+    time = np.arange(10.0)
+    t, v = m4(time, time**2, 100)
+    assert np.array_equal(t, time)
+    assert np.array_equal(v, time**2)
+
+
+def test_band():
+    trajectories = [simulate(three_stage(staging_altitude_m=h)[0], dt=0.1).trajectory for h in (5.0, 10.0, 20.0)]
+    time, percentiles = band(trajectories, 'dist_m', points=50, percentiles=(0, 50, 100))
+
+    assert percentiles.shape == (3, 50)
+    assert np.all(percentiles[0] <= percentiles[1])
+    assert np.all(percentiles[1] <= percentiles[2])
+    assert np.nanmax(percentiles[2]) <= max(t.column('dist_m').max() for t in trajectories)
+
+
+def test_save_plots(tmp_path):
+    sim = simulate(three_stage()[0], dt=0.01)
+    path = str(tmp_path / 'plots.png')
+    sim.save_plots(path, 'Three Stage')
+
+    with open(path, 'rb') as f:
+        assert f.read(8) == b'\x89PNG\r\n\x1a\n'
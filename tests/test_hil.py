@@ -0,0 +1,91 @@
+import asyncio
+import os
+import socket
+import pytest
+from rocket_sim.hil import simulate_hil, run_hil, connect_controller, read_frame, encode_sample, SAMPLE
+from rocket_sim.simulations import simulate
+from rocket_sim.state import VehicleState
+from vehicle_examples import single_stage_parachute, three_stage
+
+
+@pytest.mark.parametrize('example', [single_stage_parachute, three_stage])
+def test_lockstep_replay_matches_simulate(example, assert_same_flight):
+    vehicle = example()[0]
+    sim, timing = asyncio.run(simulate_hil(vehicle, 0.05, rate=None, lockstep=True))
+    assert_same_flight(sim, simulate(vehicle, 0.05))
+    assert timing.deadline_misses == 0
+    assert len(timing.round_trip_s) == len(sim.trajectory) + 1
+
+
+def test_latency_delays_actions():
+    vehicle = single_stage_parachute()[0]
+    sim, _ = asyncio.run(simulate_hil(vehicle, 0.05, rate=None, lockstep=True, latency_s=0.5))
+    expected = dict((name, t) for t, name in simulate(vehicle, 0.05).events)
+    actual = dict((name, t) for t, name in sim.events)
+    assert actual['Parachute'] == pytest.approx(expected['Parachute'] + 0.5)
+
+
+def test_paced():
+    vehicle = single_stage_parachute()[0]
+    sim, timing = asyncio.run(simulate_hil(vehicle, 0.1, rate=100.0, noise={'velocity_ms': 0.1}))
+    assert timing.period_s == pytest.approx(0.001)
+    assert len(timing.lateness_s) == len(sim.trajectory) + 1
+    assert (timing.lateness_s >= 0).all()
+    assert 0 <= timing.deadline_misses <= len(timing.lateness_s)
+    assert timing.jitter_s >= 0
+    assert 'Parachute' in [name for _, name in sim.events]
+
+
+def test_external_controller(tmp_path, assert_same_flight):
+    vehicle = three_stage()[0]
+    path = str(tmp_path / 'hil.sock')
+
+    async def run():
+        sim = asyncio.ensure_future(simulate_hil(vehicle, 0.05, path=path, rate=None, lockstep=True))
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        await connect_controller(path, three_stage()[0].computer_state)
+        return await sim
+
+    sim, _ = asyncio.run(run())
+    assert_same_flight(sim, simulate(vehicle, 0.05))
+
+
+def test_framing():
+    state = VehicleState(None, 1.5, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0)
+
+    async def decode():
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_sample(7, state))
+        reader.feed_eof()
+        return await read_frame(reader), await read_frame(reader)
+
+    frame, end = asyncio.run(decode())
+    assert frame == (SAMPLE, 7, 1.5, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0)
+    assert end is None
+
+
+def test_rejects_bad_options():
+    vehicle = single_stage_parachute()[0]
+    with pytest.raises(ValueError):
+        asyncio.run(simulate_hil(vehicle, 0.05, rate=None))
+    with pytest.raises(ValueError):
+        asyncio.run(simulate_hil(vehicle, 0.05, lockstep=True, noise={'altitude': 1.0}))
+
+
+@pytest.mark.parametrize('frame', [b'\x09', b'\x02\x00\x00\x00\x00\x07'])
+def test_bad_frame_from_controller(frame):
+    # An unknown frame kind, and an unknown action.
+    async def run():
+        ours, theirs = socket.socketpair()
+        reader, writer = await asyncio.open_connection(sock=ours)
+        controller_reader, controller_writer = await asyncio.open_connection(sock=theirs)
+        controller_writer.write(frame)
+        try:
+            await asyncio.wait_for(run_hil(single_stage_parachute()[0], 0.05, reader, writer, rate=None,
+                                           lockstep=True), 5.0)
+        finally:
+            controller_writer.close()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
@@ -0,0 +1,31 @@
+import pytest
+from rocket_sim.simulations import simulate
+from rocket_sim.integrators import DormandPrince
+from vehicle_examples import single_stage_const_thrust, three_stage
+
+
+def test_matches_fine_fixed_step():
+    vehicle, _ = three_stage()
+    fixed = simulate(vehicle, dt=0.001)
+    adaptive = simulate(vehicle, dt=0.01, integrator=DormandPrince())
+
+    assert adaptive.apogee[0] == pytest.approx(fixed.apogee[0], rel=1e-3)
+    assert adaptive.impact_velocity == pytest.approx(fixed.impact_velocity, rel=1e-3)
+    assert [name for _, name in adaptive.events] == [name for _, name in fixed.events]
+    assert len(adaptive.trajectory) < len(fixed.trajectory) / 100
+
+
+def test_locates_events():
+    vehicle, _ = single_stage_const_thrust()
+    sim = simulate(vehicle, dt=0.01, integrator=DormandPrince())
+
+    apogee_m, apogee_time_s = sim.apogee
+    assert sim.trajectory.column('velocity_ms')[sim.trajectory.column('time_s') == apogee_time_s] == pytest.approx(0, abs=1e-6)
+    assert sim.trajectory.column('dist_m')[-1] == pytest.approx(0, abs=1e-6)
+
+
+def test_rejects_stepwise_stage_functions():
+    vehicle, _ = single_stage_const_thrust()
+    vehicle.stage.f_thrust_N = lambda dt, t, prev: prev * 0.99
+    with pytest.raises(ValueError, match='f_thrust_N'):
+        simulate(vehicle, dt=0.01, integrator=DormandPrince())
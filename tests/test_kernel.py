@@ -0,0 +1,59 @@
+import pytest
+from rocket_sim.atmosphere import ConstantAtmosphere
+from rocket_sim.flight_comp import Action, Id, Timer
+from rocket_sim.kernel import compatible, simulate_kernel, COMPILED, TOLERANCE
+from rocket_sim.simulations import simulate
+from rocket_sim.transitions import When, TimerExpired
+from vehicle_examples import single_stage_const_thrust, single_stage_var_thrust, single_stage_parachute, three_stage
+
+
+# Compiled kernels may reorder floating point operations.
+_RTOL = TOLERANCE if COMPILED else None
+
+
+@pytest.mark.parametrize('example', [single_stage_const_thrust, single_stage_var_thrust, single_stage_parachute,
+                                     three_stage])
+def test_kernel_matches_vehicle(example, assert_same_flight):
+    vehicle, _ = example()
+    assert compatible(vehicle)
+
+    expected = simulate(vehicle, dt=0.01, kernel=False)
+    assert_same_flight(simulate_kernel(vehicle, dt=0.01), expected.trajectory, _RTOL)
+    # Resumed between chunks.
+    assert_same_flight(simulate_kernel(vehicle, dt=0.01, chunk_size=100), expected.trajectory, _RTOL)
+    assert vehicle.state.time_s == 0.0
+
+
+def test_kernel_counts_down_timer(assert_same_flight):
+    vehicle, _ = single_stage_parachute()
+    timer = Timer('Coast', [], 3.0)
+    timer.add_transition(When(TimerExpired(), Action.PARACHUTE, Id('Descent', [])))
+    vehicle.computer_state = timer
+
+    assert compatible(vehicle)
+    assert_same_flight(simulate_kernel(vehicle, dt=0.01), simulate(vehicle, dt=0.01, kernel=False).trajectory, _RTOL)
+
+
+def test_incompatible_vehicles():
+    vehicle, _ = three_stage()
+    vehicle.atmosphere = ConstantAtmosphere()
+    assert not compatible(vehicle)
+
+    vehicle, _ = three_stage()
+    vehicle.stage.f_thrust_N = lambda dt, t, prev: prev
+    assert not compatible(vehicle)
+
+    vehicle, _ = three_stage()
+    vehicle.computer_state.add_transition(lambda prev, now, comp: None)
+    assert not compatible(vehicle)
+    # Still simulated, by stepping the vehicle.
+    assert simulate(vehicle, dt=0.01).events == simulate(three_stage()[0], dt=0.01).events
+
+
+def test_missing_parachute():
+    vehicle, _ = single_stage_const_thrust()
+    vehicle.computer_state.add_transition(When(TimerExpired(), Action.PARACHUTE, Id('Descent', [])))
+    vehicle.computer_state = Timer('Coast', vehicle.computer_state.ts, 1.0)
+
+    with pytest.raises(RuntimeError):
+        simulate_kernel(vehicle, dt=0.01)
@@ -0,0 +1,27 @@
+import pytest
+import numpy as np
+from rocket_sim.monte_carlo import monte_carlo, Normal, Uniform
+from vehicle_examples import single_stage_parachute
+
+distributions = {
+    'thrust_N': Normal(6.38, 0.2),
+    'drag_coefficient': Uniform(0.7, 0.8),
+    'deploy_velocity_ms': Normal(-7.0, 0.5),
+}
+
+
+def test_independent_of_workers():
+    serial = monte_carlo(single_stage_parachute, distributions, runs=6, dt=0.1, seed=3, workers=1, chunk_size=4)
+    parallel = monte_carlo(single_stage_parachute, distributions, runs=6, dt=0.1, seed=3, workers=2, chunk_size=2)
+
+    assert serial.params == parallel.params
+    assert np.array_equal(serial.metric('apogee_m'), parallel.metric('apogee_m'))
+    assert np.array_equal(serial.metric('Parachute'), parallel.metric('Parachute'))
+
+
+def test_samples_vary_with_seed():
+    a = monte_carlo(single_stage_parachute, distributions, runs=3, dt=0.1, seed=1, workers=1)
+    b = monte_carlo(single_stage_parachute, distributions, runs=3, dt=0.1, seed=2, workers=1)
+
+    assert len(a) == 3
+    assert not np.array_equal(a.param('thrust_N'), b.param('thrust_N'))
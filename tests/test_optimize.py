@@ -0,0 +1,52 @@
+import numpy as np
+from rocket_sim.optimize import Objective, grid, latin_hypercube, sweep, nelder_mead, COMPLETE, PRUNED
+from rocket_sim.simulations import simulate
+from vehicle_examples import single_stage_parachute
+
+BOUNDS = {'parachute_area_m2': (0.005, 0.05), 'thrust_N': (4.0, 9.0)}
+OBJECTIVE = Objective('apogee_m', limits={'maximum_g_force': (None, 10.0), 'impact_velocity_ms': (-8.0, None)})
+
+
+def test_grid():
+    candidates = grid(BOUNDS, {'parachute_area_m2': 2, 'thrust_N': 3})
+    assert len(candidates) == 6
+    assert candidates[0] == {'parachute_area_m2': 0.005, 'thrust_N': 4.0}
+    assert candidates[-1] == {'parachute_area_m2': 0.05, 'thrust_N': 9.0}
+
+
+def test_latin_hypercube():
+    candidates = latin_hypercube(BOUNDS, 10, seed=1)
+    assert candidates == latin_hypercube(BOUNDS, 10, seed=1)
+
+    # One sample in each tenth of each range.
+    thrusts = np.array([c['thrust_N'] for c in candidates])
+    assert sorted(np.floor((thrusts - 4.0) / 0.5).astype(int)) == list(range(10))
+
+
+def test_pruning_keeps_best():
+    # Best candidates first, so the rest can be pruned.
+    candidates = grid(BOUNDS, 4)[::-1]
+    pruned = sweep(single_stage_parachute, candidates, 0.05, OBJECTIVE, workers=1)
+    full = sweep(single_stage_parachute, candidates, 0.05, OBJECTIVE, workers=1, prune=False)
+
+    statuses = list(pruned.columns()['status'])
+    assert PRUNED in statuses and PRUNED not in list(full.columns()['status'])
+    assert pruned.best.params == full.best.params
+    assert pruned.best.score == full.best.score
+
+    # Best vehicle reproduces its trial.
+    best = pruned.best
+    sim = simulate(pruned.best_vehicle()[0], 0.05)
+    assert sim.apogee[0] == best.summary.apogee_m
+    assert sim.impact_velocity == best.summary.impact_velocity_ms
+
+
+def test_nelder_mead():
+    result = nelder_mead(single_stage_parachute, BOUNDS, 0.05, OBJECTIVE,
+                         start={'parachute_area_m2': 0.03, 'thrust_N': 5.0})
+    best = result.best
+
+    assert best.status == COMPLETE
+    # Apogee increases with thrust, and the g-force limit is not reached within the bounds.
+    assert best.params['thrust_N'] > 8.9
+    assert best.summary.impact_velocity_ms >= -8.0
@@ -0,0 +1,72 @@
+import json
+import pytest
+from rocket_sim.flight_comp import Action
+from rocket_sim.integrators import DormandPrince
+from rocket_sim.kernel import compatible
+from rocket_sim.profiling import Profiler, PHASES
+from rocket_sim.simulations import simulate
+from rocket_sim.spec import vehicle_to_spec
+from vehicle_examples import three_stage, single_stage_parachute
+
+
+@pytest.mark.parametrize('in_place', [False, True])
+def test_profiled_simulation_matches(in_place, assert_same_flight):
+    vehicle, _ = three_stage()
+    transitions = list(vehicle.computer_state.ts)
+    thrust = vehicle.stage.f_thrust_N
+
+    profiler = Profiler()
+    sim = simulate(vehicle, dt=0.01, in_place=in_place, profiler=profiler)
+    expected = simulate(three_stage()[0], dt=0.01, in_place=in_place)
+
+    assert_same_flight(sim, expected)
+
+    # The vehicle is left as it was.
+    assert vehicle.computer_state.ts == transitions
+    assert vehicle.stage.f_thrust_N is thrust
+
+    profile = profiler.profile
+    assert profile.steps == len(sim.trajectory)
+    assert all(profile.phase_s[p] > 0.0 for p in PHASES)
+    assert profile.calls['stage 0 f_thrust_N Const'] > 0
+    assert profile.calls['Burn Stage 1[0] dist_m > 10.0 and accel_ms2 <= 0.5'] > 0
+    json.dumps(profile.to_json())
+
+
+def test_callback_allocations_and_cprofile():
+    reports = []
+    profiler = Profiler(callback=lambda p: reports.append(p.steps), every=100, allocations=True, cprofile=True)
+    sim = simulate(single_stage_parachute()[0], dt=0.01, in_place=True, profiler=profiler)
+
+    assert reports == list(range(100, len(sim.trajectory), 100)) + [len(sim.trajectory)]
+    assert profiler.profile.peak_bytes > 0
+    assert profiler.profile.stats.total_calls > 0
+
+
+@pytest.mark.parametrize('in_place', [False, True])
+def test_vehicle_unaffected_while_profiling(in_place):
+    vehicle, _ = three_stage()
+    spec = vehicle_to_spec(vehicle)
+    checks = []
+
+    def check(_):
+        # Other uses of the vehicle during the run see none of the profiler's wrappers.
+        checks.append(compatible(vehicle) and vehicle_to_spec(vehicle) == spec)
+
+    simulate(vehicle, dt=0.01, in_place=in_place, profiler=Profiler(callback=check, every=50))
+    assert len(checks) > 2 and all(checks)
+
+
+def test_no_profiling_with_integrator():
+    with pytest.raises(ValueError):
+        simulate(three_stage()[0], dt=0.01, integrator=DormandPrince(), profiler=Profiler())
+
+
+@pytest.mark.parametrize('in_place', [False, True])
+@pytest.mark.parametrize('profiled', [False, True])
+def test_profiled_errors_match(profiled, in_place):
+    # Fires a stage every step, until there are none left, which is an error with or without the profiler.
+    vehicle, _ = three_stage()
+    vehicle.computer_state.ts.insert(0, lambda prev, now, comp: (Action.NEXT_STAGE, comp))
+    with pytest.raises(RuntimeError, match='No engine stage left'):
+        simulate(vehicle, dt=0.01, in_place=in_place, kernel=False, profiler=Profiler() if profiled else None)
@@ -0,0 +1,66 @@
+import os
+import pytest
+from rocket_sim import scheduler
+from rocket_sim.scheduler import FactorySpec, sweep, simulate_parallel
+from rocket_sim.simulations import simulate
+from rocket_sim.stop import AtApogee
+from vehicle_examples import single_stage_parachute, three_stage
+
+
+def _shared_blocks():
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+
+def test_spec():
+    spec = FactorySpec(single_stage_parachute, {'thrust_N': 7.0})
+    assert spec == FactorySpec('vehicle_examples:single_stage_parachute', {'thrust_N': 7.0})
+    assert spec.build().stage.thrust_N == 7.0
+
+    with pytest.raises(ValueError):
+        FactorySpec(lambda: three_stage())
+
+
+def test_sweep():
+    specs = sweep(three_stage, staging_altitude_m=[5.0, 10.0], staging_accel_ms2=[0.5, 1.0, 2.0])
+    assert len(specs) == 6
+    assert specs[1].params == {'staging_altitude_m': 5.0, 'staging_accel_ms2': 1.0}
+
+
+@pytest.mark.parametrize('workers, chunk_size', [(1, 1), (2, 1), (2, 3)])
+def test_matches_simulate(workers, chunk_size, assert_same_flight):
+    specs = sweep(single_stage_parachute, thrust_N=[5.0, 6.38], deploy_velocity_ms=[-3.0, -7.0]) + \
+        [FactorySpec(three_stage)]
+    reports = []
+    before = _shared_blocks()
+    sims = simulate_parallel(specs, dt=0.01, workers=workers, chunk_size=chunk_size,
+                             progress=lambda done, total: reports.append((done, total)))
+
+    assert _shared_blocks() <= before
+    assert reports[-1] == (len(specs), len(specs))
+    assert [done for done, _ in reports] == sorted(done for done, _ in reports)
+
+    for spec, sim in zip(specs, sims):
+        assert_same_flight(sim, simulate(spec.build(), dt=0.01))
+
+
+def test_options():
+    stop = AtApogee()
+    sims = simulate_parallel([FactorySpec(three_stage)], dt=0.01, workers=2, stop=stop)
+    assert sims[0].truncated
+
+    with pytest.raises(ValueError):
+        simulate_parallel([FactorySpec(three_stage)], dt=0.01, chunk_size=2, stop=stop)
+
+
+def test_failed_copy_frees_block(monkeypatch):
+    sim = simulate(three_stage()[0], dt=0.01)
+
+    def fail(field):
+        raise KeyboardInterrupt
+
+    sim.trajectory.column = fail
+    monkeypatch.setattr(scheduler, '_simulate_job', lambda specs, dt, options: [sim])
+    before = _shared_blocks()
+    with pytest.raises(KeyboardInterrupt):
+        scheduler._run_job([FactorySpec(three_stage)], 0.01, {})
+    assert _shared_blocks() <= before
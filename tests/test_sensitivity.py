@@ -0,0 +1,73 @@
+import pytest
+from rocket_sim.atmosphere import StandardAtmosphere
+from rocket_sim.sensitivity import sensitivity, parameter_names
+from rocket_sim.simulations import simulate
+from rocket_sim.spec import vehicle_to_spec, vehicle_from_spec
+from vehicle_examples import single_stage_parachute, three_stage
+
+
+def _metric(sim, metric):
+    value = getattr(sim, metric)
+    return value[0] if isinstance(value, tuple) else value
+
+
+def _finite_difference(vehicle, param, metric, dt, rel=1e-2):
+    spec = vehicle_to_spec(vehicle)
+    slot, attribute = param.split('.', 1)
+    node = spec['parachute'] if slot == 'parachute' else spec['stages'][int(slot[len('stages['):-1])]
+    *path, key = attribute.split('.')
+    for k in path:
+        node = node[k]
+
+    x = node[key]
+    h = abs(x) * rel
+    values = []
+    for sign in (1, -1):
+        node[key] = x + sign * h
+        values.append(_metric(simulate(vehicle_from_spec(spec), dt), metric))
+    return (values[0] - values[1]) / (2 * h)
+
+
+@pytest.mark.parametrize('example, params, metrics', [
+    (single_stage_parachute, ['stages[0].thrust_N', 'stages[0].drag_coefficient', 'parachute.area_m2'],
+     ['apogee', 'maximum_velocity', 'impact_velocity']),
+    (three_stage, ['stages[0].thrust_N', 'stages[1].area_m2', 'stages[2].empty_mass_kg'],
+     ['apogee', 'maximum_velocity']),
+])
+def test_matches_finite_differences(example, params, metrics):
+    vehicle = example()[0]
+    dt = 0.001
+    s = sensitivity(vehicle, dt, params)
+
+    assert s.params == params
+    for metric in metrics:
+        gradient = s.gradient(metric)
+        assert list(gradient) == params
+        for p in params:
+            expected = _finite_difference(vehicle, p, metric, dt)
+            assert gradient[p] == pytest.approx(expected, rel=0.03, abs=1e-6), (p, metric)
+
+
+def test_simulation_matches_simulate():
+    vehicle = single_stage_parachute()[0]
+    s = sensitivity(vehicle, 0.01)
+    sim = simulate(vehicle, 0.01)
+    assert s.simulation.apogee == sim.apogee
+    assert s.simulation.total_time == sim.total_time
+
+
+def test_parameter_names():
+    names = parameter_names(single_stage_parachute()[0])
+    assert 'stages[0].thrust_N' in names
+    assert 'parachute.area_m2' in names
+    assert 'stages[0].f_propellant_mass_kg.dx_per_sec' in names
+
+
+def test_rejects_unknown_parameters_and_vehicles():
+    with pytest.raises(ValueError):
+        sensitivity(single_stage_parachute()[0], 0.01, ['stages[3].thrust_N'])
+
+    vehicle = single_stage_parachute()[0]
+    vehicle.atmosphere = StandardAtmosphere()
+    with pytest.raises(ValueError):
+        sensitivity(vehicle, 0.01)
@@ -0,0 +1,52 @@
+import pytest
+import numpy as np
+from rocket_sim.simulations import simulate, simulate_iter, simulate_chunks
+from rocket_sim.sinks import record, Summary, Decimate, OnEvent, Envelope
+from vehicle_examples import three_stage
+
+
+def test_summary_matches_simulation():
+    vehicle, _ = three_stage()
+    sim = simulate(vehicle, dt=0.05)
+    summary = Summary()
+    record(simulate_iter(vehicle, dt=0.05, in_place=True), summary)
+
+    assert summary.apogee == sim.apogee
+    assert summary.maximum_velocity == sim.maximum_velocity
+    assert summary.maximum_g_force == sim.maximum_g_force
+    assert summary.impact_velocity == sim.impact_velocity
+    assert summary.events == sim.events
+
+
+def test_decimate_keeps_events_and_last():
+    vehicle, _ = three_stage()
+    sim = simulate(vehicle, dt=0.05)
+    decimate = Decimate(10)
+    on_event = OnEvent()
+    record(simulate_iter(vehicle, dt=0.05), decimate, on_event)
+
+    kept = decimate.trajectory
+    assert len(kept) < len(sim.trajectory) / 5
+    assert [name for _, name in kept.events] == ['Stage', 'Stage']
+    assert kept.column('time_s')[-1] == sim.total_time
+    assert len(on_event.trajectory) == 2
+
+
+def test_envelope_preserves_extremes():
+    vehicle, _ = three_stage()
+    sim = simulate(vehicle, dt=0.05)
+    envelope = Envelope(64)
+    record(simulate_iter(vehicle, dt=0.05), envelope)
+
+    _, mins, maxs = envelope.bounds('accel_ms2')
+    assert maxs.max() == sim.maximum_acceleration[0]
+    assert mins.min() == sim.trajectory.column('accel_ms2').min()
+
+
+def test_chunks_cover_trajectory():
+    vehicle, _ = three_stage()
+    sim = simulate(vehicle, dt=0.05)
+    chunks = list(simulate_chunks(vehicle, dt=0.05, chunk_size=100))
+
+    assert all(len(c) == 100 for c in chunks[:-1])
+    assert np.array_equal(np.concatenate([c.column('dist_m') for c in chunks]), sim.trajectory.column('dist_m'))
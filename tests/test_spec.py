@@ -0,0 +1,80 @@
+import json
+import pytest
+from rocket_sim.atmosphere import StandardAtmosphere, power_law_wind
+from rocket_sim.flight_comp import Action, Id, Timer
+from rocket_sim.simulations import simulate
+from rocket_sim.spec import vehicle_to_spec, vehicle_from_spec, validate_spec, load_vehicle, save_vehicle, SpecError
+from rocket_sim.transitions import When, TimerExpired
+from vehicle_examples import single_stage_const_thrust, single_stage_var_thrust, single_stage_parachute, three_stage
+
+
+@pytest.mark.parametrize('example', [single_stage_const_thrust, single_stage_var_thrust, single_stage_parachute,
+                                     three_stage])
+def test_round_trip(example, tmp_path, assert_same_flight):
+    vehicle, name = example()
+    path = str(tmp_path / 'vehicle.json')
+    save_vehicle(vehicle, path, name)
+
+    with open(path) as f:
+        assert json.load(f)['name'] == name
+    loaded = load_vehicle(path)
+    assert vehicle_to_spec(loaded, name) == vehicle_to_spec(vehicle, name)
+    assert_same_flight(simulate(loaded, dt=0.01), simulate(vehicle, dt=0.01))
+
+
+def test_timer_and_atmosphere(assert_same_flight):
+    vehicle, _ = single_stage_parachute()
+    timer = Timer('Coast', [], 3.0)
+    timer.add_transition(When(TimerExpired(), Action.PARACHUTE, Id('Descent', [])))
+    vehicle.computer_state = timer
+    vehicle.atmosphere = StandardAtmosphere(max_altitude_m=1000.0, wind=power_law_wind(3.0))
+
+    spec = vehicle_to_spec(vehicle)
+    assert spec['computer']['states'][0] == {'name': 'Coast', 'type': 'timer', 'time_rem_s': 3.0,
+                                             'transitions': [{'when': [{'timer_expired': True}],
+                                                              'action': 'PARACHUTE', 'target': 'Descent'}]}
+    assert_same_flight(simulate(vehicle_from_spec(json.loads(json.dumps(spec))), dt=0.01), simulate(vehicle, dt=0.01))
+
+
+def test_toml(tmp_path, assert_same_flight):
+    path = tmp_path / 'vehicle.toml'
+    path.write_text('''
+version = 1
+name = "Minimal"
+
+[[stages]]
+area_m2 = 0.000979
+drag_coefficient = 0.75
+empty_mass_kg = 0.106
+engine_case_mass_kg = 0.0248
+propellant_mass_kg = 0.0215
+thrust_N = 6.38
+f_propellant_mass_kg = { type = "linear", dx_per_sec = -0.00342925 }
+f_thrust_N = { type = "const" }
+
+[computer]
+initial = "Burn"
+states = [{ name = "Burn" }]
+''')
+    assert_same_flight(simulate(load_vehicle(str(path)), dt=0.01), simulate(single_stage_const_thrust()[0], dt=0.01))
+
+
+def test_validation():
+    spec = vehicle_to_spec(three_stage()[0])
+    validate_spec(spec)
+
+    spec['stages'][1]['thrust_N'] = 'fast'
+    with pytest.raises(SpecError, match=r'stages\[1\]\.thrust_N'):
+        validate_spec(spec)
+
+    spec = vehicle_to_spec(three_stage()[0])
+    spec['computer']['states'][0]['transitions'][0]['target'] = 'Nowhere'
+    with pytest.raises(SpecError, match='Nowhere'):
+        vehicle_from_spec(spec)
+
+
+def test_closures_cannot_be_described():
+    vehicle, _ = three_stage()
+    vehicle.computer_state.add_transition(lambda prev, now, comp: None)
+    with pytest.raises(SpecError):
+        vehicle_to_spec(vehicle)
@@ -0,0 +1,55 @@
+import pytest
+from rocket_sim.simulations import simulate
+from rocket_sim.state import VehicleState
+from rocket_sim.stop import AtApogee, AtAltitude, AtTime, AtEvent, Predicate, ballistic_touchdown, PROPERTIES
+from vehicle_examples import three_stage, single_stage_parachute
+
+
+def test_full_flight_is_valid():
+    sim = simulate(three_stage()[0], dt=0.05)
+    assert not sim.truncated
+    assert sim.valid == PROPERTIES
+
+
+def test_stop_at_apogee():
+    full = simulate(three_stage()[0], dt=0.01)
+    sim = simulate(three_stage()[0], dt=0.01, stop=AtApogee(), tail=True)
+
+    assert sim.truncated
+    assert len(sim.trajectory) < len(full.trajectory) / 2
+    assert sim.apogee == full.apogee
+    assert sim.maximum_velocity == full.maximum_velocity
+    assert sim.total_time == pytest.approx(full.total_time, abs=0.01)
+    assert sim.impact_velocity == pytest.approx(full.impact_velocity, rel=1e-4)
+    assert {'impact_velocity', 'total_time'} <= sim.valid
+
+
+def test_no_tail_while_computer_can_act():
+    sim = simulate(single_stage_parachute()[0], dt=0.01, stop=AtApogee(), tail=True)
+    assert sim.touchdown is None
+    assert sim.valid == {'apogee', 'maximum_velocity'}
+
+
+@pytest.mark.parametrize('stop, check', [
+    (AtAltitude(100.0), lambda s: s.dist_m >= 100.0),
+    (AtAltitude(100.0, ascending=False), lambda s: s.dist_m <= 100.0 and s.velocity_ms < 0),
+    (AtTime(3.0), lambda s: s.time_s >= 3.0),
+    (AtEvent('Parachute'), lambda s: s.event == 'Parachute'),
+    (Predicate(lambda prev, now: now.velocity_ms < -5.0), lambda s: s.velocity_ms < -5.0),
+])
+def test_stop_conditions(stop, check):
+    sim = simulate(single_stage_parachute()[0], dt=0.01, stop=stop, in_place=True)
+    states = sim.states
+
+    assert sim.stopped_by is stop
+    assert check(states[-1])
+    assert not any(check(s) for s in states[:-1])
+
+
+def test_ballistic_without_drag():
+    state = VehicleState.zero()
+    state.dist_m = 4.905
+    t, v = ballistic_touchdown(state, 1.0, 0.0)
+
+    assert t == pytest.approx(1.0)
+    assert v == pytest.approx(-9.81)
@@ -0,0 +1,45 @@
+import pytest
+import numpy as np
+from rocket_sim.simulations import simulate, simulate_iter, Simulation
+from rocket_sim.sinks import record
+from rocket_sim.storage import TrajectoryWriter, read_header
+from vehicle_examples import three_stage
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_load(tmp_path, mmap, assert_same_flight):
+    vehicle, name = three_stage()
+    sim = simulate(vehicle, dt=0.05)
+    path = str(tmp_path / 'three_stage.traj')
+
+    sim.save(path, dt=0.05, name=name)
+    loaded = Simulation.load(path, mmap=mmap)
+
+    assert read_header(path)['name'] == name
+    assert read_header(path)['dt'] == 0.05
+    assert loaded.apogee == sim.apogee
+    assert_same_flight(loaded, sim)
+
+
+def test_write_while_simulating(tmp_path):
+    vehicle, _ = three_stage()
+    sim = simulate(vehicle, dt=0.05)
+    path = str(tmp_path / 'streamed.traj')
+
+    # Small capacity and chunks, so the columns are moved as the file grows.
+    writer = TrajectoryWriter(path, capacity=10, chunk_size=7)
+    record(simulate_iter(vehicle, dt=0.05), writer)
+    loaded = Simulation.load(path)
+
+    assert read_header(path)['capacity'] == len(sim.trajectory)
+    assert loaded.events == sim.events
+    assert np.array_equal(loaded.trajectory.column('dist_m'), sim.trajectory.column('dist_m'))
+    assert np.array_equal(loaded.trajectory.column('accel_ms2'), sim.trajectory.column('accel_ms2'))
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.traj'
+    path.write_bytes(b'not a trajectory')
+
+    with pytest.raises(ValueError):
+        Simulation.load(str(path))
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from rocket_sim.monte_carlo import FlightSummary
+from rocket_sim.simulations import simulate
+from rocket_sim.surrogate import fit_surrogate, load_surrogate
+from vehicle_examples import single_stage_parachute
+
+BOUNDS = {'parachute_area_m2': (0.005, 0.05), 'thrust_N': (4.0, 9.0)}
+DT = 0.05
+
+
+def _true(params, metric):
+    return getattr(FlightSummary(simulate(single_stage_parachute(**params)[0], DT)), metric)
+
+
+@pytest.fixture(scope='module')
+def model():
+    return fit_surrogate(single_stage_parachute, BOUNDS, DT, samples=24, workers=1)
+
+
+def test_interpolates_samples(model):
+    params = dict(zip(model.names, model.samples.T))
+    predicted = model.predict(params)
+    for k, metric in enumerate(model.metrics):
+        assert np.allclose(predicted[metric], model.values[:, k], rtol=1e-6, atol=1e-6)
+
+
+def test_predictions_within_estimated_error(model):
+    params = {'parachute_area_m2': 0.02, 'thrust_N': 6.3}
+    predicted = model.query(**params)
+    error = model.error(params)
+    apogee = _true(params, 'apogee_m')
+    assert predicted['apogee_m'] == pytest.approx(apogee, rel=0.01)
+    assert abs(predicted['apogee_m'] - apogee) <= 3 * error['apogee_m'][0] + 1e-6
+
+
+def test_falls_back_to_simulation_outside_bounds(model):
+    params = {'parachute_area_m2': 0.01, 'thrust_N': 12.0}
+    assert not model.inside(params)[0]
+    assert model.query(**params)['apogee_m'] == _true(params, 'apogee_m')
+    with pytest.raises(ValueError):
+        model.predict({'thrust_N': 5.0})
+
+
+def test_refine_adds_samples_and_reduces_error():
+    model = fit_surrogate(single_stage_parachute, BOUNDS, DT, samples=12, metrics=['apogee_m'], workers=1)
+    before = model.cross_validation_error()['apogee_m']
+    added = model.refine(12)
+    assert len(added) == 12
+    assert len(model.samples) == 24
+    assert all(BOUNDS[n][0] <= p[n] <= BOUNDS[n][1] for p in added for n in BOUNDS)
+    assert model.cross_validation_error()['apogee_m'] < before
+
+
+def test_save_and_load(model, tmp_path):
+    path = str(tmp_path / 'model.npz')
+    model.save(path)
+    loaded = load_surrogate(path, workers=1)
+    assert loaded.factory == 'vehicle_examples:single_stage_parachute'
+    assert loaded.bounds == BOUNDS
+
+    params = {'parachute_area_m2': [0.01, 0.03], 'thrust_N': [5.0, 8.0]}
+    for metric, values in model.predict(params).items():
+        assert np.array_equal(loaded.predict(params)[metric], values)
+    assert loaded.query(parachute_area_m2=0.01, thrust_N=12.0)['apogee_m'] == \
+        _true({'parachute_area_m2': 0.01, 'thrust_N': 12.0}, 'apogee_m')
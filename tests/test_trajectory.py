@@ -0,0 +1,73 @@
+import pytest
+from rocket_sim.trajectory import Trajectory, ForkedTrajectory
+from rocket_sim.simulations import Simulation
+
+
+def test_grows_past_capacity(zeroed_vehicle_states):
+    trajectory = Trajectory(capacity=4)
+    for s in zeroed_vehicle_states:
+        trajectory.append(s)
+
+    assert len(trajectory) == len(zeroed_vehicle_states)
+    assert trajectory.column('time_s')[-1] == zeroed_vehicle_states[-1].time_s
+
+
+def test_round_trips_states(zeroed_vehicle_states):
+    zeroed_vehicle_states[3].set_event_name('Stage')
+    zeroed_vehicle_states[3].velocity_ms = 5.0
+    states = Trajectory.from_states(zeroed_vehicle_states).states()
+
+    assert states[3].event == 'Stage'
+    assert states[3].velocity_ms == 5.0
+    assert states[4].event is None
+
+
+def test_events(zeroed_vehicle_states):
+    zeroed_vehicle_states[10].set_event_name('Parachute')
+    zeroed_vehicle_states[20].dist_m = 50
+    sim = Simulation(zeroed_vehicle_states)
+
+    assert sim.events == [(zeroed_vehicle_states[10].time_s, 'Parachute'), (zeroed_vehicle_states[20].time_s, 'Apogee')]
+
+
+def test_simulation_states_kept_until_trajectory_changes(zeroed_vehicle_states):
+    sim = Simulation(zeroed_vehicle_states[:10])
+    states = sim.states
+    assert sim.states is states
+    assert [s.time_s for s in states] == [s.time_s for s in zeroed_vehicle_states[:10]]
+
+    sim.trajectory.append(zeroed_vehicle_states[10])
+    assert sim.states is not states
+    assert len(sim.states) == 11
+
+
+def test_forked_trajectory(zeroed_vehicle_states):
+    zeroed_vehicle_states[3].set_event_name('Stage')
+    zeroed_vehicle_states[12].set_event_name('Parachute')
+    expected = Trajectory.from_states(zeroed_vehicle_states)
+
+    prefix = Trajectory.from_states(zeroed_vehicle_states[:10])
+    forked = ForkedTrajectory(prefix, capacity=2)
+    for s in zeroed_vehicle_states[10:]:
+        forked.append(s)
+    # Samples added to the prefix later are not part of the fork.
+    prefix.append(zeroed_vehicle_states[0])
+
+    assert len(forked) == len(expected)
+    assert forked.events == expected.events
+    assert list(forked.column('time_s')) == list(expected.column('time_s'))
+    assert forked.state(12).event == 'Parachute'
+    assert forked.state(-1).time_s == expected.state(-1).time_s
+    assert [s.time_s for s in forked.states()] == [s.time_s for s in expected.states()]
+
+    assert [list(s) for s in forked.segments('time_s')] == [list(expected.column('time_s')[:10]),
+                                                             list(expected.column('time_s')[10:])]
+    assert forked.value('time_s', 12) == expected.value('time_s', 12)
+    assert forked.value('time_s', -1) == expected.value('time_s', -1)
+    with pytest.raises(IndexError):
+        forked.value('time_s', len(forked))
+
+    forked.clear()
+    assert len(forked) == 0
+    assert forked.events == []
+    assert len(forked.column('time_s')) == 0
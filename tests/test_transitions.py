@@ -0,0 +1,68 @@
+from rocket_sim.batch import simulate_batch
+from rocket_sim.flight_comp import Action, Id, Timer
+from rocket_sim.simulations import simulate
+from rocket_sim.state import VehicleState
+from rocket_sim.transitions import When, Field, TimerExpired, compile_computer
+from vehicle_examples import three_stage, single_stage_parachute
+
+
+def _timed_parachute(timer: Timer, closure: bool = False):
+    """
+    :return: vehicle which deploys its parachute when the timer expires, with the timer started at burnout.
+    """
+    vehicle, _ = single_stage_parachute()
+    descent = Id('Descent', [])
+    timer.add_transition(When(TimerExpired(), Action.PARACHUTE, descent))
+
+    burn = Id('Burn', [])
+    if closure:
+        burn.add_transition(lambda prev, now, comp: (None, timer) if now.accel_ms2 < 0.0 else None)
+    else:
+        burn.add_transition(When(Field('accel_ms2') < 0.0, None, timer))
+
+    vehicle.computer_state = burn
+    return vehicle
+
+
+def test_condition():
+    condition = (Field('dist_m') > 10.0) & (Field('accel_ms2') <= 0.5)
+    state = VehicleState.zero()
+    state.dist_m = 11.0
+
+    assert condition.holds(state, state, None)
+    state.accel_ms2 = 0.6
+    assert not condition.holds(state, state, None)
+
+
+def test_compile():
+    vehicle, _ = three_stage()
+    table = compile_computer(vehicle.computer_state)
+    assert [s.name for s in table.states] == ['Burn Stage 1', 'Burn Stage 2', 'Burn Stage 3']
+    assert not any(table.opaque)
+
+    vehicle.computer_state.add_transition(lambda prev, now, comp: None)
+    assert compile_computer(vehicle.computer_state).opaque[0]
+
+
+def test_absolute_timer_does_not_change():
+    timer = Timer('Coast', [], expires_at_s=1.0)
+    _, next_timer = timer.transition(VehicleState.zero(0.0), VehicleState.zero(0.5))
+
+    assert next_timer is timer
+    assert not timer.expired(VehicleState.zero(0.0), VehicleState.zero(0.5))
+    assert timer.expired(VehicleState.zero(0.5), VehicleState.zero(1.0))
+
+
+def test_batch_matches_simulate(assert_same_flight):
+    factories = [
+        lambda: _timed_parachute(Timer('Coast', [], 3.0)),
+        lambda: _timed_parachute(Timer('Coast', [], 3.0), closure=True),
+        lambda: _timed_parachute(Timer('Coast', [], expires_at_s=6.0)),
+        lambda: three_stage()[0],
+    ]
+    batch = simulate_batch([f() for f in factories], dt=0.05)
+
+    for f, sim in zip(factories, batch):
+        assert_same_flight(sim, simulate(f(), dt=0.05))
+
+    assert 'Parachute' in [name for _, name in batch[0].events]
@@ -0,0 +1,44 @@
+import pytest
+from rocket_sim.simulations import simulate
+from rocket_sim.flight_comp import Timer, Id
+from rocket_sim.state import VehicleState
+from vehicle_examples import three_stage, single_stage_parachute
+
+
+@pytest.mark.parametrize('example', [three_stage, single_stage_parachute])
+def test_in_place_matches_immutable(example, assert_same_flight):
+    vehicle, _ = example()
+    expected = simulate(vehicle, dt=0.05, kernel=False)
+    actual = simulate(vehicle, dt=0.05, in_place=True, kernel=False)
+    assert_same_flight(actual, expected)
+
+
+def test_in_place_does_not_modify_vehicle():
+    vehicle, _ = three_stage()
+    simulate(vehicle, dt=0.05, in_place=True, kernel=False)
+
+    assert vehicle.state.time_s == 0.0
+    assert vehicle.stage.stage_time_s == 0.0
+    assert len(vehicle.remaining_engine_stages) == 2
+
+
+def test_timer_entered_is_copy():
+    timer = Timer('Wait', [], 2.0)
+    entered = timer.entered()
+    entered.transition_in_place(VehicleState.zero(0.0), VehicleState.zero(0.5))
+
+    assert entered.time_rem_s == 1.5
+    assert timer.time_rem_s == 2.0
+
+
+def test_id_returns_itself():
+    comp = Id('Burn', [])
+    _, next_comp = comp.transition(VehicleState.zero(0.0), VehicleState.zero(0.1))
+
+    assert next_comp is comp
+
+
+def test_step_shares_remaining_stages_until_staging():
+    vehicle, _ = three_stage()
+    stepped = vehicle.step(0.01)
+    assert stepped.remaining_engine_stages is vehicle.remaining_engine_stages
@@ -1,7 +1,9 @@
-from typing import Tuple, Optional, Callable
+from typing import Tuple
 from rocket_sim.vehicle import Vehicle, VehicleState
-from rocket_sim.flight_comp import Action, CompState, Id
+from rocket_sim.flight_comp import Action, Id
+from rocket_sim.transitions import When, Field
 from rocket_sim.stage import Stage, linear, const, lerp
+from rocket_sim.curves import ThrustCurve
 
 
 def single_stage_const_thrust() -> Tuple[Vehicle, str]:
@@ -24,63 +26,64 @@ def single_stage_var_thrust() -> Tuple[Vehicle, str]:
     :return: description of a single stage vehicle without a parachute, where
         the thrust of the motor changes over time.
     """
-    ts = [8, 8, 6, 5, 5, 5, 0]
-    f = lerp(1.0, ts)
+    thrust = ThrustCurve.uniform(1.0, [8, 8, 6, 5, 5, 5, 0])
 
     comp_burn = Id('Burn', [])
     burn_stage = Stage(stage_time_s=0.0, area_m2=0.000979, drag_coefficient=0.75, empty_mass_kg=0.106,
                        engine_case_mass_kg=0.0248, propellant_mass_kg=0.0215, thrust_N=0,
-                       f_propellant_mass_kg=linear(-0.00342925), f_thrust_N=f)
+                       f_propellant_mass_kg=thrust.propellant_mass_curve(0.0215), f_thrust_N=thrust)
 
     return Vehicle(comp_burn, burn_stage, [], None, VehicleState.zero()), 'Single Stage Vehicle (Variable Thrust)'
 
 
-def single_stage_parachute() -> Tuple[Vehicle, str]:
+def single_stage_parachute(thrust_N: float = 6.38,
+                           burn_rate_kg_s: float = 0.00342925,
+                           drag_coefficient: float = 0.75,
+                           area_m2: float = 0.000979,
+                           parachute_area_m2: float = 0.02,
+                           deploy_velocity_ms: float = -7.0) -> Tuple[Vehicle, str]:
     """
+    :param thrust_N: thrust of the motor.
+    :param burn_rate_kg_s: mass of propellant burnt per second.
+    :param drag_coefficient: drag coefficient of the body and of the parachute.
+    :param area_m2: cross-sectional area of the body.
+    :param parachute_area_m2: area of the parachute.
+    :param deploy_velocity_ms: velocity below which the parachute is deployed.
     :return: description of a single stage vehicle with a parachute.
     """
     comp_burn = Id('Burn', [])
     comp_descent = Id('Descent', [])
 
     # Computer deploys parachute after starts falling.
-    def deploy_parachute(_prev: VehicleState, now: VehicleState, _comp: CompState) -> Tuple[Optional[Action], CompState]:
-        if now.velocity_ms < -7.0:
-            return Action.PARACHUTE, comp_descent
-        return None, comp_burn
+    comp_burn.add_transition(When(Field('velocity_ms') < deploy_velocity_ms, Action.PARACHUTE, comp_descent))
 
-    comp_burn.add_transition(deploy_parachute)
-
-    burn_stage = Stage(stage_time_s=0.0, area_m2=0.000979, drag_coefficient=0.75, empty_mass_kg=0.106,
-                       engine_case_mass_kg=0.0248, propellant_mass_kg=0.0215, thrust_N=6.38,
-                       f_propellant_mass_kg=linear(-0.00342925), f_thrust_N=const())
+    burn_stage = Stage(stage_time_s=0.0, area_m2=area_m2, drag_coefficient=drag_coefficient, empty_mass_kg=0.106,
+                       engine_case_mass_kg=0.0248, propellant_mass_kg=0.0215, thrust_N=thrust_N,
+                       f_propellant_mass_kg=linear(-burn_rate_kg_s), f_thrust_N=const())
 
     # Mass as burn stage, as burn stage is not separated.
-    parachute_stage = Stage(stage_time_s=0.0, area_m2=0.02, drag_coefficient=0.75, empty_mass_kg=0.106,
-                            engine_case_mass_kg=0.0248, propellant_mass_kg=0.0, thrust_N=0.0,
+    parachute_stage = Stage(stage_time_s=0.0, area_m2=parachute_area_m2, drag_coefficient=drag_coefficient,
+                            empty_mass_kg=0.106, engine_case_mass_kg=0.0248, propellant_mass_kg=0.0, thrust_N=0.0,
                             f_propellant_mass_kg=const(), f_thrust_N=const())
 
     return Vehicle(comp_burn, burn_stage, [], parachute_stage, VehicleState.zero()), "Single Stage with Parachute"
 
 
-def three_stage() -> Tuple[Vehicle, str]:
+def three_stage(staging_altitude_m: float = 10.0, staging_accel_ms2: float = 0.5) -> Tuple[Vehicle, str]:
     """
+    :param staging_altitude_m: altitude above which the next stage may be fired.
+    :param staging_accel_ms2: acceleration at or below which the next stage is fired, i.e. the current stage has
+           burnt out.
     :return: description of two stage vehicle without a parachute.
     """
     comp_burn1 = Id('Burn Stage 1', [])
     comp_burn2 = Id('Burn Stage 2', [])
     comp_burn3 = Id('Burn Stage 3', [])
 
-    # Computer deploys parachute after first stage runs out.
-    def burn_stage(curr_state: CompState, comp_state: CompState) -> Callable:
-        def burn_next_stage(prev: VehicleState, now: VehicleState, comp: CompState) -> Tuple[Optional[Action], CompState]:
-            if now.dist_m > 10.0 and now.accel_ms2 <= 0.5:
-                return Action.NEXT_STAGE, comp_state
-            return None, curr_state
-
-        return burn_next_stage
-
-    comp_burn1.add_transition(burn_stage(comp_burn1, comp_burn2))
-    comp_burn2.add_transition(burn_stage(comp_burn2, comp_burn3))
+    # Computer fires the next stage once the current stage runs out.
+    burnt_out = (Field('dist_m') > staging_altitude_m) & (Field('accel_ms2') <= staging_accel_ms2)
+    comp_burn1.add_transition(When(burnt_out, Action.NEXT_STAGE, comp_burn2))
+    comp_burn2.add_transition(When(burnt_out, Action.NEXT_STAGE, comp_burn3))
 
     stage3 = Stage(stage_time_s=0.0,
                    area_m2=0.000979,